@@ -1,15 +1,32 @@
 """ Initialisation du package de l'intégration Koolnova """
 
+import asyncio
 import logging
+import os
 
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.exceptions import ConfigEntryNotReady
 
 from .koolnova.device import Koolnova
 
-from .const import DOMAIN, PLATFORMS
+from .const import (
+    DOMAIN,
+    PLATFORMS,
+    FLEET,
+    OPT_WORKER,
+    WORKERS,
+    CONNECT_RETRY_DELAY_MIN,
+    CONNECT_RETRY_DELAY_MAX,
+)
+from .koolnova.const import POLL_GROUPS, ZoneRegister
+from .koolnova.fleet import Fleet
+from .koolnova.workers import WorkerPool
+from .koolnova.transport import TransportSettingsError
 
 from .coordinator import KoolnovaCoordinator
+from .store import KoolnovaStore, async_remove_store
+from .services import async_setup_services, async_unload_services
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,68 +41,138 @@ async def async_setup_entry(hass: HomeAssistant,
     name: str = entry.data['Name']
     if entry.data['Mode'] == 'Modbus RTU':
         port: str = entry.data['Device']
-        addr: int = entry.data['Address']
-        baudrate: int = entry.data['Baudrate']
-        parity: str = entry.data['Parity'][0]
-        bytesize: int = entry.data['Sizebyte']
-        stopbits: int = entry.data['Stopbits']
-        device = Koolnova(mode=entry.data['Mode'],
-                            name=name,
-                            timeout=timeout,
-                            debug=debug,
-                            port=port,
-                            addr=addr,
-                            baudrate=baudrate,
-                            parity=parity,
-                            bytesize=bytesize,
-                            stopbits=stopbits)
+        # checked off the event loop, hass retries the setup until the dongle is plugged
+        if not await hass.async_add_executor_job(_serial_port_present, port):
+            raise ConfigEntryNotReady("Serial device {} not found".format(port))
+        params: dict = {'port': port,
+                        'addr': entry.data['Address'],
+                        'baudrate': entry.data['Baudrate'],
+                        'parity': entry.data['Parity'][0],
+                        'bytesize': entry.data['Sizebyte'],
+                        'stopbits': entry.data['Stopbits']}
     elif entry.data['Mode'] == 'Modbus TCP':
-        port:int = entry.data['Port']
-        addr:str = entry.data['Address']
-        modbus:int = entry.data['Modbus']
-        retries:int = entry.data['Retries']
-        reco_delay_min:float = entry.data['Reconnect_delay_min']
-        reco_delay_max:float = entry.data['Reconnect_delay_max']
-        device = Koolnova(mode=entry.data['Mode'],
-                            name=name,
-                            timeout=timeout,
-                            debug=debug,
-                            port=port,
-                            addr=addr,
-                            modbus=modbus,
-                            retries=retries,
-                            reco_delay_min=reco_delay_min,
-                            reco_delay_max=reco_delay_max)
+        params: dict = {'port': entry.data['Port'],
+                        'addr': entry.data['Address'],
+                        'modbus': entry.data['Modbus'],
+                        'retries': entry.data['Retries'],
+                        'reco_delay_min': entry.data['Reconnect_delay_min'],
+                        'reco_delay_max': entry.data['Reconnect_delay_max']}
     else:
         _LOGGER.error("Integration initialisation failed (Mode unknown)")
         return False
+    worker:bool = entry.options.get(OPT_WORKER, False)
+    if worker and any(_link(other) == _link(entry) and not other.options.get(OPT_WORKER, False)
+                        for other in hass.config_entries.async_entries(DOMAIN)
+                        if other.entry_id != entry.entry_id):
+        # a link is owned by one process, entries sharing it must all use the worker pool
+        _LOGGER.warning("Koolnova {} shares its link with an entry without the worker option, polled in process".format(name))
+        worker = False
     try:
-        # connect to modbus client
-        ret = await device.async_connect()
-        if not ret:
-            _LOGGER.error("Something went wrong when connecting to modbus ...")
-            return False
-        # update attributes
-        ret = await device.async_update()
-        if not ret:
-            _LOGGER.error("Something went wrong when updating datas ...")
-            return False
-        # record each area in device
-        _LOGGER.debug("Koolnova areas: {}".format(entry.data['areas']))
-        for area in entry.data['areas']:
-            await device.async_add_manual_registered_area(name=area['Name'], 
-                                                    id_zone=area['Area_id'])
-        hass.data[DOMAIN]['device'] = device
-        coordinator = KoolnovaCoordinator(hass, device)
-        hass.data[DOMAIN]['coordinator'] = coordinator
-    except Exception as e:
-        _LOGGER.exception("Something went wrong ... {}".format(e))
+        if worker:
+            # one pool for every entry, entries are sharded across its workers (bounded by the CPU count)
+            pool:WorkerPool = hass.data.get(WORKERS)
+            if pool is None:
+                pool = hass.data[WORKERS] = WorkerPool()
+            client = await pool.async_add_gateway(entry.entry_id,
+                                                    {'config': dict(params,
+                                                                    mode=entry.data['Mode'],
+                                                                    timeout=timeout,
+                                                                    debug=debug)})
+            # thin view over the registers streamed by the worker process
+            device = Koolnova(mode="Worker",
+                                name=name,
+                                timeout=timeout,
+                                debug=debug,
+                                client=client)
+        else:
+            device = Koolnova(mode=entry.data['Mode'],
+                                name=name,
+                                timeout=timeout,
+                                debug=debug,
+                                **params)
+    except TransportSettingsError as e:
+        # another entry opened the link with other line settings
+        _LOGGER.error("Integration initialisation failed ({})".format(e))
+        return False
+    store = KoolnovaStore(hass, entry.entry_id, device)
+    registers = await store.async_load()
+    if registers is not None:
+        # start from the registers of the previous run until the controller is read
+        device.restore(registers)
+    # areas are read with the controller by the connection task
+    _LOGGER.debug("Koolnova areas: {}".format(entry.data['areas']))
+    for area in entry.data['areas']:
+        device.add_area(name=area['Name'], id_zone=area['Area_id'])
+    # the fleet is shared by the entries, built with the first one
+    fleet:Fleet = hass.data.get(FLEET)
+    if fleet is None:
+        fleet = hass.data[FLEET] = Fleet()
+    fleet.add_device(entry.entry_id, device)
+    # every config entry owns its device and coordinators
+    hass.data[DOMAIN][entry.entry_id] = {
+        'device': device,
+        'store': store,
+        'worker': worker,
+        # one coordinator per register group, each with its own polling interval
+        'coordinators': {group: KoolnovaCoordinator(hass, device, group, fleet, store)
+                            for group in POLL_GROUPS},
+    }
+    # entities are unavailable until the controller is read (or restored)
+    entry.async_create_background_task(hass,
+                                        _async_connect(hass, entry),
+                                        f"{DOMAIN}-{name}-connect")
+
+    # options changes are applied by reloading the entry
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
 
     # Propagation du configEntry à toutes les plateformes déclarées dans notre intégration
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    await async_setup_services(hass)
 
     return True
 
+async def _async_options_updated(hass: HomeAssistant,
+                                    entry: ConfigEntry) -> None:
+    """ reload the entry with its new options """
+    await hass.config_entries.async_reload(entry.entry_id)
+
+def _link(entry: ConfigEntry) -> str:
+    """ physical link of an entry (serial device or host:port) """
+    if entry.data.get('Mode') == 'Modbus RTU':
+        return entry.data.get('Device')
+    return "{}:{}".format(entry.data.get('Address'), entry.data.get('Port'))
+
+def _serial_port_present(port: str) -> bool:
+    """ serial device plugged (urls such as socket:// are not checked) """
+    return "://" in port or os.path.exists(port)
+
+async def _async_connect(hass: HomeAssistant,
+                            entry: ConfigEntry) -> None:
+    """ connect and read every register, retried until the controller answers
+
+        Replaces the values restored from the previous run and makes the
+        entities available.
+    """
+    data = hass.data[DOMAIN][entry.entry_id]
+    device:Koolnova = data['device']
+    delay = CONNECT_RETRY_DELAY_MIN
+    while True:
+        try:
+            if await device.async_connect() and await device.async_update():
+                break
+            reason = "registers not read"
+        except Exception as e:
+            reason = e
+        _LOGGER.warning("Koolnova {} not reachable, retrying in {}s ({})".format(device.name, delay, reason))
+        await asyncio.sleep(delay)
+        delay = min(2 * delay, CONNECT_RETRY_DELAY_MAX)
+    _LOGGER.debug("Koolnova {} connected and read".format(device.name))
+    for area in device.areas:
+        if area.register != ZoneRegister.REGISTER_ON:
+            _LOGGER.error("Zone with ID: {} is not registered".format(area.id_zone))
+    for coordinator in data['coordinators'].values():
+        coordinator.async_set_updated_data(device.data)
+
 async def async_unload_entry(hass: HomeAssistant,
                             entry: ConfigEntry) -> bool:
     """ Unload a config entry. """
@@ -93,12 +180,30 @@ async def async_unload_entry(hass: HomeAssistant,
     # needs to unload itself, and remove callbacks
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     _LOGGER.debug("Unload entries: {}".format(unload_ok))
+    if unload_ok:
+        data = hass.data[DOMAIN].pop(entry.entry_id, None)
+        fleet:Fleet = hass.data[FLEET]
+        fleet.remove_device(entry.entry_id)
+        if not fleet.devices:
+            # last entry unloaded
+            hass.data.pop(FLEET)
+        if data:
+            for coordinator in data['coordinators'].values():
+                await coordinator.async_shutdown()
+            # the connection is only closed once no other entry shares it
+            data['device'].disconnect()
+            if data['worker']:
+                pool:WorkerPool = hass.data[WORKERS]
+                await pool.async_remove_gateway(entry.entry_id)
+                if not pool.gateways:
+                    # last entry polled by the pool
+                    hass.data.pop(WORKERS)
+                    await pool.async_stop()
+        if not hass.data[DOMAIN]:
+            async_unload_services(hass)
     return unload_ok
 
 async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """ Handle removal of an entry """
     _LOGGER.debug("Remove entry")
-    if hass.data[DOMAIN]:
-        device = hass.data[DOMAIN]['device']
-        if device.connected():
-            device.disconnect()
+    await async_remove_store(hass, entry.entry_id)
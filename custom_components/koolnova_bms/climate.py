@@ -29,10 +29,12 @@ from .const import (
     SUPPORTED_HVAC_MODES,
     SUPPORTED_FAN_MODES,
     FAN_TRANSLATION,
+    FAN_REVERSE,
     HVAC_TRANSLATION,
+    HVAC_REVERSE,
 )
 
-from .coordinator import KoolnovaCoordinator
+from .coordinator import KoolnovaCoordinator, KoolnovaEntity
 
 from homeassistant.const import (
     ATTR_TEMPERATURE,
@@ -40,10 +42,18 @@ from homeassistant.const import (
 )
 
 from .koolnova.device import Koolnova, Area
+from .koolnova.snapshot import AreaSnapshot
+from .koolnova import planner
+from .koolnova import image
 from .koolnova.const import (
     MIN_TEMP_ORDER,
     MAX_TEMP_ORDER,
     STEP_TEMP_ORDER,
+    REG_LOCK_ZONE,
+    REG_STATE_AND_FLOW,
+    REG_TEMP_ORDER,
+    POLL_FAST,
+    POLL_MEDIUM,
     SysState,
     ZoneState,
     ZoneClimMode,
@@ -59,14 +69,14 @@ async def async_setup_entry(hass: HomeAssistant,
     """Setup switch entries"""
 
     entities = []
-    coordinator = hass.data[DOMAIN]["coordinator"]
-    device = hass.data[DOMAIN]["device"]
+    coordinators = hass.data[DOMAIN][entry.entry_id]["coordinators"]
+    device = hass.data[DOMAIN][entry.entry_id]["device"]
 
     for area in device.areas:
-        entities.append(AreaClimateEntity(coordinator, device, area))
+        entities.append(AreaClimateEntity(coordinators[POLL_FAST], coordinators[POLL_MEDIUM], device, area))
     async_add_entities(entities)
 
-class AreaClimateEntity(CoordinatorEntity, ClimateEntity):
+class AreaClimateEntity(KoolnovaEntity, ClimateEntity):
     """ Reperesentation of a climate entity """
     # pylint: disable = too-many-instance-attributes
 
@@ -86,31 +96,77 @@ class AreaClimateEntity(CoordinatorEntity, ClimateEntity):
 
     def __init__(self,
                 coordinator: KoolnovaCoordinator, # pylint: disable=unused-argument
+                temp_coordinator: KoolnovaCoordinator, # pylint: disable=unused-argument
                 device: Koolnova, # pylint: disable=unused-argument
                 area: Area, # pylint: disable=unused-argument
                 ) -> None:
         """ Class constructor """
         super().__init__(coordinator)
+        # setpoints and states come from the fast group, real temperature from the medium one
+        self._temp_coordinator = temp_coordinator
         self._device = device
         self._area = area
         self._attr_name = f"{self._device.name} {self._area.name}"
         self._attr_device_info = self._device.device_info
         self._attr_unique_id = f"{DOMAIN}-{self._device.name}-{self._area.name}-area-climate"
-        self._attr_current_temperature = self._area.real_temp
-        self._attr_target_temperature = self._area.order_temp
-        self._attr_fan_mode = FAN_TRANSLATION[int(self._area.fan_mode)]
-        self._attr_hvac_mode = self._translate_to_hvac_mode()
-
-    def _translate_to_hvac_mode(self) -> int:
+        # snapshot of the area the attributes were computed from
+        self._snap: AreaSnapshot | None = None
+        self._update_attrs()
+
+    def _interest_registers(self) -> set:
+        """ registers of the area """
+        return planner.area_registers(self._area.id_zone)
+
+    def _watched_fields(self) -> frozenset:
+        """ fields of the area """
+        return image.watch(image.AREA, self._area.id_zone, image.AREA_FIELDS)
+
+    async def async_added_to_hass(self) -> None:
+        """ entity added: also listen to the real temperature group """
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._temp_coordinator.async_add_listener(self._handle_coordinator_update, self.coordinator_context)
+        )
+
+    @staticmethod
+    def _translate_to_hvac_mode(area: AreaSnapshot) -> int:
         """ translate area state and clim mode to HA hvac mode """
         ret = 0
-        if self._area.state == ZoneState.STATE_OFF:
+        if area.state == ZoneState.STATE_OFF:
             ret = HVACMode.OFF
         else:
-            ret = HVAC_TRANSLATION[int(self._area.clim_mode)]
+            ret = HVAC_TRANSLATION[int(area.clim_mode)]
 
         return ret
 
+    def _update_attrs(self) -> None:
+        """ update entity attributes from the latest snapshot of the area """
+        _area = self._device.snapshot.area(self._area.id_zone)
+        if _area is self._snap:
+            # area unchanged since the attributes were computed
+            return
+        self._snap = _area
+        self._attr_current_temperature = _area.real_temp
+        self._attr_target_temperature = _area.order_temp
+        self._attr_hvac_mode = self._translate_to_hvac_mode(_area)
+        self._attr_fan_mode = FAN_TRANSLATION[int(_area.fan_mode)]
+
+    def _async_written(self,
+                        ret: bool,
+                        offsets: list,
+                        ) -> None:
+        """ confirm the written values in background, or roll back a failed write """
+        if not ret:
+            # the device kept the area values, show them again
+            self._snap = None
+            self._update_attrs()
+            self.async_write_ha_state()
+            return
+        # area values are updated by the device when the write succeeded
+        self._update_attrs()
+        self.async_write_ha_state()
+        self.coordinator.async_confirm_write({planner.area_register(self._area.id_zone, offset) for offset in offsets})
+
     async def async_set_temperature(self,
                                     **kwargs,
                                     ) -> None:
@@ -118,77 +174,67 @@ class AreaClimateEntity(CoordinatorEntity, ClimateEntity):
         _LOGGER.debug("[Climate {}] set target temp - kwargs: {}".format(self._area.id_zone, kwargs))
         if "temperature" in kwargs:
             target_temp = kwargs.get("temperature")
+            self._async_optimistic(_attr_target_temperature = target_temp)
             ret = await self._device.async_set_area_target_temp(zone_id = self._area.id_zone, temp = target_temp)
             if not ret:
                 _LOGGER.error("Error sending target temperature for area id {}".format(self._area.id_zone))
+            self._async_written(ret, [REG_TEMP_ORDER])
         else:
             _LOGGER.warning("Target temperature not defined for climate id {}".format(self._area.id_zone))
-        await self.coordinator.async_request_refresh()
 
     async def async_set_fan_mode(self,
                                     fan_mode:str,
                                     ) -> None:
         """ set new target fan mode """
         _LOGGER.debug("[Climate {}] set new fan mode: {}".format(self._area.id_zone, fan_mode))
-        for k,v in FAN_TRANSLATION.items():
-            if v == fan_mode:
-                opt = k
-                break
+        opt = FAN_REVERSE[fan_mode]
+        self._async_optimistic(_attr_fan_mode = fan_mode)
         ret = await self._device.async_set_area_fan_mode(zone_id = self._area.id_zone,
                                                             mode = ZoneFanMode(opt))
         if not ret:
-            _LOGGER.exception("Error setting new fan value for area id {}".format(self._area.id_zone))
-        await self.coordinator.async_request_refresh()
+            _LOGGER.error("Error setting new fan value for area id {}".format(self._area.id_zone))
+        self._async_written(ret, [REG_STATE_AND_FLOW])
 
     async def async_set_hvac_mode(self,
                                     hvac_mode:HVACMode,
                                     ) -> None:
         """ set new target hvac mode """
         _LOGGER.debug("[Climate {}] set new hvac mode: {}".format(self._area.id_zone, hvac_mode))
-        opt = 0
-        for k,v in HVAC_TRANSLATION.items():
-            if v == hvac_mode:
-                opt = k
-                break
+        opt = HVAC_REVERSE.get(hvac_mode, 0)
+        self._async_optimistic(_attr_hvac_mode = hvac_mode)
         ret = await self._device.async_set_area_clim_mode(zone_id = self._area.id_zone, 
                                                             mode = ZoneClimMode(opt))
         if not ret:
-            _LOGGER.exception("Error setting new hvac value for area id {}".format(self._area.id_zone))
-        await self.coordinator.async_request_refresh()
+            _LOGGER.error("Error setting new hvac value for area id {}".format(self._area.id_zone))
+        self._async_written(ret, [REG_LOCK_ZONE, REG_STATE_AND_FLOW])
         
     async def async_turn_off(self) -> None:
         """Turn the entity off."""
         _LOGGER.debug("[Climate {}] turn off".format(self._area.id_zone))
+        self._async_optimistic(_attr_hvac_mode = HVACMode.OFF)
         ret = await self._device.async_set_area_off(zone_id = self._area.id_zone)
         if not ret:
-            _LOGGER.exception("Error setting off HVAC for area id {}".format(self._area.id_zone))
-        await self.coordinator.async_request_refresh()
+            _LOGGER.error("Error setting off HVAC for area id {}".format(self._area.id_zone))
+        self._async_written(ret, [REG_LOCK_ZONE])
 
     async def async_turn_on(self) -> None:
         """Turn the entity on."""
         _LOGGER.debug("[Climate {}] turn on".format(self._area.id_zone))
+        # the area is turned on in its current clim mode
+        self._async_optimistic(_attr_hvac_mode = HVAC_TRANSLATION[int(self._snap.clim_mode)])
         ret = await self._device.async_set_area_on(zone_id = self._area.id_zone)
         if not ret:
-            _LOGGER.exception("Error setting on HVAC for area id {}".format(self._area.id_zone))
-        await self.coordinator.async_request_refresh()
+            _LOGGER.error("Error setting on HVAC for area id {}".format(self._area.id_zone))
+        self._async_written(ret, [REG_LOCK_ZONE])
 
     @callback
     def _handle_coordinator_update(self) -> None:
-        """ Handle updated data from the coordinator """
-        for _cur_area in self.coordinator.data['areas']:
-            if _cur_area.id_zone == self._area.id_zone:
-                _LOGGER.debug("[UPDATE] [Climate {}] temp:{} - target:{} - state: {} - hvac:{} - fan:{}".format(_cur_area.id_zone,
-                                                                                                        _cur_area.real_temp,
-                                                                                                        _cur_area.order_temp,
-                                                                                                        _cur_area.state,
-                                                                                                        _cur_area.clim_mode,
-                                                                                                        _cur_area.fan_mode))
-                self._area = _cur_area
-                self._attr_current_temperature = _cur_area.real_temp
-                self._attr_target_temperature = _cur_area.order_temp
-                if _cur_area.state == ZoneState.STATE_OFF:
-                    self._attr_hvac_mode = HVACMode.OFF
-                else:
-                    self._attr_hvac_mode = HVAC_TRANSLATION[int(_cur_area.clim_mode)]
-                self._attr_fan_mode = FAN_TRANSLATION[int(_cur_area.fan_mode)]
+        """ Handle updated data from the coordinator (only when a field of the area changed) """
+        self._update_attrs()
+        _LOGGER.debug("[UPDATE] [Climate {}] temp:{} - target:{} - state: {} - hvac:{} - fan:{}".format(self._snap.id_zone,
+                                                                                                self._snap.real_temp,
+                                                                                                self._snap.order_temp,
+                                                                                                self._snap.state,
+                                                                                                self._snap.clim_mode,
+                                                                                                self._snap.fan_mode))
         self.async_write_ha_state()
@@ -5,12 +5,14 @@ import voluptuous as vol
 
 from homeassistant import exceptions
 import homeassistant.helpers.config_validation as cv
-from homeassistant.config_entries import ConfigFlow
+from homeassistant.core import callback
+from homeassistant.config_entries import ConfigFlow, ConfigEntry, OptionsFlow
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.const import CONF_BASE
-from .const import DOMAIN, CONF_NAME
+from .const import DOMAIN, CONF_NAME, OPT_WORKER
 
 from .koolnova.operations import Operations
+from .koolnova.transport import TransportSettingsError
 from .koolnova.const import (
     DEFAULT_MODE,
     DEFAULT_TCP_ADDR,
@@ -23,7 +25,6 @@ from .koolnova.const import (
     DEFAULT_PARITY,
     DEFAULT_STOPBITS,
     DEFAULT_BYTESIZE,
-    NB_ZONE_MAX
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -39,6 +40,14 @@ class KoolnovaConfigFlow(ConfigFlow, domain=DOMAIN):
     # le dictionnaire qui va recevoir tous les user_input. On le vide au démarrage
     _user_inputs: dict = {}
     _conn = None
+    # zones enregistrées dans le système, lues en une fois
+    _discovered: list = []
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """ Options de l'intégration """
+        return KoolnovaOptionsFlow(config_entry)
 
     async def async_step_user(self,
                             user_input: dict | None = None) -> FlowResult:
@@ -94,34 +103,43 @@ class KoolnovaConfigFlow(ConfigFlow, domain=DOMAIN):
         if user_input:
             _LOGGER.debug("[config_flow|tcp] values received: {}".format(user_input))
             self._user_inputs.update(user_input)
-            self._conn = Operations(mode="Modbus TCP",
-                                    timeout=self._user_inputs["Timeout"],
-                                    debug=self._user_inputs["Debug"],
-                                    addr=self._user_inputs["Address"],
-                                    port=self._user_inputs["Port"],
-                                    modbus=self._user_inputs["Modbus"],
-                                    retries=self._user_inputs["Retries"],
-                                    reco_delay_min=self._user_inputs["Reconnect_delay_min"],
-                                    reco_delay_max=self._user_inputs["Reconnect_delay_max"])
             try:
+                self._conn = Operations(mode="Modbus TCP",
+                                        timeout=self._user_inputs["Timeout"],
+                                        debug=self._user_inputs["Debug"],
+                                        addr=self._user_inputs["Address"],
+                                        port=self._user_inputs["Port"],
+                                        modbus=self._user_inputs["Modbus"],
+                                        retries=self._user_inputs["Retries"],
+                                        reco_delay_min=self._user_inputs["Reconnect_delay_min"],
+                                        reco_delay_max=self._user_inputs["Reconnect_delay_max"])
                 await self._conn.async_connect()
                 if not self._conn.connected():
                     raise CannotConnectError(reason="Client Modbus TCP not connected")
                 _LOGGER.debug("test communication with koolnova system")
                 ret, _ = await self._conn.async_system_status()
                 if not ret:
-                    self._conn.disconnect()
                     raise CannotConnectError(reason="Communication error")
-                self._conn.disconnect()
+                # every registered area in one read
+                self._discovered = await self._async_discover_areas()
 
-                self._user_inputs["areas"] = []
                 # go to next step
                 return await self.async_step_areas()
             except CannotConnectError:
                 _LOGGER.exception("Cannot connect to koolnova system")
                 errors[CONF_BASE] = "cannot_connect"
+            except NoAreaRegisteredError:
+                _LOGGER.exception("No area registered to the koolnova system")
+                errors[CONF_BASE] = "no_area_registered"
+            except TransportSettingsError:
+                _LOGGER.exception("Link already used by another koolnova system with other settings")
+                errors[CONF_BASE] = "link_settings"
             except Exception as e:
                 _LOGGER.exception("Config Flow generic error")
+            finally:
+                # the transport is shared by link, never leave it to a later flow or entry
+                if self._conn is not None:
+                    self._conn.disconnect()
 
         # first call or error
         return self.async_show_form(step_id="tcp", 
@@ -154,113 +172,116 @@ class KoolnovaConfigFlow(ConfigFlow, domain=DOMAIN):
             _LOGGER.debug("[config_flow|rtu] values received: {}".format(user_input))
             # Second call; On memorise les données dans le dictionnaire
             self._user_inputs.update(user_input)
-            self._conn = Operations(mode="Modbus RTU",
-                                    timeout=self._user_inputs["Timeout"],
-                                    debug=self._user_inputs["Debug"],
-                                    port=self._user_inputs["Device"],
-                                    addr=self._user_inputs["Address"],
-                                    baudrate=int(self._user_inputs["Baudrate"]),
-                                    parity=self._user_inputs["Parity"][0],
-                                    stopbits=self._user_inputs["Stopbits"],
-                                    bytesize=self._user_inputs["Sizebyte"])
             try:
+                self._conn = Operations(mode="Modbus RTU",
+                                        timeout=self._user_inputs["Timeout"],
+                                        debug=self._user_inputs["Debug"],
+                                        port=self._user_inputs["Device"],
+                                        addr=self._user_inputs["Address"],
+                                        baudrate=int(self._user_inputs["Baudrate"]),
+                                        parity=self._user_inputs["Parity"][0],
+                                        stopbits=self._user_inputs["Stopbits"],
+                                        bytesize=self._user_inputs["Sizebyte"])
                 await self._conn.async_connect()
                 if not self._conn.connected():
                     raise CannotConnectError(reason="Client Modbus RTU not connected")
                 #_LOGGER.debug("test communication with koolnova system")
                 ret, _ = await self._conn.async_system_status()
                 if not ret:
-                    self._conn.disconnect()
                     raise CannotConnectError(reason="Communication error")
-                self._conn.disconnect()
+                # every registered area in one read
+                self._discovered = await self._async_discover_areas()
 
-                self._user_inputs["areas"] = []
                 # go to next step
                 return await self.async_step_areas()
             except CannotConnectError:
                 _LOGGER.exception("Cannot connect to koolnova system")
                 errors[CONF_BASE] = "cannot_connect"
+            except NoAreaRegisteredError:
+                _LOGGER.exception("No area registered to the koolnova system")
+                errors[CONF_BASE] = "no_area_registered"
+            except TransportSettingsError:
+                _LOGGER.exception("Link already used by another koolnova system with other settings")
+                errors[CONF_BASE] = "link_settings"
             except Exception as e:
                 _LOGGER.exception("Config Flow generic error")
+            finally:
+                # the transport is shared by link, never leave it to a later flow or entry
+                if self._conn is not None:
+                    self._conn.disconnect()
 
         # first call or error
         return self.async_show_form(step_id="rtu", 
                                     data_schema=rtu_form,
                                     errors=errors)
 
+    async def _async_discover_areas(self) -> list:
+        """ Lecture en une fois de toutes les zones enregistrées dans le système """
+        try:
+            zones = await self._conn.async_discover_registered_areas()
+        except Exception as e:
+            raise CannotConnectError(reason="Areas discovery error") from e
+        _LOGGER.debug("Areas discovered: {}".format([zone['id'] for zone in zones]))
+        if not zones:
+            raise NoAreaRegisteredError(reason="No area registered")
+        return zones
+
     async def async_step_areas(self,
                                 user_input: dict | None = None) -> FlowResult:
-        """ Gestion de l'étape de découverte manuelle des zones """
+        """ Gestion de l'étape des zones découvertes.
+            Toutes les zones enregistrées sont proposées, sélectionnées et nommées par défaut.
+            Les zones retenues sont enregistrées dans la configEntry, le démarrage
+            n'a plus à les interroger une par une.
+        """
         errors = {}
-        default_id = 1
-        default_area_name = "Area 1"
-        # set default_id to the last id configured
-        # set default_area_name with the last id configured
-        for area in self._user_inputs["areas"]:
-            default_id = area['Area_id'] + 1
-            default_area_name = "Area " + str(default_id)
+        zone_ids = [str(zone['id']) for zone in self._discovered]
         zone_form = vol.Schema(
             {
-                vol.Required("Name", default=default_area_name): vol.Coerce(str),
-                vol.Required("Area_id", default=default_id): vol.Coerce(int),
-                vol.Optional("Other_area", default=False): cv.boolean
+                # the real temperature helps to recognise the zones
+                vol.Required("Areas", default=zone_ids): cv.multi_select({str(zone['id']): "Area {} ({} °C)".format(zone['id'], zone['real_temp'])
+                                                                            for zone in self._discovered}),
+                **{vol.Required("Name_" + zone_id, default="Area " + zone_id): vol.Coerce(str)
+                    for zone_id in zone_ids}
             }
         )
 
         if user_input:
             # second call
-            try:
-                # test if area_id is already configured
-                for area in self._user_inputs["areas"]:
-                    if user_input['Area_id'] == area['Area_id']:
-                        raise AreaAlreadySetError(reason="Area is already configured")
-                # Last area to configure or not ?
-                if not user_input['Other_area']:
-                    try:
-                        if not self._conn.connected():
-                            await self._conn.async_connect()
-                        if user_input['Area_id'] > NB_ZONE_MAX:
-                            raise ZoneIdError(reason="Area_id must be between 1 and 16")
-                        #_LOGGER.debug("test area registered with id: {}".format(user_input['Area_id']))
-                        # test if area is configured into koolnova system 
-                        ret, _ = await self._conn.async_area_registered(user_input["Area_id"])
-                        if not ret:
-                            self._conn.disconnect()
-                            raise AreaNotRegistredError(reason="Area Id is not registred")
-                    
-                        self._conn.disconnect()
-                        # Update dict
-                        self._user_inputs["areas"].append(user_input)
-                        # Create entities
-                        return self.async_create_entry(title=CONF_NAME, 
-                                                        data=self._user_inputs)
-                    except CannotConnectError:
-                        _LOGGER.exception("Cannot connect to koolnova system")
-                        errors[CONF_BASE] = "cannot_connect"
-                    except AreaNotRegistredError:
-                        _LOGGER.exception("Area (id:{}) is not registered to the koolnova system".format(user_input['Area_id']))
-                        errors[CONF_BASE] = "area_not_registered"
-                    except ZoneIdError:
-                        _LOGGER.exception("Area Id must be between 1 and 16")
-                        errors[CONF_BASE] = "zone_id_error"
-                    except Exception as e:
-                        _LOGGER.exception("Config Flow generic error")
-                else:
-                    #_LOGGER.debug("Config_flow [zone] - Une autre zone à configurer")
-                    # Update dict
-                    self._user_inputs["areas"].append(user_input)
-                    # New area to configure
-                    return await self.async_step_areas()
-            
-            except AreaAlreadySetError:
-                _LOGGER.exception("Area (id:{}) is already configured".format(user_input['Area_id']))
-                errors[CONF_BASE] = "area_already_configured"
+            self._user_inputs["areas"] = [{'Name': user_input["Name_" + zone_id], 'Area_id': int(zone_id)}
+                                            for zone_id in zone_ids if zone_id in user_input["Areas"]]
+            if self._user_inputs["areas"]:
+                # Create entities
+                return self.async_create_entry(title=CONF_NAME,
+                                                data=self._user_inputs)
+            errors[CONF_BASE] = "no_area_selected"
 
         # first call or error
         return self.async_show_form(step_id="areas", 
                                     data_schema=zone_form,
                                     errors=errors)
 
+class KoolnovaOptionsFlow(OptionsFlow):
+    """ Options d'une configEntry, l'entrée est rechargée quand elles changent """
+
+    def __init__(self, config_entry: ConfigEntry) -> None:
+        """ Class constructor """
+        self._entry = config_entry
+
+    async def async_step_init(self,
+                                user_input: dict | None = None) -> FlowResult:
+        """ Gestion de l'étape 'init' des options """
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options_form = vol.Schema(
+            {
+                # scrutation du contrôleur par un processus dédié
+                vol.Optional(OPT_WORKER, default=self._entry.options.get(OPT_WORKER, False)): cv.boolean
+            }
+        )
+        return self.async_show_form(step_id="init",
+                                    data_schema=options_form)
+
 class KnownError(exceptions.HomeAssistantError):
     """ Base class for errors known to this config flow
         [error_name] is the value passed to [errors] in async_show_form, which should match
@@ -287,14 +308,6 @@ class CannotConnectError(KnownError):
     """ Error to indicate we cannot connect """
     error_name = "cannot_connect"
 
-class AreaNotRegistredError(KnownError):
-    """ Error to indicate that area is not registered """
-    error_name = "area_not_registered"
-
-class AreaAlreadySetError(KnownError):
-    """ Error to indicate that the area is already configured """
-    error_name = "area_already_configured"
-
-class ZoneIdError(KnownError):
-    """ Error with the Zone_Id """
-    error_name = "zone_id_error"
\ No newline at end of file
+class NoAreaRegisteredError(KnownError):
+    """ Error to indicate that no area is registered """
+    error_name = "no_area_registered"
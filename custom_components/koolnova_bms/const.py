@@ -19,6 +19,9 @@ from .koolnova.const import (
     ZoneClimMode,
     ZoneFanMode,
     ZoneState,
+    POLL_FAST,
+    POLL_MEDIUM,
+    POLL_SLOW,
 )
 
 DOMAIN = "koolnova_bms"
@@ -34,6 +37,40 @@ DEVICE_MANUFACTURER = "koolnova"
 
 #MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=60)
 
+# Window (seconds) in which refresh and write confirmation requests are folded into one read
+REFRESH_COALESCE_WINDOW = 1.0
+
+# hass.data key of the fleet shared by every config entry
+FLEET = f"{DOMAIN}_fleet"
+
+# Option: poll the controller from a worker process (koolnova.workers.WorkerPool)
+OPT_WORKER = "Worker"
+# hass.data key of the worker pool shared by the entries with the worker option
+WORKERS = f"{DOMAIN}_workers"
+
+# Storage of the last known registers of each config entry
+STORAGE_VERSION = 1
+# Delay (seconds) folding the saves of the registers into one write
+STORAGE_SAVE_DELAY = 10
+# Delays (seconds) between two attempts to connect and read a controller, doubled after
+# each failure like the retries of a config entry not ready
+CONNECT_RETRY_DELAY_MIN = 5
+CONNECT_RETRY_DELAY_MAX = 80
+
+def _reverse_translation(translation:dict) -> dict:
+    """ option -> register value, the first value wins when several share an option """
+    reverse = {}
+    for value, option in translation.items():
+        reverse.setdefault(option, value)
+    return reverse
+
+# Polling interval of each register group
+POLL_INTERVALS = {
+    POLL_FAST: timedelta(seconds=10),
+    POLL_MEDIUM: timedelta(seconds=30),
+    POLL_SLOW: timedelta(minutes=5),
+}
+
 GLOBAL_MODE_POS_1 = "cold"
 GLOBAL_MODE_POS_2 = "heat"
 GLOBAL_MODE_POS_3 = "heating floor"
@@ -48,6 +85,8 @@ GLOBAL_MODE_TRANSLATION = {
     int(GlobalMode.HEATING_FLOOR_2): GLOBAL_MODE_POS_5,
 }
 
+GLOBAL_MODE_REVERSE = _reverse_translation(GLOBAL_MODE_TRANSLATION)
+
 GLOBAL_MODES = [
     GLOBAL_MODE_POS_1,
     GLOBAL_MODE_POS_2,
@@ -70,6 +109,8 @@ EFF_TRANSLATION = {
     int(Efficiency.HIGHER_EFF): EFF_POS_5,
 }
 
+EFF_REVERSE = _reverse_translation(EFF_TRANSLATION)
+
 EFF_MODES = [
     EFF_POS_1,
     EFF_POS_2,
@@ -90,6 +131,8 @@ ENGINE_FLOW_TRANSLATION = {
     int(FlowEngine.AUTO): ENGINE_FLOW_POS_4,
 }
 
+ENGINE_FLOW_REVERSE = _reverse_translation(ENGINE_FLOW_TRANSLATION)
+
 ENGINE_FLOW_MODES = [
     ENGINE_FLOW_POS_1,
     ENGINE_FLOW_POS_2,
@@ -119,6 +162,8 @@ HVAC_TRANSLATION = {
     int(ZoneClimMode.HEATING_FLOOR_2): HVACMode.HEAT,
 }
 
+HVAC_REVERSE = _reverse_translation(HVAC_TRANSLATION)
+
 #FAN_MODE_1 = "1 Off"
 #FAN_MODE_2 = "2 Low"
 #FAN_MODE_3 = "3 Medium"
@@ -132,6 +177,8 @@ FAN_TRANSLATION = {
     int(ZoneFanMode.FAN_HIGH): FAN_HIGH,
 }
 
+FAN_REVERSE = _reverse_translation(FAN_TRANSLATION)
+
 SUPPORTED_FAN_MODES = [
     FAN_AUTO,
     FAN_OFF,
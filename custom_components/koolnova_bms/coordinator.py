@@ -1,12 +1,15 @@
 """ for Coordinator integration. """
 from __future__ import annotations
 from datetime import timedelta
+import asyncio
 import logging
 
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import ATTR_RESTORED
 from homeassistant.util import Throttle
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.debounce import Debouncer
 
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
@@ -16,26 +19,210 @@ from homeassistant.helpers.update_coordinator import (
 
 from .const import (
     DOMAIN,
+    POLL_INTERVALS,
+    REFRESH_COALESCE_WINDOW,
 )
 
-from .koolnova.device import Koolnova
+from .koolnova.device import Koolnova, UpdateValueError
+from .koolnova.fleet import Fleet
+from .store import KoolnovaStore
 
 _LOGGER = logging.getLogger(__name__)
 
+# listener context of the diagnostic statistics: woken on every dispatch, not counted
+STATS_CONTEXT = object()
+
 class KoolnovaCoordinator(DataUpdateCoordinator):
     """ koolnova coordinator """
 
     def __init__(self,
                     hass: HomeAssistant, 
                     device: Koolnova,
+                    group: str,
+                    fleet: Fleet,
+                    store: KoolnovaStore | None = None,
+                    refresh_window: float = REFRESH_COALESCE_WINDOW,
                 ) -> None:
         """ Class constructor """
         super().__init__(
             hass,
             _LOGGER,
             # Name of the data. For logging purposes.
-            name=DOMAIN,
-            update_method=device.async_update_all_areas,
-            # Polling interval. Will only be polled if there are subscribers.
-            update_interval=timedelta(seconds=30),
-        )
\ No newline at end of file
+            name=f"{DOMAIN}-{device.name}-{group}",
+            # Polling interval of the register group. Will only be polled if there are subscribers.
+            update_interval=POLL_INTERVALS[group],
+            # refresh requests inside the window or during a refresh fold into one
+            request_refresh_debouncer=Debouncer(hass, _LOGGER, cooldown=refresh_window, immediate=False),
+        )
+        self._device = device
+        self._group = group
+        self._fleet = fleet
+        self._store = store
+        # the first poll is delayed at random so coordinators of the fleet do not fire together
+        self._start_delay: float | None = fleet.start_delay()
+        # registers written since the last confirmation read
+        self._confirm_registers: set = set()
+        self._confirm_debouncer = Debouncer(hass,
+                                            _LOGGER,
+                                            cooldown=refresh_window,
+                                            immediate=False,
+                                            function=self._async_confirm_writes)
+        # listeners woken or skipped by the dispatches of the coordinator
+        self._dispatches: int = 0
+        self._woken: int = 0
+        self._skipped: int = 0
+        self._last_available: bool = True
+        self._last_ready: bool = device.ready
+        self._last_restored: bool = device.restored
+
+    @property
+    def group(self) -> str:
+        """ register group polled by the coordinator """
+        return self._group
+
+    @property
+    def dispatch_stats(self) -> dict:
+        """ listeners woken and skipped by the dispatches """
+        return {'dispatches': self._dispatches,
+                'woken': self._woken,
+                'skipped': self._skipped}
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """ wake the listeners whose watched fields changed
+
+            Listener contexts are the fields they watch (see koolnova.image.watch),
+            listeners without context are always woken. Diagnostic statistics
+            (STATS_CONTEXT) are refreshed on every dispatch and left out of the
+            woken and skipped counts. Every listener is woken when the availability
+            of the coordinator changes, when the first values are known, or when
+            the values restored from the previous run were replaced by values read. The registers are saved when they changed.
+        """
+        listeners = list(self._listeners.values())
+        available = self.last_update_success
+        ready = self._device.ready
+        restored = self._device.restored
+        wake_all = (available != self._last_available
+                    or ready != self._last_ready
+                    or restored != self._last_restored)
+        self._last_available = available
+        self._last_ready = ready
+        self._last_restored = restored
+        watched = set().union(*(context for _, context in listeners
+                                if context is not None and context is not STATS_CONTEXT))
+        changes = self._device.pop_changes(watched)
+        self._dispatches += 1
+        for update_callback, context in listeners:
+            if context is STATS_CONTEXT:
+                update_callback()
+            elif wake_all or context is None or not context.isdisjoint(changes):
+                self._woken += 1
+                update_callback()
+            else:
+                self._skipped += 1
+        if self._store is not None:
+            self._store.async_schedule_save()
+
+    async def _async_update_data(self) -> dict:
+        """ read the registers of the group """
+        if not self._device.loaded:
+            # the connection task of the entry does the first read of the controller
+            return self._device.data
+        if self._start_delay:
+            delay, self._start_delay = self._start_delay, None
+            await asyncio.sleep(delay)
+        data = await self._fleet.async_poll(self._device, self._group)
+        if data is None:
+            raise UpdateFailed(f"Error reading registers of polling group {self._group}")
+        return data
+
+    @callback
+    def async_confirm_write(self,
+                            registers: set,
+                            ) -> None:
+        """ confirm a write with a read of the touched registers, behind the write
+
+            Requests arriving inside the window, or while a confirmation read is
+            in flight, fold into one read of the union of their registers.
+        """
+        self._confirm_registers |= set(registers)
+        self.hass.async_create_task(self._confirm_debouncer.async_call())
+
+    async def _async_confirm_writes(self) -> None:
+        """ read back registers and notify entities, which roll back on mismatch """
+        registers = self._confirm_registers
+        self._confirm_registers = set()
+        if not registers:
+            return
+        if not await self._device.async_confirm(registers):
+            _LOGGER.warning("Write of registers {} not confirmed by the controller".format(sorted(registers)))
+        self.async_set_updated_data(self._device.data)
+
+    async def async_shutdown(self) -> None:
+        """ cancel pending confirmation reads """
+        self._confirm_debouncer.async_shutdown()
+        await super().async_shutdown()
+
+class KoolnovaEntity(CoordinatorEntity):
+    """ koolnova coordinator entity declaring the registers it reads
+
+        Registers are declared to the device while the entity is added to hass,
+        so disabled entities are left out of the poll. The watched fields are
+        the listener context: the entity is only woken when one of them changed.
+        Entities are unavailable until the first values are known, values
+        restored from the previous run are flagged until read.
+    """
+
+    _device: Koolnova
+
+    @property
+    def available(self) -> bool:
+        """ available once values were read or restored """
+        return super().available and self._device.ready
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """ flag values restored from the previous run """
+        if self._device.restored:
+            return {ATTR_RESTORED: True}
+        return None
+
+    def _watched_fields(self) -> frozenset | None:
+        """ fields whose changes wake the entity, None for every update """
+        return None
+
+    def _interest_registers(self) -> set:
+        """ registers read by the entity """
+        return set()
+
+    async def async_added_to_hass(self) -> None:
+        """ entity added: declare its registers """
+        self.coordinator_context = self._watched_fields()
+        await super().async_added_to_hass()
+        self._device.register_interest(self.unique_id, self._interest_registers())
+
+    async def async_will_remove_from_hass(self) -> None:
+        """ entity removed or disabled: drop its registers """
+        self._device.unregister_interest(self.unique_id)
+        await super().async_will_remove_from_hass()
+
+    def _async_optimistic(self,
+                            **attrs,
+                            ) -> None:
+        """ show the requested values before they are written """
+        for name, value in attrs.items():
+            setattr(self, name, value)
+        self.async_write_ha_state()
+
+    async def _async_write(self,
+                            write,
+                            registers: set,
+                            ) -> None:
+        """ await a write shown optimistically: confirm it in background, or roll back a failed write """
+        try:
+            await write
+        except UpdateValueError:
+            # the device kept its values, show them again
+            self._handle_coordinator_update()
+            raise
+        self.coordinator.async_confirm_write(registers)
@@ -0,0 +1,171 @@
+""" decoding of Koolnova BMS register images """
+
+import logging as log
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional, images are then decoded with plain Python
+    np = None
+
+from . import const
+
+_LOGGER = log.getLogger(__name__)
+
+def _enum_table(enum) -> dict:
+    ''' register value -> Enum member '''
+    return {member.value: member for member in enum}
+
+ZONE_STATES = _enum_table(const.ZoneState)
+ZONE_REGISTERS = _enum_table(const.ZoneRegister)
+ZONE_FAN_MODES = _enum_table(const.ZoneFanMode)
+ZONE_CLIM_MODES = _enum_table(const.ZoneClimMode)
+FLOW_ENGINES = _enum_table(const.FlowEngine)
+GLOBAL_MODES = _enum_table(const.GlobalMode)
+EFFICIENCIES = _enum_table(const.Efficiency)
+SYS_STATES = _enum_table(const.SysState)
+
+# REG_LOCK_ZONE byte -> (ZoneRegister, ZoneState), None for an undefined field
+LOCK_ZONE_TABLE = tuple((ZONE_REGISTERS.get(byte >> 1), ZONE_STATES.get(byte & 0b01))
+                        for byte in range(256))
+# REG_STATE_AND_FLOW byte -> (ZoneFanMode, ZoneClimMode), None for an undefined field
+STATE_AND_FLOW_TABLE = tuple((ZONE_FAN_MODES.get((byte & 0xF0) >> 4), ZONE_CLIM_MODES.get(byte & 0x0F))
+                                for byte in range(256))
+
+def decode_lock_zone(reg:int) -> tuple:
+    ''' Decode a REG_LOCK_ZONE register into (ZoneRegister, ZoneState), None if undefined '''
+    if reg > 0xFF:
+        return None, None
+    return LOCK_ZONE_TABLE[reg]
+
+def decode_state_and_flow(reg:int) -> tuple:
+    ''' Decode a REG_STATE_AND_FLOW register into (ZoneFanMode, ZoneClimMode), None if undefined '''
+    if reg > 0xFF:
+        return None, None
+    return STATE_AND_FLOW_TABLE[reg]
+
+def _value_masks(table:dict) -> tuple:
+    ''' register byte -> bits holding a defined value (all or nothing) '''
+    return tuple(const.REG_FULL_MASK if byte in table else 0 for byte in range(256))
+
+# register byte -> bits holding defined fields, per register (None: every value is defined)
+_LOCK_ZONE_MASKS = tuple(const.REG_FULL_MASK if LOCK_ZONE_TABLE[byte][0] is not None else 0
+                            for byte in range(256))
+_STATE_AND_FLOW_MASKS = tuple((0xFFF0 if STATE_AND_FLOW_TABLE[byte][0] is not None else 0)
+                                | (0x000F if STATE_AND_FLOW_TABLE[byte][1] is not None else 0)
+                                for byte in range(256))
+VALID_MASKS = [None] * const.NB_REGISTERS
+for _zone_idx in range(const.NB_ZONE_MAX):
+    VALID_MASKS[const.REG_START_ZONE + const.NUM_REG_PER_ZONE * _zone_idx + const.REG_LOCK_ZONE] = _LOCK_ZONE_MASKS
+    VALID_MASKS[const.REG_START_ZONE + const.NUM_REG_PER_ZONE * _zone_idx + const.REG_STATE_AND_FLOW] = _STATE_AND_FLOW_MASKS
+for _engine_idx in range(const.NUM_OF_ENGINES):
+    VALID_MASKS[const.REG_START_FLOW_STATE_ENGINE + _engine_idx] = _value_masks(FLOW_ENGINES)
+VALID_MASKS[const.REG_GLOBAL_MODE] = _value_masks(GLOBAL_MODES)
+VALID_MASKS[const.REG_EFFICIENCY] = _value_masks(EFFICIENCIES)
+VALID_MASKS[const.REG_SYS_STATE] = _value_masks(SYS_STATES)
+VALID_MASKS = tuple(VALID_MASKS)
+
+def valid_mask(reg:int, val:int) -> int:
+    ''' Get the bits of a register value holding defined fields (0 if none) '''
+    masks = VALID_MASKS[reg]
+    if masks is None:
+        return const.REG_FULL_MASK
+    if val > 0xFF:
+        return 0
+    return masks[val]
+
+# decoded fields of the areas (N x NB_ZONE_MAX) and of the engines (N x NUM_OF_ENGINES)
+AREA_FIELDS = ('register', 'state', 'fan', 'clim', 'order_temp', 'real_temp')
+ENGINE_FIELDS = ('throughput', 'engine_state', 'engine_order_temp')
+# decoded fields of the system (N)
+SYSTEM_FIELDS = ('glob', 'eff', 'sys')
+
+def decode_images(images, use_numpy:bool = None) -> dict:
+    ''' Decode N register images (N x NB_REGISTERS uint16) in one pass
+
+        Return {field: values} with numpy arrays, or lists of lists without
+        numpy. Fields are plain integers and temperatures, Enum objects are
+        built on demand by area_values / engine_values / system_values.
+    '''
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        return _decode_images_numpy(images)
+    return _decode_images_python(images)
+
+def _decode_images_numpy(images) -> dict:
+    ''' Decode register images with numpy masks and shifts '''
+    images = np.asarray(images, dtype = np.uint16).reshape(-1, const.NB_REGISTERS)
+    zones = images[:, const.REG_START_ZONE:const.REG_START_ZONE + const.NB_ZONE_MAX * const.NUM_REG_PER_ZONE]
+    zones = zones.reshape(-1, const.NB_ZONE_MAX, const.NUM_REG_PER_ZONE)
+    lock = zones[:, :, const.REG_LOCK_ZONE]
+    flow = zones[:, :, const.REG_STATE_AND_FLOW]
+    return {
+        'register': lock >> 1,
+        'state': lock & 0b01,
+        'fan': (flow & 0xF0) >> 4,
+        'clim': flow & 0x0F,
+        'order_temp': zones[:, :, const.REG_TEMP_ORDER] / 2,
+        'real_temp': zones[:, :, const.REG_TEMP_REAL] / 2,
+        'throughput': images[:, const.REG_START_FLOW_ENGINE:const.REG_START_FLOW_ENGINE + const.NUM_OF_ENGINES],
+        'engine_state': images[:, const.REG_START_FLOW_STATE_ENGINE:const.REG_START_FLOW_STATE_ENGINE + const.NUM_OF_ENGINES],
+        'engine_order_temp': images[:, const.REG_START_ORDER_TEMP:const.REG_START_ORDER_TEMP + const.NUM_OF_ENGINES] / 2,
+        'glob': images[:, const.REG_GLOBAL_MODE],
+        'eff': images[:, const.REG_EFFICIENCY],
+        'sys': images[:, const.REG_SYS_STATE],
+    }
+
+def _decode_images_python(images) -> dict:
+    ''' Decode register images with plain Python, same layout as numpy '''
+    decoded = {field: [] for field in AREA_FIELDS + ENGINE_FIELDS + SYSTEM_FIELDS}
+    for image in images:
+        locks = image[const.REG_START_ZONE + const.REG_LOCK_ZONE:const.REG_START_ZONE + const.NB_ZONE_MAX * const.NUM_REG_PER_ZONE:const.NUM_REG_PER_ZONE]
+        flows = image[const.REG_START_ZONE + const.REG_STATE_AND_FLOW:const.REG_START_ZONE + const.NB_ZONE_MAX * const.NUM_REG_PER_ZONE:const.NUM_REG_PER_ZONE]
+        orders = image[const.REG_START_ZONE + const.REG_TEMP_ORDER:const.REG_START_ZONE + const.NB_ZONE_MAX * const.NUM_REG_PER_ZONE:const.NUM_REG_PER_ZONE]
+        reals = image[const.REG_START_ZONE + const.REG_TEMP_REAL:const.REG_START_ZONE + const.NB_ZONE_MAX * const.NUM_REG_PER_ZONE:const.NUM_REG_PER_ZONE]
+        decoded['register'].append([reg >> 1 for reg in locks])
+        decoded['state'].append([reg & 0b01 for reg in locks])
+        decoded['fan'].append([(reg & 0xF0) >> 4 for reg in flows])
+        decoded['clim'].append([reg & 0x0F for reg in flows])
+        decoded['order_temp'].append([reg / 2 for reg in orders])
+        decoded['real_temp'].append([reg / 2 for reg in reals])
+        decoded['throughput'].append(list(image[const.REG_START_FLOW_ENGINE:const.REG_START_FLOW_ENGINE + const.NUM_OF_ENGINES]))
+        decoded['engine_state'].append(list(image[const.REG_START_FLOW_STATE_ENGINE:const.REG_START_FLOW_STATE_ENGINE + const.NUM_OF_ENGINES]))
+        decoded['engine_order_temp'].append([reg / 2 for reg in image[const.REG_START_ORDER_TEMP:const.REG_START_ORDER_TEMP + const.NUM_OF_ENGINES]])
+        decoded['glob'].append(image[const.REG_GLOBAL_MODE])
+        decoded['eff'].append(image[const.REG_EFFICIENCY])
+        decoded['sys'].append(image[const.REG_SYS_STATE])
+    return decoded
+
+def registered_areas(decoded:dict, row:int = 0) -> list:
+    ''' Get the ids of the areas registered in an image '''
+    return [zone_idx + 1 for zone_idx, reg in enumerate(decoded['register'][row])
+            if int(reg) == int(const.ZoneRegister.REGISTER_ON)]
+
+def area_values(decoded:dict, row:int, zone_id:int) -> dict:
+    ''' Build the values of an area of an image, with Enum objects (None if undefined) '''
+    idx = zone_id - 1
+    return {'state': ZONE_STATES.get(int(decoded['state'][row][idx])),
+            'register': ZONE_REGISTERS.get(int(decoded['register'][row][idx])),
+            'fan': ZONE_FAN_MODES.get(int(decoded['fan'][row][idx])),
+            'clim': ZONE_CLIM_MODES.get(int(decoded['clim'][row][idx])),
+            'order_temp': float(decoded['order_temp'][row][idx]),
+            'real_temp': float(decoded['real_temp'][row][idx])}
+
+def engine_values(decoded:dict, row:int, engine_id:int) -> dict:
+    ''' Build the values of an engine of an image, with Enum objects (None if undefined) '''
+    idx = engine_id - 1
+    return {'throughput': int(decoded['throughput'][row][idx]),
+            'state': FLOW_ENGINES.get(int(decoded['engine_state'][row][idx])),
+            'order_temp': float(decoded['engine_order_temp'][row][idx])}
+
+def system_values(decoded:dict, row:int = 0) -> dict:
+    ''' Build the system values of an image, with Enum objects (None if undefined) '''
+    return {'glob': GLOBAL_MODES.get(int(decoded['glob'][row])),
+            'eff': EFFICIENCIES.get(int(decoded['eff'][row])),
+            'sys': SYS_STATES.get(int(decoded['sys'][row]))}
+
+def as_lists(decoded:dict) -> dict:
+    ''' Convert decoded fields to plain lists (to compare both decoders) '''
+    return {field: values.tolist() if hasattr(values, 'tolist') else values
+            for field, values in decoded.items()}
@@ -18,6 +18,56 @@ DEFAULT_PARITY = 'E'
 DEFAULT_STOPBITS = 1
 DEFAULT_BYTESIZE = 8
 
+# Espacement entre trames (secondes)
+# Au delà de 19200 bauds, la norme Modbus RTU fixe le silence t3.5 à 1.75ms
+RTU_T35_FIXED = 0.00175
+RTU_T35_BAUDRATE_LIMIT = 19200
+# Plancher de l'espacement en Modbus TCP (passerelle EW11)
+PACING_TCP_MIN_GAP = 0.01
+# Part du temps de réponse mesuré de la passerelle ajouté à l'espacement TCP
+PACING_TCP_RTT_FACTOR = 0.25
+# Espacement maximum après recul sur erreurs
+PACING_MAX_GAP = 1.0
+# Facteur de recul sur erreur et de retour vers l'espacement minimum sur succès
+PACING_BACKOFF_FACTOR = 2.0
+PACING_RECOVERY_FACTOR = 0.9
+
+# Classes de priorité de l'ordonnanceur du bus (valeur basse = plus prioritaire)
+PRIO_WRITE = 0
+PRIO_CONFIRM = 1
+PRIO_POLL = 2
+PRIO_DIAG = 3
+PRIORITY_NAMES = {
+    PRIO_WRITE: 'write',
+    PRIO_CONFIRM: 'confirm',
+    PRIO_POLL: 'poll',
+    PRIO_DIAG: 'diagnostic',
+}
+
+# Flotte de contrôleurs : nombre max de transactions simultanées toutes passerelles
+# confondues (une seule par passerelle), décalage aléatoire max (secondes) du premier
+# cycle de scrutation et nombre de mesures de latence conservées
+FLEET_MAX_TRANSACTIONS = 16
+FLEET_START_JITTER = 5.0
+FLEET_LATENCY_SAMPLES = 1000
+
+# Processus de scrutation : intervalle (secondes) entre deux lectures d'une passerelle,
+# envoi des statistiques toutes les N lectures, marge (secondes) avant de considérer
+# les registres reçus comme périmés et délai max d'arrêt d'un processus
+WORKER_POLL_INTERVAL = 10.0
+WORKER_STATS_EVERY = 10
+WORKER_STALE_MARGIN = 5.0
+WORKER_STOP_TIMEOUT = 5.0
+# Appel transmis à un processus : attente max en nombre de timeouts de la passerelle
+WORKER_CALL_TIMEOUTS = 3
+
+# Groupes de scrutation des registres
+# fast: consignes et états, medium: températures réelles et débits, slow: configuration et identité
+POLL_FAST = 'fast'
+POLL_MEDIUM = 'medium'
+POLL_SLOW = 'slow'
+POLL_GROUPS = (POLL_FAST, POLL_MEDIUM, POLL_SLOW)
+
 # Nombre de machines (AC1, AC2, AC3 et AC4)
 NUM_OF_ENGINES = 4
 # Nombre de registres par zone
@@ -144,6 +194,23 @@ class SysState(Enum):
 
 REG_GLOBAL_MODE = 81
 
+# Nombre total de registres de la table (0 -> 81)
+NB_REGISTERS = REG_GLOBAL_MODE + 1
+# Age maximum (secondes) d'un registre de l'image (lu ou écrit sur le bus) avant relecture
+SHADOW_MAX_AGE = 60.0
+# Age maximum (secondes) d'un registre de l'image pour ignorer l'écriture d'une
+# valeur déjà en place (intervalle de la scrutation la plus lente)
+WRITE_SUPPRESS_MAX_AGE = 300.0
+# Fenêtre (secondes) pendant laquelle les écritures d'un même registre sont regroupées
+WRITE_COALESCE_DELAY = 0.3
+# Masque d'écriture d'un registre complet
+REG_FULL_MASK = 0xFFFF
+# Nombre max de registres par requête Read Holding Registers (limite PDU Modbus)
+MAX_REGS_PER_READ = 125
+# Nombre max de registres inutilisés lus pour fusionner deux lectures en une seule
+# (2 octets par registre contre ~13 octets d'entête + silence inter-trame par transaction)
+READ_GAP_BRIDGE = 8
+
 class GlobalMode(Enum):
     COLD = 1
     HEAT = 2
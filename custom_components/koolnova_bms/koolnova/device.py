@@ -9,213 +9,14 @@ from ..const import DOMAIN
 
 from . import const
 from .operations import Operations, ModbusConnexionError
+from .image import RegisterImage, Area, Engine, NumUnitError, FlowEngineError, OrderTempError
+from . import image
+from . import snapshot
+from .snapshot import Snapshot
+from . import planner
 
 _LOGGER = log.getLogger(__name__)
 
-class Area:
-    ''' koolnova Area class '''
-
-    def __init__(self,
-                    name:str = "",
-                    id_zone:int = 0,
-                    state:const.ZoneState = const.ZoneState.STATE_OFF,
-                    register:const.ZoneRegister = const.ZoneRegister.REGISTER_OFF,
-                    fan_mode:const.ZoneFanMode = const.ZoneFanMode.FAN_OFF,
-                    clim_mode:const.ZoneClimMode = const.ZoneClimMode.OFF,
-                    real_temp:float = 0,
-                    order_temp:float = 0
-                ) -> None:
-        ''' Class constructor '''
-        self._name = name
-        self._id = id_zone
-        self._state = state
-        self._register = register
-        self._fan_mode = fan_mode
-        self._clim_mode = clim_mode
-        self._real_temp = real_temp
-        self._order_temp = order_temp
-
-    @property
-    def name(self) -> str:
-        ''' Get area name '''
-        return self._name
-
-    @name.setter
-    def name(self, name:str) -> None:
-        ''' Set area name '''
-        if not isinstance(name, str):
-            raise AssertionError('Input variable must be a string')
-        self._name = name
-
-    @property
-    def id_zone(self) -> int:
-        ''' Get area id '''
-        return self._id
-
-    @property
-    def state(self) -> const.ZoneState:
-        ''' Get state '''
-        return self._state
-
-    @state.setter
-    def state(self, val:const.ZoneState) -> None:
-        ''' Set state '''
-        if not isinstance(val, const.ZoneState):
-            raise AssertionError('Input variable must be Enum ZoneState')
-        self._state = val
-
-    @property
-    def register(self) -> const.ZoneRegister:
-        ''' Get register state '''
-        return self._register
-
-    @register.setter
-    def register(self, val:const.ZoneRegister) -> None:
-        ''' Set register state '''
-        if not isinstance(val, const.ZoneRegister):
-            raise AssertionError('Input variable must be Enum ZoneRegister')
-        self._register = val
-
-    @property
-    def fan_mode(self) -> const.ZoneFanMode:
-        ''' Get Fan Mode '''
-        return self._fan_mode
-
-    @fan_mode.setter
-    def fan_mode(self, val:const.ZoneFanMode) -> None:
-        ''' Set Fan Mode '''
-        if not isinstance(val, const.ZoneFanMode):
-            raise AssertionError('Input variable must be Enum ZoneFanMode')
-        self._fan_mode = val
-
-    @property
-    def clim_mode(self) -> const.ZoneClimMode:
-        ''' Get Clim Mode '''
-        return self._clim_mode
-
-    @clim_mode.setter
-    def clim_mode(self, val:const.ZoneClimMode) -> None:
-        ''' Set Clim Mode '''
-        if not isinstance(val, const.ZoneClimMode):
-            raise AssertionError('Input variable must be Enum ZoneClimMode')
-        self._clim_mode = val
-
-    @property
-    def real_temp(self) -> float:
-        ''' Get real temp '''
-        return self._real_temp
-
-    @real_temp.setter
-    def real_temp(self, val:float) -> None:
-        ''' Set Real Temp '''
-        if not isinstance(val, float):
-            raise AssertionError('Input variable must be Float')
-        self._real_temp = val
-
-    @property
-    def order_temp(self) -> float:
-        ''' Get order temp '''
-        return self._order_temp
-
-    @order_temp.setter
-    def order_temp(self, val:float) -> None:
-        ''' Set Order Temp '''
-        if not isinstance(val, float):
-            raise AssertionError('Input variable must be float')
-        if val > const.MAX_TEMP_ORDER or val < const.MIN_TEMP_ORDER:
-            raise OrderTempError('Order temp value must be between {} and {}'.format(const.MIN_TEMP_ORDER, const.MAX_TEMP_ORDER))
-        self._order_temp = val
-
-    def __repr__(self) -> str:
-        ''' repr method '''
-        return repr('Area(Name: {}, Id:{}, State:{}, Register:{}, Fan:{}, Clim:{}, Real Temp:{}, Order Temp:{})'.format(
-                        self._name,
-                        self._id, 
-                        self._state,
-                        self._register,
-                        self._fan_mode,
-                        self._clim_mode,
-                        self._real_temp,
-                        self._order_temp))
-
-class Engine:
-    ''' koolnova Engine class '''
-
-    def __init__(self,
-                    engine_id:int = 0,
-                    throughput:int = 0,
-                    state:const.FlowEngine = const.FlowEngine.AUTO,
-                    order_temp:float = 0
-                ) -> None:
-        ''' Constructor class '''
-        self._engine_id = engine_id
-        self._throughput = throughput
-        self._state = state
-        self._order_temp = order_temp
-
-    @property
-    def engine_id(self) -> int:
-        ''' Get Engine ID '''
-        return self._engine_id
-
-    @engine_id.setter
-    def engine_id(self, val:int) -> None:
-        ''' Set Engine ID '''
-        if not isinstance(val, int):
-            raise AssertionError('Input variable must be Int')
-        if val > const.NUM_OF_ENGINES:
-            raise NumUnitError('Engine ID must be lower than {}'.format(const.NUM_OF_ENGINES))
-        self._engine_id = val
-
-    @property
-    def throughput(self) -> int:
-        ''' Get throughput Engine '''
-        return self._throughput
-
-    @throughput.setter
-    def throughput(self, val:int) -> None:
-        ''' Set throughput Engine '''
-        if not isinstance(val, int):
-            raise AssertionError('Input variable must be Int')
-        if val > const.FLOW_ENGINE_VAL_MAX or val < const.FLOW_ENGINE_VAL_MIN:
-            raise FlowEngineError('throughput engine value ({}) must be between {} and {}'.format(val,
-                                    const.FLOW_ENGINE_VAL_MIN,
-                                    const.FLOW_ENGINE_VAL_MAX))
-        self._throughput = val
-
-    @property
-    def state(self) -> const.FlowEngine:
-        ''' Get Engine state '''
-        return self._state
-
-    @state.setter
-    def state(self, val:const.FlowEngine) -> None:
-        ''' Set Engine state '''
-        if not isinstance(val, const.FlowEngine):
-            raise AssertionError('Input variable must be Enum FlowEngine')
-        self._state = val
-
-    @property
-    def order_temp(self) -> float:
-        ''' Get Order Temp '''
-        return self._order_temp
-
-    @order_temp.setter
-    def order_temp(self, val:float = 0.0) -> None:
-        ''' Set order temp engine '''
-        if not isinstance(val, float):
-            raise AssertionError('Input variable must be Int')
-        if val > 0 and (val > 35.0 or val < 15.0):
-            raise OrderTempError('Flow Engine value ({}) must be between 15 and 35'.format(val))
-        self._order_temp = val
-
-    def __repr__(self) -> str:
-        ''' repr method '''
-        return repr('Unit(Id:{}, Throughput:{}, State:{}, Order Temp:{})'.format(self._engine_id,
-                        self._throughput,
-                        self._state,
-                        self._order_temp))
-
 class Koolnova:
     ''' koolnova Device class '''
 
@@ -272,13 +73,25 @@ class Koolnova:
                                         retries=self._tcp_retries,
                                         reco_delay_min=self._tcp_reco_delay_min,
                                         reco_delay_max=self._tcp_reco_delay_max)
+        elif self._mode == "Worker":
+            # thin view over the registers streamed by a worker process (workers.WorkerPool)
+            self._client = kwargs['client']
         else:
             raise InitialisationError('unknown mode ({})'.format(self._mode))
-        self._global_mode = const.GlobalMode.COLD
-        self._efficiency = const.Efficiency.LOWER_EFF
-        self._sys_state = const.SysState.SYS_STATE_OFF
-        self._engines = []
+        # registers of the controller, refreshed by the client, areas and engines are views over it
+        self._image:RegisterImage = self._client.image
+        # latest snapshot of the image published to the entities
+        self._snapshot = snapshot.from_image(self._image)
+        # fields changed by registers read and not yet dispatched, as (owner, id, field)
+        self._changes:set = set()
+        # values restored from a previous run, not read from the controller yet
+        self._restored:bool = False
+        # registers read from the controller at least once
+        self._loaded:bool = False
+        self._engines = [Engine(self._image, engine_id = idx) for idx in range(1, const.NUM_OF_ENGINES + 1)]
         self._areas = []
+        # registers read by each enabled entity (unique id -> registers)
+        self._interests:dict = {}
 
     def _area_defined(self, 
                         id_search:int = 0,
@@ -297,40 +110,90 @@ class Koolnova:
             _LOGGER.debug("idx found: {}".format(_idx))
         return True, _idx
 
+    def _all_registers(self) -> set:
+        """ registers of the configured areas, the engines and the system """
+        registers = set(planner.SYSTEM_REGISTERS)
+        for area in self._areas:
+            registers |= planner.area_registers(area.id_zone)
+        for engine_id in range(1, const.NUM_OF_ENGINES + 1):
+            registers |= planner.engine_registers(engine_id)
+        return registers
+
+    def _needed_registers(self) -> set:
+        """ registers the integration needs for a poll cycle """
+        if not self._interests:
+            # no entity declared its registers yet
+            return self._all_registers()
+        return set().union(*self._interests.values())
+
+    def register_interest(self,
+                            key:str,
+                            registers:set,
+                            ) -> None:
+        """ declare the registers read by an enabled entity """
+        self._interests[key] = set(registers)
+
+    def unregister_interest(self,
+                            key:str,
+                            ) -> None:
+        """ remove the registers of a removed or disabled entity """
+        self._interests.pop(key, None)
+
+    def _apply_registers(self, values:dict) -> None:
+        """ update areas, engines and system values from registers read
+
+            Registers read or written by the client are already in the image,
+            the changes accumulated since the last call are collected with them.
+        """
+        self._image.update(values)
+        self._changes |= image.changed_fields(self._image.pop_changed())
+
+    def pop_changes(self,
+                    watched:set,
+                    ) -> set:
+        """ fields changed among the watched ones, removed from the pending changes """
+        _changes = self._changes & watched
+        self._changes -= _changes
+        return _changes
+
     async def async_update(self) -> bool:
         ''' update values from modbus '''
-        _LOGGER.debug("Retreive system status ...")
-        ret, self._sys_state = await self._client.async_system_status()
+        _LOGGER.debug("Retreive system, global mode, efficiency and engines ...")
+        ret, values = await self._client.async_read_registers_set(self._all_registers())
         if not ret:
-            _LOGGER.error("Error retreiving system status")
-            self._sys_state = const.SysState.SYS_STATE_OFF
+            _LOGGER.error("Error retreiving system values")
             return False
+        self._apply_registers(values)
+        self._restored = False
+        self._loaded = True
+        return True
 
-        _LOGGER.debug("Retreive global mode ...")
-        ret, self._global_mode = await self._client.async_global_mode()
-        if not ret:
-            _LOGGER.error("Error retreiving global mode")
-            self._global_mode = const.GlobalMode.COLD
-            return False
+    def restore(self,
+                registers:list,
+                ) -> None:
+        """ seed the register image with the registers of a previous run """
+        self._apply_registers(dict(enumerate(registers[:const.NB_REGISTERS])))
+        self._restored = True
 
-        _LOGGER.debug("Retreive efficiency ...")
-        ret, self._efficiency = await self._client.async_efficiency()
-        if not ret:
-            _LOGGER.error("Error retreiving efficiency")
-            self._efficiency = const.Efficiency.LOWER_EFF
-            return False
-        
-        await asyncio.sleep(0.1)
-
-        _LOGGER.debug("Retreive engines ...")
-        for idx in range(1, const.NUM_OF_ENGINES + 1):
-            engine = Engine(engine_id = idx)
-            ret, engine.throughput = await self._client.async_engine_throughput(engine_id = idx)
-            ret, engine.state = await self._client.async_engine_state(engine_id = idx)
-            ret, engine.order_temp = await self._client.async_engine_order_temp(engine_id = idx)
-            self._engines.append(engine)
-            await asyncio.sleep(0.1)
-        return True
+    @property
+    def restored(self) -> bool:
+        """ values come from a previous run and were not read from the controller yet """
+        return self._restored
+
+    @property
+    def loaded(self) -> bool:
+        """ registers were read from the controller at least once """
+        return self._loaded
+
+    @property
+    def ready(self) -> bool:
+        """ values are known, read from the controller or restored from a previous run """
+        return self._loaded or self._restored
+
+    @property
+    def registers(self) -> list:
+        """ current register image """
+        return self._image.buffer.tolist()
 
     async def async_connect(self) -> bool:
         ''' connect to the modbus serial server '''
@@ -347,54 +210,53 @@ class Koolnova:
 
     def connected(self) -> bool:
         ''' get modbus client status '''
-        return self._client.connected
+        return self._client.connected()
 
     def disconnect(self) -> None:
-        ''' close the underlying socket connection '''
+        ''' release the modbus connection (closed when no other controller uses it) '''
         self._client.disconnect()
 
     async def async_discover_areas(self) -> None:
         ''' Set all registered areas for system '''
-        if not self._client.connected:
+        if not self._client.connected():
             raise ModbusConnexionError('Client Modbus not connected')
         zones_lst = await self._client.async_discover_registered_areas()
         for zone in zones_lst:
-            self._areas.append(Area(name = zone['name'],
-                                    id_zone = zone['id'],
-                                    state = zone['state'],
-                                    register = zone['register'],
-                                    fan_mode = zone['fan'],
-                                    clim_mode = zone['clim'],
-                                    real_temp = zone['real_temp'],
-                                    order_temp = zone['order_temp']
-                                    ))
+            # the discovery read refreshed the registers of the area in the image
+            self._apply_registers({reg: self._client.shadow_register(reg) for reg in planner.area_registers(zone['id'])})
+            # discovered zones carry no name
+            self.add_area(name = zone.get('name', "Area {}".format(zone['id'])),
+                            id_zone = zone['id'])
         return
 
     async def async_add_manual_registered_area(self,
                                                 name:str = "",
                                                 id_zone:int = 0) -> bool:
         ''' Add manual area to koolnova system '''
-        if not self._client.connected:
+        if not self._client.connected():
             raise ModbusConnexionError('Client Modbus not connected')
 
-        ret, zone_dict = await self._client.async_area_registered(zone_id = id_zone)
+        ret, values = await self._client.async_read_registers_set(planner.area_registers(id_zone))
         if not ret:
+            _LOGGER.error("Error reading zone with ID: {}".format(id_zone))
+            return False
+        self._apply_registers(values)
+        if Area(self._image, id_zone = id_zone).register != const.ZoneRegister.REGISTER_ON:
             _LOGGER.error("Zone with ID: {} is not registered".format(id_zone))
             return False
+        return self.add_area(name = name, id_zone = id_zone)
+
+    def add_area(self,
+                    name:str = "",
+                    id_zone:int = 0,
+                    ) -> bool:
+        ''' Add an area without reading it (values come from the register image) '''
         for zone in self._areas:
             if id_zone == zone.id_zone:
-                _LOGGER.error('Zone registered with ID: {} is already saved')
+                _LOGGER.error('Zone registered with ID: {} is already saved'.format(id_zone))
                 return False
-        
-        self._areas.append(Area(name = name,
-                                id_zone = id_zone,
-                                state = zone_dict['state'],
-                                register = zone_dict['register'],
-                                fan_mode = zone_dict['fan'],
-                                clim_mode = zone_dict['clim'],
-                                real_temp = zone_dict['real_temp'],
-                                order_temp = zone_dict['order_temp']
-                                ))
+
+        self._areas.append(Area(self._image, name = name, id_zone = id_zone))
         _LOGGER.debug("Areas registered: {}".format(self._areas))
         return True
 
@@ -409,70 +271,87 @@ class Koolnova:
 
     async def async_update_area(self, zone_id:int = 0) -> bool:
         """ update specific area from zone_id """
-        ret, infos = await self._client.async_area_registered(zone_id = zone_id)
+        _ret, _idx = self._area_defined(id_search = zone_id)
+        if not _ret:
+            _LOGGER.error("Area not defined ...")
+            return False, None
+        ret, values = await self._client.async_read_registers_set(planner.area_registers(zone_id))
         if not ret:
             _LOGGER.error("Error retreiving area ({}) values".format(zone_id))
             return ret, None
-        for idx, area in enumerate(self._areas):
-                if area.id_zone == zone_id:
-                    # update areas list values from modbus response
-                    self._areas[idx].state = infos['state']
-                    self._areas[idx].register = infos['register']
-                    self._areas[idx].fan_mode = infos['fan']
-                    self._areas[idx].clim_mode = infos['clim']
-                    self._areas[idx].real_temp = infos['real_temp']
-                    self._areas[idx].order_temp = infos['order_temp']
-                    break
-        return ret, self._areas[zone_id - 1]
-
-    async def async_update_all_areas(self) -> list:
+        self._apply_registers(values)
+        return ret, self._areas[_idx]
+
+    async def async_update_group(self,
+                                    group:str,
+                                    ) -> dict:
+        """ update the registers of a polling group """
+        _registers = {reg for reg in self._needed_registers() if planner.register_group(reg) == group}
+        # the slow group holds the identity and diagnostic registers, read behind the polls
+        _priority = const.PRIO_DIAG if group == const.POLL_SLOW else const.PRIO_POLL
+        _ret, _values = await self._client.async_read_registers_set(_registers, priority = _priority)
+        if not _ret:
+            _LOGGER.error("Error retreiving registers of polling group {}".format(group))
+            return None
+        self._apply_registers(_values)
+        return self.data
+
+    async def async_confirm(self,
+                            registers:set,
+                            ) -> bool:
+        """ read back written registers, True if the controller holds the written values """
+        _expected = {reg: self._client.shadow_register(reg) for reg in registers}
+        _ret, _values = await self._client.async_read_registers_set(registers, priority = const.PRIO_CONFIRM)
+        if not _ret:
+            _LOGGER.error("Error reading back registers {}".format(sorted(registers)))
+            return False
+        self._apply_registers(_values)
+        return all(_values.get(reg) == val for reg, val in _expected.items())
+
+    @property
+    def snapshot(self) -> Snapshot:
+        """ latest immutable snapshot of the registers
+
+            A new version is published when registers changed since the previous
+            one (poll or write), areas and engines that did not change keep the
+            same snapshot object.
+        """
+        self._snapshot = snapshot.evolve(self._snapshot, self._image, self._image.pop_dirty())
+        return self._snapshot
+
+    @property
+    def data(self) -> Snapshot:
+        """ latest areas, engines and system values """
+        return self.snapshot
+
+    async def async_update_all_areas(self) -> Snapshot:
         """ update all areas registered and all engines values """
-        ##### Areas
-        _ret, _vals = await self._client.async_areas_registered()
+        # registers needed this cycle, merged into as few reads as possible
+        _ret, _values = await self._client.async_read_registers_set(self._needed_registers())
         if not _ret:
-            _LOGGER.error("Error retreiving areas values")
+            _LOGGER.error("Error retreiving areas, engines and system values")
             return None
-        else:
-            for k,v in _vals.items():
-                for _idx, _area in enumerate(self._areas):
-                    if k == _area.id_zone:
-                        # update areas list values from modbus response
-                        self._areas[_idx].state = v['state']
-                        self._areas[_idx].register = v['register']
-                        self._areas[_idx].fan_mode = v['fan']
-                        self._areas[_idx].clim_mode = v['clim']
-                        self._areas[_idx].real_temp = v['real_temp']
-                        self._areas[_idx].order_temp = v['order_temp']
-
-        ##### Engines
-        for _idx in range(1, const.NUM_OF_ENGINES + 1):
-            ret, self._engines[_idx - 1].throughput = await self._client.async_engine_throughput(engine_id = _idx)
-            ret, self._engines[_idx - 1].state = await self._client.async_engine_state(engine_id = _idx)
-            ret, self._engines[_idx - 1].order_temp = await self._client.async_engine_order_temp(engine_id = _idx)
-
-        ##### Global mode
-        ret, self._global_mode = await self._client.async_global_mode()
-        if not ret:
-            _LOGGER.error("Error retreiving global mode")
-            self._global_mode = const.GlobalMode.COLD
+        self._apply_registers(_values)
+        return self.data
 
-        ##### Efficiency
-        ret, self._efficiency = await self._client.async_efficiency()
-        if not ret:
-            _LOGGER.error("Error retreiving efficiency")
-            self._efficiency = const.Efficiency.LOWER_EFF
+    @property
+    def inter_frame_gap(self) -> float:
+        ''' Get the inter-frame gap applied on the modbus transport (seconds) '''
+        return self._client.inter_frame_gap
 
-        ##### Sys state
-        ret, self._sys_state = await self._client.async_system_status()
-        if not ret:
-            _LOGGER.error("Error retreiving system status")
-            self._sys_state = const.SysState.SYS_STATE_OFF
+    @property
+    def queue_wait_stats(self) -> dict:
+        ''' Get the bus queue-wait statistics per priority class '''
+        return self._client.queue_wait_stats
+
+    def set_transaction_limiter(self, limiter) -> None:
+        ''' Bound the bus transactions by a limiter shared with other controllers '''
+        self._client.set_transaction_limiter(limiter)
 
-        return {"areas": self._areas, 
-                "engines": self._engines,
-                "glob": self._global_mode,
-                "eff": self._efficiency,
-                "sys": self._sys_state}
+    @property
+    def suppressed_writes(self) -> int:
+        ''' Get the number of writes skipped because the value was already in effect '''
+        return self._client.suppressed_writes
 
     @property
     def engines(self) -> list:
@@ -496,12 +375,13 @@ class Koolnova:
     async def async_set_engine_state(self,
                                     val:const.FlowEngine,
                                     engine_id: int,
+                                    force:bool = False,
                                     ) -> None:
-        ''' set engine flow from id '''
+        ''' set engine flow from id (force writes even if the value is already in effect) '''
         _LOGGER.debug("set engine (id:{}) flow : {}".format(engine_id, val))
         if not isinstance(val, const.FlowEngine):
             raise AssertionError('Input variable must be Enum FlowEngine')
-        ret = await self._client.async_set_engine_state(engine_id, val)
+        ret = await self._client.async_set_engine_state(engine_id, val, force = force)
         if not ret:
             _LOGGER.error("[GLOBAL] Error writing {} to modbus".format(val))
             raise UpdateValueError('Error writing to modbus updated value')
@@ -510,38 +390,40 @@ class Koolnova:
     @property
     def global_mode(self) -> const.GlobalMode:
         ''' Get Global Mode '''
-        return self._global_mode
+        return self._image.global_mode
 
     async def async_set_global_mode(self,
                                     val:const.GlobalMode,
+                                    force:bool = False,
                                     ) -> None:
-        ''' Set Global Mode '''
+        ''' Set Global Mode (force writes even if the value is already in effect) '''
         _LOGGER.debug("set global mode : {}".format(val))
         if not isinstance(val, const.GlobalMode):
             raise AssertionError('Input variable must be Enum GlobalMode')
-        ret = await self._client.async_set_global_mode(val)
+        ret = await self._client.async_set_global_mode(val, force = force)
         if not ret:
             _LOGGER.error("[GLOBAL] Error writing {} to modbus".format(val))
             raise UpdateValueError('Error writing to modbus updated value')
-        self._global_mode = val
+        self._image[const.REG_GLOBAL_MODE] = int(val)
 
     @property
     def efficiency(self) -> const.Efficiency:
         ''' Get Efficiency '''
-        return self._efficiency
+        return self._image.efficiency
 
     async def async_set_efficiency(self,
                                     val:const.Efficiency,
+                                    force:bool = False,
                                     ) -> None:
-        ''' Set Efficiency '''
+        ''' Set Efficiency (force writes even if the value is already in effect) '''
         _LOGGER.debug("set efficiency : {}".format(val))
         if not isinstance(val, const.Efficiency):
             raise AssertionError('Input variable must be Enum Efficiency')
-        ret = await self._client.async_set_efficiency(val)
+        ret = await self._client.async_set_efficiency(val, force = force)
         if not ret:
             _LOGGER.error("[EFF] Error writing {} to modbus".format(val))
             raise UpdateValueError('Error writing to modbus updated value')    
-        self._efficiency = val
+        self._image[const.REG_EFFICIENCY] = int(val)
 
     @property
     def debug(self) -> bool:
@@ -564,20 +446,21 @@ class Koolnova:
     @property
     def sys_state(self) -> const.SysState:
         ''' Get System State '''
-        return self._sys_state
+        return self._image.sys_state
 
     async def async_set_sys_state(self,
                                     val:const.SysState,
+                                    force:bool = False,
                                     ) -> None:
-        ''' Set System State '''
+        ''' Set System State (force writes even if the value is already in effect) '''
         if not isinstance(val, const.SysState):
             raise AssertionError('Input variable must be Enum SysState')
         _LOGGER.debug("set system state : {}".format(val))
-        ret = await self._client.async_set_system_status(val)
+        ret = await self._client.async_set_system_status(val, force = force)
         if not ret:
             _LOGGER.error("[SYS_STATE] Error writing {} to modbus".format(val))
             raise UpdateValueError('Error writing to modbus updated value') 
-        self._sys_state = val
+        self._image[const.REG_SYS_STATE] = int(val)
 
     async def async_get_area_temp(self,
                                     zone_id:int,
@@ -588,16 +471,17 @@ class Koolnova:
             _LOGGER.error("Area not defined ...")
             return False
 
-        ret, temp = await self._client.async_area_temp(id_zone = zone_id)
+        ret, values = await self._client.async_read_registers_set(planner.area_registers(zone_id))
         if not ret:
             _LOGGER.error("Error reading temp for area with ID: {}".format(zone_id))
             return False
-        self._areas[_idx].real_temp = temp
-        return temp
+        self._apply_registers(values)
+        return self._areas[_idx].real_temp
 
     async def async_set_area_target_temp(self,
                                         zone_id:int,
                                         temp:float,
+                                        force:bool = False,
                                         ) -> bool:
         """ set target temp of specific area """
         _ret, _idx = self._area_defined(id_search = zone_id)
@@ -605,7 +489,7 @@ class Koolnova:
             _LOGGER.error("Area not defined ...")
             return False
 
-        ret = await self._client.async_set_area_target_temp(zone_id = zone_id, val = temp)
+        ret = await self._client.async_set_area_target_temp(zone_id = zone_id, val = temp, force = force)
         if not ret:
             _LOGGER.error("Error writing target temp for area with ID: {}".format(zone_id))
             return False
@@ -621,15 +505,16 @@ class Koolnova:
             _LOGGER.error("Area not defined ...")
             return False
 
-        ret, temp = await self._client.async_area_target_temp(id_zone = zone_id)
+        ret, values = await self._client.async_read_registers_set(planner.area_registers(zone_id))
         if not ret:
             _LOGGER.error("Error reading target temp for area with ID: {}".format(zone_id))
             return 0.0
-        self._areas[_idx].order_temp = temp
-        return temp
+        self._apply_registers(values)
+        return self._areas[_idx].order_temp
 
     async def async_set_area_off(self,
                                 zone_id:int,
+                                force:bool = False,
                                 ) -> bool:
         """ set area off """
         _ret, _idx = self._area_defined(id_search = zone_id)
@@ -637,7 +522,7 @@ class Koolnova:
             _LOGGER.error("Area not defined ...")
             return False
 
-        ret = await self._client.async_set_area_state(id_zone = zone_id, val = const.ZoneState.STATE_OFF)
+        ret = await self._client.async_set_area_state(id_zone = zone_id, val = const.ZoneState.STATE_OFF, force = force)
         if not ret:
             _LOGGER.error("Error writing area state (STATE_OFF) for area with ID: {}".format(zone_id))
             return False
@@ -646,6 +531,7 @@ class Koolnova:
     
     async def async_set_area_on(self,
                                 zone_id:int,
+                                force:bool = False,
                                 ) -> bool:
         """ set area on """
         _ret, _idx = self._area_defined(id_search = zone_id)
@@ -653,7 +539,7 @@ class Koolnova:
             _LOGGER.error("Area not defined ...")
             return False
 
-        ret = await self._client.async_set_area_state(id_zone = zone_id, val = const.ZoneState.STATE_ON)
+        ret = await self._client.async_set_area_state(id_zone = zone_id, val = const.ZoneState.STATE_ON, force = force)
         if not ret:
             _LOGGER.error("Error writing area state (STATE_ON) for area with ID: {}".format(zone_id))
             return False
@@ -663,6 +549,7 @@ class Koolnova:
     async def async_set_area_clim_mode(self,
                                         zone_id:int, 
                                         mode:const.ZoneClimMode,
+                                        force:bool = False,
                                         ) -> bool:
         """ set climate mode for specific area """
         _ret, _idx = self._area_defined(id_search = zone_id)
@@ -672,7 +559,7 @@ class Koolnova:
 
         if mode == const.ZoneClimMode.OFF:
             _LOGGER.debug("Set area state to OFF")
-            ret = await self._client.async_set_area_state(id_zone = zone_id, val = const.ZoneState.STATE_OFF)
+            ret = await self._client.async_set_area_state(id_zone = zone_id, val = const.ZoneState.STATE_OFF, force = force)
             if not ret:
                 _LOGGER.error("Error writing area state for area with ID: {}".format(zone_id))
                 return False
@@ -681,13 +568,14 @@ class Koolnova:
             if self._areas[_idx].state == const.ZoneState.STATE_OFF:
                 _LOGGER.debug("Set area state to ON")
                 # update area state
-                ret = await self._client.async_set_area_state(id_zone = zone_id, val = const.ZoneState.STATE_ON)
+                ret = await self._client.async_set_area_state(id_zone = zone_id, val = const.ZoneState.STATE_ON, force = force)
                 if not ret:
                     _LOGGER.error("Error writing area state for area with ID: {}".format(zone_id))
                     return False
+                self._areas[_idx].state = const.ZoneState.STATE_ON
             _LOGGER.debug("clim mode ? {}".format(mode))
             # update clim mode
-            ret = await self._client.async_set_area_clim_mode(id_zone = zone_id, val = mode)
+            ret = await self._client.async_set_area_clim_mode(id_zone = zone_id, val = mode, force = force)
             if not ret:
                 _LOGGER.error("Error writing climate mode for area with ID: {}".format(zone_id))
                 return False
@@ -697,6 +585,7 @@ class Koolnova:
     async def async_set_area_fan_mode(self,
                                         zone_id:int, 
                                         mode:const.ZoneFanMode,
+                                        force:bool = False,
                                         ) -> bool:
         """ set fan mode for specific area """
         # test if area id is defined
@@ -711,7 +600,7 @@ class Koolnova:
         else:
             _LOGGER.debug("fan mode ? {}".format(mode))
             # writing new value to modbus
-            ret = await self._client.async_set_area_fan_mode(id_zone = zone_id, val = mode)
+            ret = await self._client.async_set_area_fan_mode(id_zone = zone_id, val = mode, force = force)
             if not ret:
                 _LOGGER.error("Error writing fan mode for area with ID: {}".format(zone_id))
                 return False
@@ -719,48 +608,84 @@ class Koolnova:
             self._areas[_idx].fan_mode = mode
         return True
 
+    async def async_apply_zones(self,
+                                zones:dict,
+                                sys_state:const.SysState = None,
+                                ) -> (bool, int):
+        """ apply a desired state to many areas with the fewest register writes
+
+            zones: {zone_id: {'state': ZoneState, 'clim': ZoneClimMode,
+                              'fan': ZoneFanMode, 'order_temp': float}}, every key optional.
+            sys_state: system state written with the areas, left as is if None.
+            The desired state is diffed against the register image, only
+            registers that change are written.
+            Return the status and the number of bus transactions used.
+        """
+        _stats = {'transactions': 0}
+        for zone_id in zones:
+            _ret, _ = self._area_defined(id_search = zone_id)
+            if not _ret:
+                _LOGGER.error("Area not defined ...")
+                return False, 0
+
+        # current register image, read once where it is stale
+        _registers = set()
+        if sys_state is not None:
+            _registers.add(const.REG_SYS_STATE)
+        for zone_id in zones:
+            _registers |= planner.area_registers(zone_id)
+        _current = {reg: self._client.shadow_register(reg) for reg in _registers}
+        _stale = {reg for reg, val in _current.items() if val is None}
+        if _stale:
+            _ret, _values = await self._client.async_read_registers_set(_stale,
+                                                                        priority = const.PRIO_WRITE,
+                                                                        stats = _stats)
+            if not _ret:
+                _LOGGER.error("Error reading areas before applying them")
+                return False, _stats['transactions']
+            _current.update(_values)
+
+        _writes:dict = {}
+        if sys_state is not None and int(sys_state) != _current[const.REG_SYS_STATE]:
+            _writes[const.REG_SYS_STATE] = int(sys_state)
+        for zone_id, desired in zones.items():
+            _lock_reg = planner.area_register(zone_id, const.REG_LOCK_ZONE)
+            _flow_reg = planner.area_register(zone_id, const.REG_STATE_AND_FLOW)
+            _order_reg = planner.area_register(zone_id, const.REG_TEMP_ORDER)
+            if 'state' in desired:
+                _val = (_current[_lock_reg] & ~0b01) | int(desired['state'])
+                if _val != _current[_lock_reg]:
+                    _writes[_lock_reg] = _val
+            _val = _current[_flow_reg]
+            if 'fan' in desired:
+                _val = (_val & ~0xF0) | ((int(desired['fan']) << 4) & 0xF0)
+            if 'clim' in desired:
+                _val = (_val & ~0x0F) | (int(desired['clim']) & 0x0F)
+            if _val != _current[_flow_reg]:
+                _writes[_flow_reg] = _val
+            if 'order_temp' in desired:
+                if desired['order_temp'] > const.MAX_TEMP_ORDER or desired['order_temp'] < const.MIN_TEMP_ORDER:
+                    raise OrderTempError('Order temp value must be between {} and {}'.format(const.MIN_TEMP_ORDER, const.MAX_TEMP_ORDER))
+                _val = int(desired['order_temp'] * 2)
+                if _val != _current[_order_reg]:
+                    _writes[_order_reg] = _val
+
+        _LOGGER.debug("apply zones, writes: {}".format({hex(reg): hex(val) for reg, val in _writes.items()}))
+        ret = True
+        if _writes:
+            ret = await self._client.async_write_registers(_writes, stats = _stats)
+            if not ret:
+                _LOGGER.error("Error writing areas")
+            else:
+                self._apply_registers(_writes)
+        return ret, _stats['transactions']
+
     def __repr__(self) -> str:
         ''' repr method '''
         return repr('System(Global Mode:{}, Efficiency:{}, State:{})'.format(
-                        self._global_mode,
-                        self._efficiency,
-                        self._sys_state))
-
-class NumUnitError(Exception):
-    ''' user defined exception '''
-
-    def __init__(self,
-                    msg:str = "") -> None:
-        ''' Class Constructor '''
-        self._msg = msg
-
-    def __str__(self):
-        ''' print the message '''
-        return self._msg
-
-class FlowEngineError(Exception):
-    ''' user defined exception '''
-
-    def __init__(self,
-                    msg:str = "") -> None:
-        ''' Class Constructor '''
-        self._msg = msg
-
-    def __str__(self):
-        ''' print the message '''
-        return self._msg
-
-class OrderTempError(Exception):
-    ''' user defined exception '''
-
-    def __init__(self,
-                    msg:str = "") -> None:
-        ''' Class Constructor '''
-        self._msg = msg
-
-    def __str__(self):
-        ''' print the message '''
-        return self._msg
+                        self._image.global_mode,
+                        self._image.efficiency,
+                        self._image.sys_state))
 
 class ClientNotConnectedError(Exception):
     ''' user defined exception '''
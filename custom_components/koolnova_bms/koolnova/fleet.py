@@ -0,0 +1,71 @@
+""" orchestration of many Koolnova BMS controllers """
+
+import time
+import random
+import collections
+import logging as log
+
+from . import const
+from .scheduler import PriorityLimiter
+
+_LOGGER = log.getLogger(__name__)
+
+class Fleet:
+    ''' koolnova fleet class
+
+        Polls controllers concurrently. Transactions of every link are bounded
+        by a shared limiter, each link still runs one transaction at a time
+        through its bus scheduler. Poll latencies are kept fleet-wide.
+    '''
+
+    def __init__(self,
+                    max_transactions:int = const.FLEET_MAX_TRANSACTIONS,
+                    start_jitter:float = const.FLEET_START_JITTER,
+                    samples:int = const.FLEET_LATENCY_SAMPLES,
+                    ) -> None:
+        ''' Class constructor '''
+        self._limiter = PriorityLimiter(max_transactions)
+        self._start_jitter = start_jitter
+        self._devices:dict = {}
+        self._latencies = collections.deque(maxlen = samples)
+
+    @property
+    def devices(self) -> dict:
+        ''' Get the controllers of the fleet '''
+        return self._devices
+
+    def add_device(self, key:str, device) -> None:
+        ''' Add a controller, its link joins the fleet-wide transaction limit '''
+        device.set_transaction_limiter(self._limiter)
+        self._devices[key] = device
+
+    def remove_device(self, key:str) -> None:
+        ''' Remove a controller '''
+        self._devices.pop(key, None)
+
+    def start_delay(self) -> float:
+        ''' Get a random delay spreading the first polls of the controllers '''
+        return random.uniform(0, self._start_jitter)
+
+    async def async_poll(self, device, group:str) -> dict:
+        ''' Poll a register group of a controller and record the latency '''
+        start = time.monotonic()
+        data = await device.async_update_group(group)
+        if data is not None:
+            self._latencies.append(time.monotonic() - start)
+        return data
+
+    @property
+    def latency_percentiles(self) -> dict:
+        ''' Get poll latency percentiles (milliseconds) '''
+        samples = sorted(self._latencies)
+        if not samples:
+            return {'count': 0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+        def _pct(pct:float) -> float:
+            idx = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+            return round(1000 * samples[idx], 2)
+        return {'count': len(samples),
+                'p50': _pct(50),
+                'p90': _pct(90),
+                'p99': _pct(99),
+                'max': round(1000 * samples[-1], 2)}
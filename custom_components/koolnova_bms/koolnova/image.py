@@ -0,0 +1,402 @@
+""" register image of a Koolnova BMS controller, with area and engine views """
+
+from array import array
+import logging as log
+import time
+
+from . import const
+from . import codec
+
+_LOGGER = log.getLogger(__name__)
+
+# registers whose zero value is undefined start from the controller defaults
+_DEFAULTS = {const.REG_GLOBAL_MODE: int(const.GlobalMode.COLD),
+                const.REG_EFFICIENCY: int(const.Efficiency.LOWER_EFF)}
+_DEFAULTS.update({const.REG_START_FLOW_STATE_ENGINE + idx: int(const.FlowEngine.AUTO)
+                    for idx in range(const.NUM_OF_ENGINES)})
+
+# owners of the decoded fields
+AREA = "area"
+ENGINE = "engine"
+SYSTEM = "system"
+
+AREA_FIELDS = ('state', 'register', 'fan', 'clim', 'order_temp', 'real_temp')
+ENGINE_FIELDS = ('throughput', 'state', 'order_temp')
+SYSTEM_FIELDS = ('glob', 'eff', 'sys')
+
+# register -> fields it holds, as (owner, id, field, bits)
+_REGISTER_FIELDS = [()] * const.NB_REGISTERS
+for _zone_id in range(1, const.NB_ZONE_MAX + 1):
+    _base = const.REG_START_ZONE + const.NUM_REG_PER_ZONE * (_zone_id - 1)
+    _REGISTER_FIELDS[_base + const.REG_LOCK_ZONE] = ((AREA, _zone_id, 'state', 0x0001),
+                                                    (AREA, _zone_id, 'register', 0xFFFE))
+    _REGISTER_FIELDS[_base + const.REG_STATE_AND_FLOW] = ((AREA, _zone_id, 'fan', 0xFFF0),
+                                                        (AREA, _zone_id, 'clim', 0x000F))
+    _REGISTER_FIELDS[_base + const.REG_TEMP_ORDER] = ((AREA, _zone_id, 'order_temp', const.REG_FULL_MASK),)
+    _REGISTER_FIELDS[_base + const.REG_TEMP_REAL] = ((AREA, _zone_id, 'real_temp', const.REG_FULL_MASK),)
+for _engine_id in range(1, const.NUM_OF_ENGINES + 1):
+    _REGISTER_FIELDS[const.REG_START_FLOW_ENGINE + _engine_id - 1] = ((ENGINE, _engine_id, 'throughput', const.REG_FULL_MASK),)
+    _REGISTER_FIELDS[const.REG_START_FLOW_STATE_ENGINE + _engine_id - 1] = ((ENGINE, _engine_id, 'state', const.REG_FULL_MASK),)
+    _REGISTER_FIELDS[const.REG_START_ORDER_TEMP + _engine_id - 1] = ((ENGINE, _engine_id, 'order_temp', const.REG_FULL_MASK),)
+_REGISTER_FIELDS[const.REG_GLOBAL_MODE] = ((SYSTEM, 0, 'glob', const.REG_FULL_MASK),)
+_REGISTER_FIELDS[const.REG_EFFICIENCY] = ((SYSTEM, 0, 'eff', const.REG_FULL_MASK),)
+_REGISTER_FIELDS[const.REG_SYS_STATE] = ((SYSTEM, 0, 'sys', const.REG_FULL_MASK),)
+_REGISTER_FIELDS = tuple(_REGISTER_FIELDS)
+
+def watch(owner:str, ident:int, fields:tuple) -> frozenset:
+    ''' Fields watched by a subscriber, as (owner, id, field) '''
+    return frozenset((owner, ident, field) for field in fields)
+
+def changed_fields(changed:dict) -> set:
+    ''' Fields touched by changed registers {register: changed bits}, as (owner, id, field) '''
+    return {(owner, ident, field)
+            for reg, bits in changed.items()
+            for owner, ident, field, mask in _REGISTER_FIELDS[reg]
+            if bits & mask}
+
+class RegisterImage:
+    ''' koolnova register image class
+
+        Holds every register of a controller in one array('H'), the single
+        source of truth of the areas, engines and system values. A poll
+        is one update of the buffer, values are decoded on access. Registers
+        changed since the last snapshot are kept (see pop_dirty), with the
+        bits changed since the last dispatch (see pop_changed). Registers
+        read or written on the bus are stamped, which gives the freshness
+        the client relies on to skip reads and writes (see fresh).
+    '''
+
+    __slots__ = ('_regs', '_ts', '_dirty', '_changed')
+
+    def __init__(self) -> None:
+        ''' Class constructor '''
+        self._regs = array('H', bytes(2 * const.NB_REGISTERS))
+        for reg, val in _DEFAULTS.items():
+            self._regs[reg] = val
+        # monotonic time each register was read or written on the bus, 0 if never
+        self._ts = array('d', bytes(8 * const.NB_REGISTERS))
+        self._dirty:set = set()
+        self._changed:dict = {}
+
+    def __getitem__(self, reg:int) -> int:
+        ''' Get a register value '''
+        return self._regs[reg]
+
+    def __setitem__(self, reg:int, val:int) -> None:
+        ''' Set a register value '''
+        if self._regs[reg] != val:
+            self._regs[reg] = val
+            self._dirty.add(reg)
+
+    def __len__(self) -> int:
+        ''' Number of registers '''
+        return len(self._regs)
+
+    def set_bits(self, reg:int, val:int, mask:int) -> None:
+        ''' Set the masked bits of a register '''
+        self[reg] = (self._regs[reg] & ~mask) | (val & mask)
+
+    def update(self,
+                values:dict,
+                ts:float = None,
+                ) -> dict:
+        ''' Update the image from registers read {register: value}
+
+            Undefined fields are logged and keep their previous value.
+            Registers come from the bus when ts is given, and are stamped with it.
+            Return the registers changed {register: changed bits}.
+        '''
+        regs = self._regs
+        changed = {}
+        for reg, val in values.items():
+            mask = codec.valid_mask(reg, val)
+            if mask != const.REG_FULL_MASK:
+                _LOGGER.warning("Invalid value {} for register {}, undefined fields skipped".format(val, reg))
+                val = (regs[reg] & ~mask) | (val & mask)
+            old = regs[reg]
+            if val != old:
+                regs[reg] = val
+                changed[reg] = old ^ val
+            if ts is not None:
+                self._ts[reg] = ts
+        self._dirty.update(changed)
+        for reg, bits in changed.items():
+            self._changed[reg] = self._changed.get(reg, 0) | bits
+        return changed
+
+    def fresh(self,
+                reg:int,
+                max_age:float,
+                ) -> int:
+        ''' Get a register read or written on the bus, None if never or older than max_age '''
+        ts = self._ts[reg]
+        if not ts or time.monotonic() - ts > max_age:
+            return None
+        return self._regs[reg]
+
+    def pop_changed(self) -> dict:
+        ''' Get and reset the registers changed since the last call {register: changed bits} '''
+        changed, self._changed = self._changed, {}
+        return changed
+
+    def pop_dirty(self) -> set:
+        ''' Get and reset the registers changed since the last call '''
+        dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    @property
+    def buffer(self) -> memoryview:
+        ''' Get a zero-copy view of the registers '''
+        return memoryview(self._regs)
+
+    @property
+    def global_mode(self) -> const.GlobalMode:
+        ''' Get Global Mode '''
+        return codec.GLOBAL_MODES[self._regs[const.REG_GLOBAL_MODE]]
+
+    @property
+    def efficiency(self) -> const.Efficiency:
+        ''' Get Efficiency '''
+        return codec.EFFICIENCIES[self._regs[const.REG_EFFICIENCY]]
+
+    @property
+    def sys_state(self) -> const.SysState:
+        ''' Get System State '''
+        return codec.SYS_STATES[self._regs[const.REG_SYS_STATE]]
+
+    def __repr__(self) -> str:
+        ''' repr method '''
+        return repr('RegisterImage({})'.format(list(self._regs)))
+
+class Area:
+    ''' koolnova Area class, view over the registers of an area in the image '''
+
+    __slots__ = ('_image', '_name', '_id', '_base')
+
+    def __init__(self,
+                    image:RegisterImage,
+                    name:str = "",
+                    id_zone:int = 0,
+                ) -> None:
+        ''' Class constructor '''
+        self._image = image
+        self._name = name
+        self._id = id_zone
+        self._base = const.REG_START_ZONE + const.NUM_REG_PER_ZONE * (id_zone - 1)
+
+    @property
+    def name(self) -> str:
+        ''' Get area name '''
+        return self._name
+
+    @name.setter
+    def name(self, name:str) -> None:
+        ''' Set area name '''
+        if not isinstance(name, str):
+            raise AssertionError('Input variable must be a string')
+        self._name = name
+
+    @property
+    def id_zone(self) -> int:
+        ''' Get area id '''
+        return self._id
+
+    @property
+    def state(self) -> const.ZoneState:
+        ''' Get state '''
+        return codec.LOCK_ZONE_TABLE[self._image[self._base + const.REG_LOCK_ZONE]][1]
+
+    @state.setter
+    def state(self, val:const.ZoneState) -> None:
+        ''' Set state '''
+        if not isinstance(val, const.ZoneState):
+            raise AssertionError('Input variable must be Enum ZoneState')
+        self._image.set_bits(self._base + const.REG_LOCK_ZONE, int(val), 0b01)
+
+    @property
+    def register(self) -> const.ZoneRegister:
+        ''' Get register state '''
+        return codec.LOCK_ZONE_TABLE[self._image[self._base + const.REG_LOCK_ZONE]][0]
+
+    @register.setter
+    def register(self, val:const.ZoneRegister) -> None:
+        ''' Set register state '''
+        if not isinstance(val, const.ZoneRegister):
+            raise AssertionError('Input variable must be Enum ZoneRegister')
+        self._image.set_bits(self._base + const.REG_LOCK_ZONE, int(val) << 1, 0xFE)
+
+    @property
+    def fan_mode(self) -> const.ZoneFanMode:
+        ''' Get Fan Mode '''
+        return codec.STATE_AND_FLOW_TABLE[self._image[self._base + const.REG_STATE_AND_FLOW]][0]
+
+    @fan_mode.setter
+    def fan_mode(self, val:const.ZoneFanMode) -> None:
+        ''' Set Fan Mode '''
+        if not isinstance(val, const.ZoneFanMode):
+            raise AssertionError('Input variable must be Enum ZoneFanMode')
+        self._image.set_bits(self._base + const.REG_STATE_AND_FLOW, int(val) << 4, 0xF0)
+
+    @property
+    def clim_mode(self) -> const.ZoneClimMode:
+        ''' Get Clim Mode '''
+        return codec.STATE_AND_FLOW_TABLE[self._image[self._base + const.REG_STATE_AND_FLOW]][1]
+
+    @clim_mode.setter
+    def clim_mode(self, val:const.ZoneClimMode) -> None:
+        ''' Set Clim Mode '''
+        if not isinstance(val, const.ZoneClimMode):
+            raise AssertionError('Input variable must be Enum ZoneClimMode')
+        self._image.set_bits(self._base + const.REG_STATE_AND_FLOW, int(val), 0x0F)
+
+    @property
+    def real_temp(self) -> float:
+        ''' Get real temp '''
+        return self._image[self._base + const.REG_TEMP_REAL] / 2
+
+    @real_temp.setter
+    def real_temp(self, val:float) -> None:
+        ''' Set Real Temp '''
+        if not isinstance(val, float):
+            raise AssertionError('Input variable must be Float')
+        self._image[self._base + const.REG_TEMP_REAL] = int(val * 2)
+
+    @property
+    def order_temp(self) -> float:
+        ''' Get order temp '''
+        return self._image[self._base + const.REG_TEMP_ORDER] / 2
+
+    @order_temp.setter
+    def order_temp(self, val:float) -> None:
+        ''' Set Order Temp '''
+        if not isinstance(val, float):
+            raise AssertionError('Input variable must be float')
+        if val > const.MAX_TEMP_ORDER or val < const.MIN_TEMP_ORDER:
+            raise OrderTempError('Order temp value must be between {} and {}'.format(const.MIN_TEMP_ORDER, const.MAX_TEMP_ORDER))
+        self._image[self._base + const.REG_TEMP_ORDER] = int(val * 2)
+
+    def __repr__(self) -> str:
+        ''' repr method '''
+        return repr('Area(Name: {}, Id:{}, State:{}, Register:{}, Fan:{}, Clim:{}, Real Temp:{}, Order Temp:{})'.format(
+                        self._name,
+                        self._id,
+                        self.state,
+                        self.register,
+                        self.fan_mode,
+                        self.clim_mode,
+                        self.real_temp,
+                        self.order_temp))
+
+class Engine:
+    ''' koolnova Engine class, view over the registers of an engine in the image '''
+
+    __slots__ = ('_image', '_engine_id', '_idx')
+
+    def __init__(self,
+                    image:RegisterImage,
+                    engine_id:int = 0,
+                ) -> None:
+        ''' Constructor class '''
+        self._image = image
+        self._engine_id = engine_id
+        self._idx = engine_id - 1
+
+    @property
+    def engine_id(self) -> int:
+        ''' Get Engine ID '''
+        return self._engine_id
+
+    @engine_id.setter
+    def engine_id(self, val:int) -> None:
+        ''' Set Engine ID '''
+        if not isinstance(val, int):
+            raise AssertionError('Input variable must be Int')
+        if val > const.NUM_OF_ENGINES:
+            raise NumUnitError('Engine ID must be lower than {}'.format(const.NUM_OF_ENGINES))
+        self._engine_id = val
+        self._idx = val - 1
+
+    @property
+    def throughput(self) -> int:
+        ''' Get throughput Engine '''
+        return self._image[const.REG_START_FLOW_ENGINE + self._idx]
+
+    @throughput.setter
+    def throughput(self, val:int) -> None:
+        ''' Set throughput Engine '''
+        if not isinstance(val, int):
+            raise AssertionError('Input variable must be Int')
+        if val > const.FLOW_ENGINE_VAL_MAX or val < const.FLOW_ENGINE_VAL_MIN:
+            raise FlowEngineError('throughput engine value ({}) must be between {} and {}'.format(val,
+                                    const.FLOW_ENGINE_VAL_MIN,
+                                    const.FLOW_ENGINE_VAL_MAX))
+        self._image[const.REG_START_FLOW_ENGINE + self._idx] = val
+
+    @property
+    def state(self) -> const.FlowEngine:
+        ''' Get Engine state '''
+        return codec.FLOW_ENGINES[self._image[const.REG_START_FLOW_STATE_ENGINE + self._idx]]
+
+    @state.setter
+    def state(self, val:const.FlowEngine) -> None:
+        ''' Set Engine state '''
+        if not isinstance(val, const.FlowEngine):
+            raise AssertionError('Input variable must be Enum FlowEngine')
+        self._image[const.REG_START_FLOW_STATE_ENGINE + self._idx] = int(val)
+
+    @property
+    def order_temp(self) -> float:
+        ''' Get Order Temp '''
+        return self._image[const.REG_START_ORDER_TEMP + self._idx] / 2
+
+    @order_temp.setter
+    def order_temp(self, val:float = 0.0) -> None:
+        ''' Set order temp engine '''
+        if not isinstance(val, float):
+            raise AssertionError('Input variable must be Int')
+        if val > 0 and (val > 35.0 or val < 15.0):
+            raise OrderTempError('Flow Engine value ({}) must be between 15 and 35'.format(val))
+        self._image[const.REG_START_ORDER_TEMP + self._idx] = int(val * 2)
+
+    def __repr__(self) -> str:
+        ''' repr method '''
+        return repr('Unit(Id:{}, Throughput:{}, State:{}, Order Temp:{})'.format(self._engine_id,
+                        self.throughput,
+                        self.state,
+                        self.order_temp))
+
+class NumUnitError(Exception):
+    ''' user defined exception '''
+
+    def __init__(self,
+                    msg:str = "") -> None:
+        ''' Class Constructor '''
+        self._msg = msg
+
+    def __str__(self):
+        ''' print the message '''
+        return self._msg
+
+class FlowEngineError(Exception):
+    ''' user defined exception '''
+
+    def __init__(self,
+                    msg:str = "") -> None:
+        ''' Class Constructor '''
+        self._msg = msg
+
+    def __str__(self):
+        ''' print the message '''
+        return self._msg
+
+class OrderTempError(Exception):
+    ''' user defined exception '''
+
+    def __init__(self,
+                    msg:str = "") -> None:
+        ''' Class Constructor '''
+        self._msg = msg
+
+    def __str__(self):
+        ''' print the message '''
+        return self._msg
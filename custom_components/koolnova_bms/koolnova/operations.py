@@ -3,6 +3,7 @@
 import re, sys, os
 import logging as log
 
+import time
 import asyncio
 
 from pymodbus import pymodbus_apply_logging_config
@@ -13,6 +14,11 @@ from pymodbus.pdu import ExceptionResponse
 from pymodbus.framer.rtu import FramerRTU
 
 from . import const
+from .pacing import Pacer
+from .transport import acquire_transport, release_transport
+from . import planner
+from . import codec
+from .image import RegisterImage
 
 _LOGGER = log.getLogger(__name__)
 
@@ -31,7 +37,6 @@ class Operations:
     _tcp_retries:int=const.DEFAULT_TCP_RETRIES
     _tcp_reco_delay_min:float=const.DEFAULT_TCP_RECO_DELAY
     _tcp_reco_delay_max:float=const.DEFAULT_TCP_RECO_DELAY_MAX
-    _lock = asyncio.Lock()
 
     def __init__(self, mode:str, timeout:int, debug:bool=False, **kwargs) -> None:
         ''' Class constructor '''
@@ -47,12 +52,6 @@ class Operations:
             self._rtu_parity = kwargs.get('parity', const.DEFAULT_PARITY)
             self._rtu_bytesize = kwargs.get('bytesize', const.DEFAULT_BYTESIZE)
             self._rtu_stopbits = kwargs.get('stopbits', const.DEFAULT_STOPBITS)
-            self._client = ModbusClient(port=self._rtu_port,
-                                        baudrate=self._rtu_baudrate,
-                                        parity=self._rtu_parity,
-                                        stopbits=self._rtu_stopbits,
-                                        bytesize=self._rtu_bytesize,
-                                        timeout=self._timeout)
         elif self._mode == 'Modbus TCP':
             self._tcp_port = kwargs.get('port',const.DEFAULT_TCP_PORT)
             self._tcp_addr = kwargs.get('addr',const.DEFAULT_TCP_ADDR)
@@ -60,33 +59,165 @@ class Operations:
             self._tcp_retries = kwargs.get('retries',const.DEFAULT_TCP_RETRIES)
             self._tcp_reco_delay_min = kwargs.get('reco_delay_min',const.DEFAULT_TCP_RECO_DELAY)
             self._tcp_reco_delay_max = kwargs.get('reco_delay_max',const.DEFAULT_TCP_RECO_DELAY_MAX)
-            self._client = ModbusTcpClient(host=self._tcp_addr,
-                                            port=self._tcp_port,
-                                            name="koolnovaTCP",
-                                            retries=self._tcp_retries,
-                                            reconnect_delay=self._tcp_reco_delay_min,
-                                            reconnect_delay_max=self._tcp_reco_delay_max,
-                                            timeout=self._timeout)
         else:
             raise InitialisationError('Mode ({}) not defined'.format(self._mode))
+        # registers read or written and when, the device owning the client decodes this image
+        self._image:RegisterImage = RegisterImage()
+        # maximum read span accepted by the controller, learned from exception responses
+        self._max_span:int = const.MAX_REGS_PER_READ
+        self._last_exception_code = None
+        # number of bus transactions issued
+        self._transactions:int = 0
+        # number of writes skipped because the register already held the value
+        self._suppressed_writes:int = 0
+        # pending writes per register address: [value, mask, future, force]
+        self._pending_writes:dict = {}
+        # single task writing the pending registers, and the batch it is writing
+        self._flush_task = None
+        self._flushing:dict = {}
+        # client, scheduler and pacer are shared with the controllers on the same link
+        self._transport = None
+        self._acquired:bool = False
+        self._acquire_transport()
         if self._debug:
             pymodbus_apply_logging_config("DEBUG")
 
-    async def __async_read_register(self, reg:int) -> (int, bool):
+    @property
+    def transport_key(self) -> str:
+        ''' Get the physical transport identifier (serial device or host:port) '''
+        if self._mode == 'Modbus RTU':
+            return self._rtu_port
+        return "{}:{}".format(self._tcp_addr, self._tcp_port)
+
+    def _new_client(self):
+        ''' Create the pymodbus client matching the transport configuration '''
+        if self._mode == 'Modbus RTU':
+            return ModbusClient(port=self._rtu_port,
+                                baudrate=self._rtu_baudrate,
+                                parity=self._rtu_parity,
+                                stopbits=self._rtu_stopbits,
+                                bytesize=self._rtu_bytesize,
+                                timeout=self._timeout)
+        return ModbusTcpClient(host=self._tcp_addr,
+                                port=self._tcp_port,
+                                name="koolnovaTCP",
+                                retries=self._tcp_retries,
+                                reconnect_delay=self._tcp_reco_delay_min,
+                                reconnect_delay_max=self._tcp_reco_delay_max,
+                                timeout=self._timeout)
+
+    def _line_settings(self) -> dict:
+        ''' Settings every controller of the link must share '''
+        if self._mode == 'Modbus RTU':
+            # the config entry stores the baudrate as a string
+            return {'baudrate': int(self._rtu_baudrate),
+                    'parity': self._rtu_parity,
+                    'bytesize': int(self._rtu_bytesize),
+                    'stopbits': int(self._rtu_stopbits)}
+        return {}
+
+    def _client_settings(self) -> dict:
+        ''' Settings of the client, those of the first controller of the link are used '''
+        if self._mode == 'Modbus RTU':
+            return {'timeout': self._timeout}
+        return {'timeout': self._timeout,
+                'retries': self._tcp_retries,
+                'reco_delay_min': self._tcp_reco_delay_min,
+                'reco_delay_max': self._tcp_reco_delay_max}
+
+    def _acquire_transport(self) -> None:
+        ''' Take a reference on the shared transport of the link '''
+        if self._acquired:
+            return
+        self._transport = acquire_transport(self.transport_key,
+                                            self._new_client,
+                                            self._new_pacer,
+                                            line_settings = self._line_settings(),
+                                            client_settings = self._client_settings())
+        self._acquired = True
+        self._client = self._transport.client
+        self._scheduler = self._transport.scheduler
+        self._pacer = self._transport.pacer
+
+    def set_transaction_limiter(self, limiter) -> None:
+        ''' Bound the transactions of the link by a limiter shared with other links '''
+        self._transport.limiter = limiter
+
+    @property
+    def queue_wait_stats(self) -> dict:
+        ''' Get the bus queue-wait statistics per priority class '''
+        return self._scheduler.queue_wait_stats
+
+    def _new_pacer(self) -> Pacer:
+        ''' Create the pacer matching the transport configuration '''
+        if self._mode == 'Modbus RTU':
+            return Pacer.for_rtu(baudrate=self._rtu_baudrate,
+                                    bytesize=self._rtu_bytesize,
+                                    parity=self._rtu_parity,
+                                    stopbits=self._rtu_stopbits)
+        return Pacer.for_tcp()
+
+    @property
+    def inter_frame_gap(self) -> float:
+        ''' Get the inter-frame gap the pacer settled on (seconds) '''
+        return self._pacer.gap
+
+    @property
+    def transactions(self) -> int:
+        ''' Get the number of bus transactions issued '''
+        return self._transactions
+
+    @property
+    def suppressed_writes(self) -> int:
+        ''' Get the number of writes skipped because the value was already in effect '''
+        return self._suppressed_writes
+
+    def _frame_done(self, rr, start:float) -> None:
+        ''' Report a transaction result to the pacer '''
+        self._transactions += 1
+        # a busy slave is a pacing issue, other exception responses are not
+        ok = rr is not None and \
+                (not isinstance(rr, ExceptionResponse) or rr.exception_code != ExceptionResponse.SLAVE_BUSY)
+        self._pacer.frame_done(ok, time.monotonic() - start)
+
+    @property
+    def image(self) -> RegisterImage:
+        ''' Get the register image refreshed by the reads and writes '''
+        return self._image
+
+    def _shadow_update(self, start_reg:int, regs:list) -> None:
+        ''' Refresh the register image from values read or written '''
+        self._image.update({idx: reg for idx, reg in enumerate(regs, start_reg) if 0 <= idx < const.NB_REGISTERS},
+                            ts = time.monotonic())
+
+    def shadow_register(self,
+                        reg:int,
+                        max_age:float = const.SHADOW_MAX_AGE,
+                        ) -> int:
+        ''' Get the value of a register, None if unknown or older than max_age '''
+        return self._image.fresh(reg, max_age)
+
+    async def __async_read_register(self,
+                                    reg:int,
+                                    priority:int = const.PRIO_POLL,
+                                    ) -> (int, bool):
         ''' Read one holding register (code 0x03) '''
-        async with Operations._lock:
+        async with self._transport.async_slot(priority, self._addr):
             rr = None
             if not self._client.connected:
                 raise ModbusConnexionError('Client Modbus not connected')
+            await self._pacer.async_wait()
+            start = time.monotonic()
             try:
-                await asyncio.sleep(0.3)
                 _LOGGER.debug("reading holding register: {} - Slave: {}".format(hex(reg), self._addr))
                 rr = await self._client.read_holding_registers(address=reg, count=1, slave=self._addr)
+                self._frame_done(rr, start)
                 if rr.isError():
                     _LOGGER.error("reading holding register error")
                     return None, False
             except Exception as e:
                 _LOGGER.error("Modbus Error: {}".format(e))
+                self._frame_done(None, start)
                 return None, False
 
             if isinstance(rr, ExceptionResponse):
@@ -95,23 +226,33 @@ class Operations:
             elif not rr:
                 _LOGGER.error("Response Null")
                 return None, False
+            self._shadow_update(reg, rr.registers[:1])
             return rr.registers[0], True
 
-    async def __async_read_registers(self, start_reg:int, count:int) -> (int, bool):
+    async def __async_read_registers(self,
+                                        start_reg:int,
+                                        count:int,
+                                        priority:int = const.PRIO_POLL,
+                                        ) -> (int, bool):
         ''' Read holding registers (code 0x03) '''
-        async with Operations._lock:
+        async with self._transport.async_slot(priority, self._addr):
             rr = None
             if not self._client.connected:
                 raise ModbusConnexionError('Client Modbus not connected')
+            await self._pacer.async_wait()
+            start = time.monotonic()
             try:
-                await asyncio.sleep(0.3)
                 _LOGGER.debug("reading holding registers: {} - count: {} - Slave: {}".format(hex(start_reg), count, self._addr))
+                self._last_exception_code = None
                 rr = await self._client.read_holding_registers(address=start_reg, count=count, slave=self._addr)
+                self._frame_done(rr, start)
                 if rr.isError():
+                    self._last_exception_code = getattr(rr, 'exception_code', None)
                     _LOGGER.error("reading holding registers error")
                     return None, False
             except Exception as e:
                 _LOGGER.error("{}".format(e))
+                self._frame_done(None, start)
                 return None, False
 
             if isinstance(rr, ExceptionResponse):
@@ -120,73 +261,175 @@ class Operations:
             elif not rr:
                 _LOGGER.error("Response Null")
                 return None, False
+            self._shadow_update(start_reg, rr.registers)
             return rr.registers, True
 
     async def __async_write_register(self, reg:int, val:int) -> bool:
         ''' Write one register (code 0x06) '''
-        async with Operations._lock:
+        async with self._transport.async_slot(const.PRIO_WRITE, self._addr):
             rq = None
             ret = True
             if not self._client.connected:
                 raise ModbusConnexionError('Client Modbus not connected')
+            await self._pacer.async_wait()
+            start = time.monotonic()
             try:
-                await asyncio.sleep(0.3)
                 _LOGGER.debug("writing single register: {} - Slave: {} - Val: {}".format(hex(reg), self._addr, hex(val)))
                 rq = await self._client.write_register(address=reg, value=val, slave=self._addr)
+                self._frame_done(rq, start)
                 if rq.isError():
                     _LOGGER.error("writing register error")
                     return False
             except Exception as e:
                 _LOGGER.error("{}".format(e))
+                self._frame_done(None, start)
                 return False
 
             if isinstance(rq, ExceptionResponse):
-                _LOGGER.error("Received modbus exception ({})".format(rr))
+                _LOGGER.error("Received modbus exception ({})".format(rq))
                 return False
-            return ret 
+            self._shadow_update(reg, [val])
+            return ret
+
+    async def __async_queue_write(self,
+                                    reg:int,
+                                    val:int,
+                                    mask:int = const.REG_FULL_MASK,
+                                    force:bool = False,
+                                    stats:dict = None,
+                                    ) -> bool:
+        ''' Queue a write (last writer wins), only the bits of mask are written
+
+            stats['transactions'] is increased by the transactions the flush
+            of the register used.
+        '''
+        loop = asyncio.get_running_loop()
+        pending = self._pending_writes.get(reg)
+        if pending is None:
+            # the future resolves to (status, transactions used)
+            pending = [0, 0, loop.create_future(), False]
+            self._pending_writes[reg] = pending
+        # merge the bit field into the pending value of the register
+        pending[0] = (pending[0] & ~mask) | (val & mask)
+        pending[1] |= mask
+        pending[3] |= force
+        if self._flush_task is None:
+            self._flush_task = loop.create_task(self.__async_flush_writes())
+        ret, transactions = await asyncio.shield(pending[2])
+        if stats is not None:
+            stats['transactions'] += transactions
+        return ret
+
+    async def __async_flush_writes(self) -> None:
+        ''' Write the pending registers after the coalescing window, one transaction per register
+
+            Writes queued while a batch is written wait for it, then for a new
+            window: batches never overlap, so the latest value is written last.
+        '''
+        try:
+            while self._pending_writes:
+                await asyncio.sleep(const.WRITE_COALESCE_DELAY)
+                self._flushing = self._pending_writes
+                self._pending_writes = {}
+                await self.__async_flush_batch(self._flushing)
+                self._flushing = {}
+        finally:
+            if self._flush_task is asyncio.current_task():
+                self._flush_task = None
+
+    async def __async_flush_batch(self, pending_writes:dict) -> None:
+        ''' Write a batch of pending registers '''
+        for reg, (val, mask, fut, force) in pending_writes.items():
+            try:
+                # skip the transaction when the latest known value already holds the bits
+                current = self.shadow_register(reg, max_age = const.WRITE_SUPPRESS_MAX_AGE)
+                if not force and current is not None and (current & mask) == (val & mask):
+                    _LOGGER.debug("register {} already holds {}, write suppressed".format(hex(reg), hex(val & mask)))
+                    self._suppressed_writes += 1
+                    fut.set_result((True, 0))
+                    continue
+                transactions = 0
+                if mask != const.REG_FULL_MASK:
+                    # combine the bit fields with the rest of the register
+                    base = self.shadow_register(reg)
+                    ret = base is not None
+                    if not ret:
+                        base, ret = await self.__async_read_register(reg, priority = const.PRIO_WRITE)
+                        transactions += 1
+                    if not ret:
+                        _LOGGER.error("Error reading register {} to merge bit fields".format(hex(reg)))
+                        fut.set_result((False, transactions))
+                        continue
+                    val = (base & ~mask) | (val & mask)
+                ret = await self.__async_write_register(reg = reg, val = val)
+                fut.set_result((ret, transactions + 1))
+            except Exception as e:
+                fut.set_exception(e)
+
+    async def async_write_registers(self,
+                                    values:dict,
+                                    stats:dict = None,
+                                    ) -> bool:
+        ''' Write registers {register: value} through the write queue
+
+            stats['transactions'] is increased by the transactions used by these writes.
+        '''
+        for reg in values:
+            if reg < 0 or reg >= const.NB_REGISTERS:
+                raise RegisterError('Register must be between 0 and {}'.format(const.NB_REGISTERS - 1))
+        rets = await asyncio.gather(*(self.__async_queue_write(reg = reg, val = val, stats = stats)
+                                        for reg, val in values.items()))
+        return all(rets)
 
     async def async_connect(self) -> None:
-        ''' connect to the modbus serial server '''
-        async with Operations._lock:
-            await self._client.connect()
+        ''' connect to the modbus serial server (shared with the other controllers of the link) '''
+        self._acquire_transport()
+        await self._transport.async_connect()
 
     def connected(self) -> bool:
         ''' get modbus client status '''
         return self._client.connected
 
     def disconnect(self) -> None:
-        ''' close the underlying socket connection '''
-        if self._client.connected:
-            self._client.close()
+        ''' release the shared transport, the last controller closes the connection
+
+            Writes not written yet fail.
+        '''
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        for _, _, fut, _ in list(self._flushing.values()) + list(self._pending_writes.values()):
+            if not fut.done():
+                fut.set_exception(ModbusConnexionError('Client Modbus disconnected'))
+        self._flushing = {}
+        self._pending_writes = {}
+        if self._acquired:
+            release_transport(self._transport)
+            self._acquired = False
+
+    @staticmethod
+    def _zones_image(regs:list) -> list:
+        ''' Register image holding the area registers read from REG_START_ZONE '''
+        image = [0] * const.NB_REGISTERS
+        image[const.REG_START_ZONE:const.REG_START_ZONE + len(regs)] = regs
+        return image
 
     async def async_discover_registered_areas(self) -> list:
         ''' Discover all areas registered to the system '''
         regs, ret = await self.__async_read_registers(start_reg=const.REG_START_ZONE, 
-                                                        count=const.NB_ZONE_MAX * const.NUM_REG_PER_ZONE)
+                                                        count=const.NB_ZONE_MAX * const.NUM_REG_PER_ZONE,
+                                                        priority=const.PRIO_DIAG)
         if not ret:
             raise ReadRegistersError("Read holding regsiter error")
+        _decoded = codec.decode_images([self._zones_image(regs)])
         zones_lst = []
-        zone_dict = {}
-        jdx = 1
-        flag = False
-        for idx, reg in enumerate(regs):
-            if idx % const.NUM_REG_PER_ZONE == 0:
-                zone_dict = {}
-                if const.ZoneRegister(reg >> 1) == const.ZoneRegister.REGISTER_ON:
-                    zone_dict['id'] = jdx
-                    zone_dict['state'] = const.ZoneState(reg & 0b01)
-                    zone_dict['register'] = const.ZoneRegister(reg >> 1)
-                    flag = True
-            elif idx % const.NUM_REG_PER_ZONE == 1 and flag:
-                zone_dict['fan'] = const.ZoneFanMode((reg & 0xF0) >> 4)
-                zone_dict['clim'] = const.ZoneClimMode(reg & 0x0F)
-            elif idx % const.NUM_REG_PER_ZONE == 2 and flag:
-                zone_dict['order_temp'] = reg/2
-            elif idx % const.NUM_REG_PER_ZONE == 3 and flag:
-                zone_dict['real_temp'] = reg/2
-                jdx += 1
-                flag = False
-                zones_lst.append(zone_dict)
+        for zone_id in codec.registered_areas(_decoded):
+            zone_dict = {'id': zone_id}
+            zone_dict.update(codec.area_values(_decoded, 0, zone_id))
+            if None in zone_dict.values():
+                _LOGGER.warning("Zone with id: {} has invalid values, skipped".format(zone_id))
+                continue
+            zones_lst.append(zone_dict)
         return zones_lst
 
     async def async_area_registered(self,
@@ -198,17 +441,23 @@ class Operations:
             raise ZoneIdError('Zone Id must be between 1 to {}'.format(const.NB_ZONE_MAX))
         zone_dict = {}
         regs, ret = await self.__async_read_registers(start_reg = const.REG_START_ZONE + (4 * (zone_id - 1)), 
-                                                count = const.NUM_REG_PER_ZONE)
+                                                count = const.NUM_REG_PER_ZONE,
+                                                priority = const.PRIO_DIAG)
         if not ret:
             raise ReadRegistersError("Error reading holding register")
-        if const.ZoneRegister(regs[0] >> 1) == const.ZoneRegister.REGISTER_OFF:
+        register, state = codec.decode_lock_zone(regs[0])
+        fan, clim = codec.decode_state_and_flow(regs[1])
+        if None in (register, state, fan, clim):
+            _LOGGER.error("Zone with id: {} has invalid values ({}, {})".format(zone_id, regs[0], regs[1]))
+            return False, {}
+        if register == const.ZoneRegister.REGISTER_OFF:
             _LOGGER.warning("Zone with id: {} is not registered".format(zone_id))
             return False, {}
 
-        zone_dict['state'] = const.ZoneState(regs[0] & 0b01)
-        zone_dict['register'] = const.ZoneRegister(regs[0] >> 1)
-        zone_dict['fan'] = const.ZoneFanMode((regs[1] & 0xF0) >> 4)
-        zone_dict['clim'] = const.ZoneClimMode(regs[1] & 0x0F)
+        zone_dict['state'] = state
+        zone_dict['register'] = register
+        zone_dict['fan'] = fan
+        zone_dict['clim'] = clim
         zone_dict['order_temp'] = regs[2]/2
         zone_dict['real_temp'] = regs[3]/2
         return True, zone_dict
@@ -218,25 +467,54 @@ class Operations:
         _areas_dict:dict = {}
         # retreive all areas (registered and unregistered)
         regs, ret = await self.__async_read_registers(start_reg = const.REG_START_ZONE, 
-                                                count = const.NUM_REG_PER_ZONE * const.NB_ZONE_MAX)
+                                                count = const.NUM_REG_PER_ZONE * const.NB_ZONE_MAX,
+                                                priority = const.PRIO_DIAG)
         if not ret:
             raise ReadRegistersError("Error reading holding register")
-        for area_idx in range(const.NB_ZONE_MAX):
-            _idx:int = 4 * area_idx
-            _area_dict:dict = {}
-            # test if area is registered or not
-            if const.ZoneRegister(regs[_idx + const.REG_LOCK_ZONE] >> 1) == const.ZoneRegister.REGISTER_OFF:
+        _decoded = codec.decode_images([self._zones_image(regs)])
+        for zone_id in codec.registered_areas(_decoded):
+            _area_dict = codec.area_values(_decoded, 0, zone_id)
+            if None in _area_dict.values():
+                _LOGGER.warning("Zone with id: {} has invalid values, skipped".format(zone_id))
                 continue
-
-            _area_dict['state'] = const.ZoneState(regs[_idx + const.REG_LOCK_ZONE] & 0b01)
-            _area_dict['register'] = const.ZoneRegister(regs[_idx + const.REG_LOCK_ZONE] >> 1)
-            _area_dict['fan'] = const.ZoneFanMode((regs[_idx + const.REG_STATE_AND_FLOW] & 0xF0) >> 4)
-            _area_dict['clim'] = const.ZoneClimMode(regs[_idx + const.REG_STATE_AND_FLOW] & 0x0F)
-            _area_dict['order_temp'] = regs[_idx + const.REG_TEMP_ORDER]/2
-            _area_dict['real_temp'] = regs[_idx + const.REG_TEMP_REAL]/2
-            _areas_dict[area_idx + 1] = _area_dict
+            _areas_dict[zone_id] = _area_dict
         return True, _areas_dict
 
+    @property
+    def max_span(self) -> int:
+        ''' Get the maximum read span accepted by the controller '''
+        return self._max_span
+
+    async def async_read_registers_set(self,
+                                        registers,
+                                        priority:int = const.PRIO_POLL,
+                                        stats:dict = None,
+                                        ) -> (bool, dict):
+        """ Read a set of registers through the range planner, return {register: value}
+
+            stats['transactions'] is increased by the reads issued.
+        """
+        values:dict = {}
+        spans = planner.plan_reads(registers, max_span = self._max_span)
+        while spans:
+            start_reg, count = spans.pop(0)
+            if stats is not None:
+                stats['transactions'] += 1
+            regs, ret = await self.__async_read_registers(start_reg = start_reg, count = count, priority = priority)
+            if not ret:
+                if count > 1 and self._last_exception_code in (ExceptionResponse.ILLEGAL_ADDRESS,
+                                                                ExceptionResponse.ILLEGAL_VALUE):
+                    # the controller refuses this span, learn a smaller one and plan again
+                    self._max_span = max(1, count // 2)
+                    _LOGGER.warning("Read span of {} registers refused, max span set to {}".format(count, self._max_span))
+                    spans = planner.plan_reads([reg for reg in registers if reg not in values],
+                                                max_span = self._max_span)
+                    continue
+                _LOGGER.error('Error reading registers from {} (count: {})'.format(hex(start_reg), count))
+                return False, values
+            values.update(enumerate(regs, start_reg))
+        return True, values
+
     async def async_set_debug(self, val:bool) -> bool:
         ''' Set/Reset Debug Mode '''
         if val:
@@ -255,9 +533,10 @@ class Operations:
 
     async def async_set_system_status(self,
                                         opt:const.SysState,
+                                        force:bool = False,
                                         ) -> bool:
         ''' Write system status '''
-        ret = await self.__async_write_register(reg = const.REG_SYS_STATE, val = int(opt))
+        ret = await self.__async_queue_write(reg = const.REG_SYS_STATE, val = int(opt), force = force)
         if not ret:
             _LOGGER.error('Error writing system status')
         return ret
@@ -272,9 +551,10 @@ class Operations:
 
     async def async_set_global_mode(self,
                                     opt:const.GlobalMode,
+                                    force:bool = False,
                                     ) -> bool:
         ''' Write global mode '''
-        ret = await self.__async_write_register(reg = const.REG_GLOBAL_MODE, val = int(opt))
+        ret = await self.__async_queue_write(reg = const.REG_GLOBAL_MODE, val = int(opt), force = force)
         if not ret:
             _LOGGER.error('Error writing global mode')
         return ret
@@ -289,9 +569,10 @@ class Operations:
 
     async def async_set_efficiency(self,
                                     opt:const.GlobalMode,
+                                    force:bool = False,
                                     ) -> bool:
         ''' Write efficiency '''
-        ret = await self.__async_write_register(reg = const.REG_EFFICIENCY, val = int(opt))
+        ret = await self.__async_queue_write(reg = const.REG_EFFICIENCY, val = int(opt), force = force)
         if not ret:
             _LOGGER.error('Error writing efficiency')
         return ret
@@ -300,7 +581,8 @@ class Operations:
         ''' read engines throughput AC1, AC2, AC3, AC4 '''
         engines_lst = []
         regs, ret = await self.__async_read_registers(const.REG_START_FLOW_ENGINE,
-                                                        const.NUM_OF_ENGINES)
+                                                        const.NUM_OF_ENGINES,
+                                                        priority = const.PRIO_DIAG)
         if ret:
             for idx, reg in enumerate(regs):
                 engines_lst.append(const.FlowEngine(reg))
@@ -314,7 +596,7 @@ class Operations:
         ''' read engine throughput specified by id '''
         if engine_id < 1 or engine_id > 4:
             raise UnitIdError("engine Id must be between 1 and 4")
-        reg, ret = await self.__async_read_register(const.REG_START_FLOW_ENGINE + (engine_id - 1))
+        reg, ret = await self.__async_read_register(const.REG_START_FLOW_ENGINE + (engine_id - 1), priority = const.PRIO_DIAG)
         if not ret:
             _LOGGER.error('Error retreive engine throughput for id:{}'.format(engine_id))
             reg = 0
@@ -335,11 +617,12 @@ class Operations:
     async def async_set_engine_state(self,
                                         engine_id:int = 0,
                                         opt:const.FlowEngine = const.FlowEngine.AUTO,
+                                        force:bool = False,
                                         ) -> bool:
         ''' write engine state specified by id '''
         if engine_id < 1 or engine_id > 4:
             raise UnitIdError("Engine id must be between 1 and 4")
-        reg, ret = await self.__async_write_register(reg = const.REG_START_FLOW_STATE_ENGINE + (engine_id - 1), val = int(opt))
+        ret = await self.__async_queue_write(reg = const.REG_START_FLOW_STATE_ENGINE + (engine_id - 1), val = int(opt), force = force)
         if not ret:
             _LOGGER.error('Error writing engine state for id:{}'.format(engine_id))
         return ret
@@ -350,7 +633,7 @@ class Operations:
         ''' read engine order temperature specified by id '''
         if engine_id < 1 or engine_id > 4:
             raise UnitIdError("Engine id must be between 1 and 4")
-        reg, ret = await self.__async_read_register(const.REG_START_ORDER_TEMP + (engine_id - 1))
+        reg, ret = await self.__async_read_register(const.REG_START_ORDER_TEMP + (engine_id - 1), priority = const.PRIO_DIAG)
         if not ret:
             _LOGGER.error('Error retreive engine order temp for id:{}'.format(engine_id))
             reg = 0
@@ -359,7 +642,7 @@ class Operations:
     async def async_engine_orders_temp(self) -> (bool, list):
         ''' read orders temperature for engines : AC1, AC2, AC3, AC4 '''
         engines_lst = []
-        regs, ret = await self.__async_read_registers(const.REG_START_ORDER_TEMP, const.NUM_OF_ENGINES)
+        regs, ret = await self.__async_read_registers(const.REG_START_ORDER_TEMP, const.NUM_OF_ENGINES, priority = const.PRIO_DIAG)
         if ret:
             for idx, reg in enumerate(regs):
                 engines_lst.append(reg/2)
@@ -370,6 +653,7 @@ class Operations:
     async def async_set_area_target_temp(self,
                                         zone_id:int = 0,
                                         val:float = 0.0,
+                                        force:bool = False,
                                         ) -> bool:
         ''' Set area target temperature '''
         if zone_id > const.NB_ZONE_MAX or zone_id == 0:
@@ -377,7 +661,7 @@ class Operations:
         if val > const.MAX_TEMP_ORDER or val < const.MIN_TEMP_ORDER:
             _LOGGER.error('Order Temperature must be between {} and {}'.format(const.MIN_TEMP_ORDER, const.MAX_TEMP_ORDER))
             return False
-        ret = await self.__async_write_register(reg = const.REG_START_ZONE + (4 * (zone_id - 1)) + const.REG_TEMP_ORDER, val = int(val * 2))
+        ret = await self.__async_queue_write(reg = const.REG_START_ZONE + (4 * (zone_id - 1)) + const.REG_TEMP_ORDER, val = int(val * 2), force = force)
         if not ret:
             _LOGGER.error('Error writing area order temperature')
 
@@ -411,7 +695,11 @@ class Operations:
         if not ret:
             _LOGGER.error('Error retreive area fan and climate values')
             reg = 0
-        return ret, const.ZoneFanMode((reg & 0xF0) >> 4), const.ZoneClimMode(reg & 0x0F)
+        fan, clim = codec.decode_state_and_flow(reg)
+        if fan is None or clim is None:
+            _LOGGER.error('Invalid area fan and climate value: {}'.format(reg))
+            return False, const.ZoneFanMode.FAN_OFF, const.ZoneClimMode.OFF
+        return ret, fan, clim
 
     async def async_area_state_and_register(self,
                                             id_zone:int = 0,
@@ -421,45 +709,43 @@ class Operations:
         if not ret:
             _LOGGER.error('Error retreive area register value')
             reg = 0
-        return ret, const.ZoneRegister(reg >> 1), const.ZoneState(reg & 0b01)
+        register, state = codec.decode_lock_zone(reg)
+        if register is None or state is None:
+            _LOGGER.error('Invalid area register value: {}'.format(reg))
+            return False, const.ZoneRegister.REGISTER_OFF, const.ZoneState.STATE_OFF
+        return ret, register, state
 
     async def async_set_area_state(self,
                                     id_zone:int = 0,
                                     val:const.ZoneState = const.ZoneState.STATE_OFF,
+                                    force:bool = False,
                                     ) -> bool:
         """ set area state """
-        register:const.ZoneRegister = const.ZoneRegister.REGISTER_OFF
         if id_zone > const.NB_ZONE_MAX or id_zone == 0:
             raise ZoneIdError('Area Id must be between 1 to 16')
-        # retreive values to combine the new state with register read
-        ret, register, _ = await self.async_area_state_and_register(id_zone = id_zone)
-        if not ret:
-            _LOGGER.error("Error reading state and register mode")
-            return ret
-        #_LOGGER.debug("register & state: {}".format(hex((int(register) << 1) | (int(val) & 0b01))))
-        ret = await self.__async_write_register(reg = const.REG_START_ZONE + (4 * (id_zone - 1)) + const.REG_LOCK_ZONE,
-                                            val = int(int(register) << 1) | (int(val) & 0b01))
+        # only the state bit is written, the register bit is merged at flush time
+        ret = await self.__async_queue_write(reg = const.REG_START_ZONE + (4 * (id_zone - 1)) + const.REG_LOCK_ZONE,
+                                                val = int(val) & 0b01,
+                                                mask = 0b01,
+                                                force = force)
         if not ret:
             _LOGGER.error('Error writing area state value')
 
-        return True
+        return ret
 
     async def async_set_area_clim_mode(self,
                                         id_zone:int = 0,
                                         val:const.ZoneClimMode = const.ZoneClimMode.OFF,
+                                        force:bool = False,
                                 ) -> bool:
         """ set area clim mode """
-        fan:const.ZoneFanMode = const.ZoneFanMode.FAN_OFF
         if id_zone > const.NB_ZONE_MAX or id_zone == 0:
             raise ZoneIdError('Zone Id must be between 1 to 16')
-        # retreive values to combine the new climate mode with fan mode read
-        ret, fan, _ = await self.async_area_clim_and_fan_mode(id_zone = id_zone)
-        if not ret:
-            _LOGGER.error("Error reading fan and clim mode")
-            return ret
-        #_LOGGER.debug("Fan & Clim: {}".format(hex((int(fan) << 4) | (int(val) & 0x0F))))
-        ret = await self.__async_write_register(reg = const.REG_START_ZONE + (4 * (id_zone - 1)) + const.REG_STATE_AND_FLOW,
-                                            val = int(int(fan) << 4) | (int(val) & 0x0F))
+        # only the climate bits are written, the fan bits are merged at flush time
+        ret = await self.__async_queue_write(reg = const.REG_START_ZONE + (4 * (id_zone - 1)) + const.REG_STATE_AND_FLOW,
+                                                val = int(val) & 0x0F,
+                                                mask = 0x0F,
+                                                force = force)
         if not ret:
             _LOGGER.error('Error writing area climate mode')
 
@@ -468,19 +754,16 @@ class Operations:
     async def async_set_area_fan_mode(self,
                                         id_zone:int = 0,
                                         val:const.ZoneFanMode = const.ZoneFanMode.FAN_OFF,
+                                        force:bool = False,
                                     ) -> bool:
         """ set area fan mode """
-        clim:const.ZoneClimMode = const.ZoneClimMode.OFF
         if id_zone > const.NB_ZONE_MAX or id_zone == 0:
             raise ZoneIdError('Zone Id must be between 1 to 16')
-        # retreive values to combine the new fan mode with climate mode read
-        ret, _, clim = await self.async_area_clim_and_fan_mode(id_zone = id_zone)
-        if not ret:
-            _LOGGER.error("Error reading fan and clim mode")
-            return ret
-        #_LOGGER.debug("Fan & Clim: {}".format(hex((int(val) << 4) | (int(clim) & 0x0F))))
-        ret = await self.__async_write_register(reg = const.REG_START_ZONE + (4 * (id_zone - 1)) + const.REG_STATE_AND_FLOW,
-                                            val = int(int(val) << 4) | (int(clim) & 0x0F))
+        # only the fan bits are written, the climate bits are merged at flush time
+        ret = await self.__async_queue_write(reg = const.REG_START_ZONE + (4 * (id_zone - 1)) + const.REG_STATE_AND_FLOW,
+                                                val = (int(val) << 4) & 0xF0,
+                                                mask = 0xF0,
+                                                force = force)
         if not ret:
             _LOGGER.error('Error writing area fan mode')
         return ret
@@ -544,3 +827,16 @@ class UnitIdError(Exception):
     def __str__(self):
         ''' print the message '''
         return self._msg
+
+
+class RegisterError(Exception):
+    ''' user defined exception '''
+
+    def __init__(self,
+                    msg:str = "") -> None:
+        ''' Class Constructor '''
+        self._msg = msg
+
+    def __str__(self):
+        ''' print the message '''
+        return self._msg
\ No newline at end of file
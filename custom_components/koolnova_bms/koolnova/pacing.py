@@ -0,0 +1,92 @@
+""" inter-frame pacing for Koolnova BMS Modbus transports """
+
+import time
+import logging as log
+
+import asyncio
+
+from . import const
+
+_LOGGER = log.getLogger(__name__)
+
+class Pacer:
+    ''' koolnova Modbus inter-frame pacing class
+
+        Keeps the bus silent for at least the minimum inter-frame gap between
+        two transactions, backs off on timeouts/CRC errors and recovers slowly
+        towards the minimum on success.
+    '''
+
+    def __init__(self,
+                    min_gap:float,
+                    max_gap:float = const.PACING_MAX_GAP,
+                    measured:bool = False,
+                ) -> None:
+        ''' Class constructor '''
+        self._floor = min_gap
+        self._min_gap = min_gap
+        self._max_gap = max(max_gap, min_gap)
+        self._gap = min_gap
+        self._measured = measured
+        self._rtt = None
+        self._last_frame = 0.0
+
+    @classmethod
+    def for_rtu(cls,
+                baudrate:int = const.DEFAULT_BAUDRATE,
+                bytesize:int = const.DEFAULT_BYTESIZE,
+                parity:str = const.DEFAULT_PARITY,
+                stopbits:int = const.DEFAULT_STOPBITS,
+                ) -> 'Pacer':
+        ''' Pacer with the Modbus RTU t3.5 silent interval as minimum gap '''
+        return cls(min_gap = rtu_silent_interval(baudrate, bytesize, parity, stopbits))
+
+    @classmethod
+    def for_tcp(cls) -> 'Pacer':
+        ''' Pacer with a minimum gap learned from the gateway response time '''
+        return cls(min_gap = const.PACING_TCP_MIN_GAP, measured = True)
+
+    @property
+    def gap(self) -> float:
+        ''' Get the inter-frame gap currently applied (seconds) '''
+        return self._gap
+
+    @property
+    def min_gap(self) -> float:
+        ''' Get the minimum inter-frame gap (seconds) '''
+        return self._min_gap
+
+    async def async_wait(self) -> None:
+        ''' Wait until the bus has been silent for the current gap '''
+        delay = self._last_frame + self._gap - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def frame_done(self,
+                    ok:bool,
+                    elapsed:float = 0.0,
+                    ) -> None:
+        ''' Record the end of a transaction and adapt the gap '''
+        self._last_frame = time.monotonic()
+        if not ok:
+            self._gap = min(self._max_gap, max(self._gap, self._min_gap) * const.PACING_BACKOFF_FACTOR)
+            _LOGGER.debug("pacing back off, inter-frame gap: {:.4f}s".format(self._gap))
+            return
+        if self._measured:
+            # smoothed response time of the gateway
+            self._rtt = elapsed if self._rtt is None else (0.8 * self._rtt) + (0.2 * elapsed)
+            self._min_gap = min(self._max_gap,
+                                max(self._floor, self._rtt * const.PACING_TCP_RTT_FACTOR))
+        self._gap = max(self._min_gap, self._gap * const.PACING_RECOVERY_FACTOR)
+
+def rtu_silent_interval(baudrate:int,
+                        bytesize:int,
+                        parity:str,
+                        stopbits:int,
+                        ) -> float:
+    ''' Modbus RTU t3.5 silent interval (seconds) for a serial configuration '''
+    if int(baudrate) > const.RTU_T35_BAUDRATE_LIMIT:
+        return const.RTU_T35_FIXED
+    # start bit + data bits + parity bit + stop bits
+    bits = 1 + int(bytesize) + (0 if str(parity)[0].upper() == 'N' else 1) + int(stopbits)
+    return 3.5 * bits / int(baudrate)
@@ -0,0 +1,60 @@
+""" register range planner for Koolnova BMS Modbus reads """
+
+from . import const
+
+def area_registers(zone_id:int) -> set:
+    ''' registers of an area (lock, state & flow, order temp, real temp) '''
+    start = const.REG_START_ZONE + (const.NUM_REG_PER_ZONE * (zone_id - 1))
+    return set(range(start, start + const.NUM_REG_PER_ZONE))
+
+def area_register(zone_id:int, offset:int) -> int:
+    ''' register of an area field (REG_LOCK_ZONE, REG_STATE_AND_FLOW, REG_TEMP_ORDER, REG_TEMP_REAL) '''
+    return const.REG_START_ZONE + (const.NUM_REG_PER_ZONE * (zone_id - 1)) + offset
+
+def engine_registers(engine_id:int) -> set:
+    ''' registers of an engine (throughput, order temp, flow state) '''
+    return {const.REG_START_FLOW_ENGINE + (engine_id - 1),
+            const.REG_START_ORDER_TEMP + (engine_id - 1),
+            const.REG_START_FLOW_STATE_ENGINE + (engine_id - 1)}
+
+# system registers used by the integration
+SYSTEM_REGISTERS = frozenset({const.REG_EFFICIENCY,
+                                const.REG_SYS_STATE,
+                                const.REG_GLOBAL_MODE})
+
+def register_group(reg:int) -> str:
+    ''' polling group of a register '''
+    if reg < const.REG_START_FLOW_ENGINE:
+        # areas: setpoints and states are fast, real temperatures are medium
+        if (reg - const.REG_START_ZONE) % const.NUM_REG_PER_ZONE == const.REG_TEMP_REAL:
+            return const.POLL_MEDIUM
+        return const.POLL_FAST
+    if reg < const.REG_START_FLOW_STATE_ENGINE:
+        # engines throughput and order temperature
+        return const.POLL_MEDIUM
+    if reg == const.REG_SYS_STATE:
+        return const.POLL_FAST
+    # engines flow state, communication, identity, efficiency and global mode
+    return const.POLL_SLOW
+
+def plan_reads(registers,
+                max_span:int = const.MAX_REGS_PER_READ,
+                gap_bridge:int = const.READ_GAP_BRIDGE,
+                ) -> list:
+    ''' Merge registers into the minimal list of (start, count) read spans
+
+        A gap of at most gap_bridge unused registers is read through when
+        it keeps the span within max_span: reading a few more registers
+        costs less than the request, response header and inter-frame gap
+        of another transaction.
+    '''
+    max_span = max(1, min(max_span, const.MAX_REGS_PER_READ))
+    spans:list = []
+    for reg in sorted(set(registers)):
+        if spans:
+            start, count = spans[-1]
+            if reg - (start + count) <= gap_bridge and reg - start < max_span:
+                spans[-1] = (start, reg - start + 1)
+                continue
+        spans.append((reg, 1))
+    return spans
@@ -0,0 +1,143 @@
+""" priority-aware bus scheduler for Koolnova BMS Modbus transports """
+
+import time
+import heapq
+import itertools
+import contextlib
+import logging as log
+
+import asyncio
+
+from . import const
+
+_LOGGER = log.getLogger(__name__)
+
+class BusScheduler:
+    ''' koolnova Modbus bus scheduler class
+
+        Grants the bus to one transaction at a time. Waiting transactions are
+        served by priority class (lower value first), so a user write never
+        waits for more than the frame in flight. Inside a class, slaves sharing
+        the bus are served round-robin, then in arrival order.
+    '''
+
+    def __init__(self) -> None:
+        ''' Class constructor '''
+        self._busy:bool = False
+        self._waiters:list = []
+        self._seq = itertools.count()
+        # next round per (priority, slave) and last round served per priority
+        self._rounds:dict = {}
+        self._served:dict = {}
+        # per priority class: [transactions, total wait, max wait]
+        self._wait_stats:dict = {prio: [0, 0.0, 0.0] for prio in const.PRIORITY_NAMES}
+
+    @contextlib.asynccontextmanager
+    async def async_slot(self,
+                            priority:int = const.PRIO_POLL,
+                            slave:int = None,
+                            ):
+        ''' Hold the bus for one transaction to slave '''
+        start = time.monotonic()
+        # a slave gets one transaction per round, behind the round being served
+        rnd = max(self._served.get(priority, 0), self._rounds.get((priority, slave), 0))
+        self._rounds[(priority, slave)] = rnd + 1
+        if self._busy or self._waiters:
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, rnd, next(self._seq), fut))
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # the bus was handed over to us, give it to the next one
+                    self._release()
+                else:
+                    fut.cancel()
+                raise
+        else:
+            self._served[priority] = rnd
+        self._busy = True
+        self._record_wait(priority, time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        ''' Hand the bus over to the next waiting transaction '''
+        while self._waiters:
+            priority, rnd, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                self._served[priority] = rnd
+                fut.set_result(None)
+                return
+        self._busy = False
+
+    def _record_wait(self, priority:int, wait:float) -> None:
+        ''' Record the queue-wait time of a transaction '''
+        stats = self._wait_stats.setdefault(priority, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += wait
+        stats[2] = max(stats[2], wait)
+
+    @property
+    def queue_wait_stats(self) -> dict:
+        ''' Get queue-wait statistics (milliseconds) per priority class '''
+        stats = {}
+        for prio, (count, total, longest) in self._wait_stats.items():
+            stats[const.PRIORITY_NAMES.get(prio, str(prio))] = {
+                'count': count,
+                'avg_ms': round(1000 * total / count, 2) if count else 0.0,
+                'max_ms': round(1000 * longest, 2),
+            }
+        return stats
+
+class PriorityLimiter:
+    ''' koolnova transaction limiter class
+
+        Bounds the transactions running at once over several links. Waiting
+        transactions are granted a place by priority class (lower value first),
+        then in arrival order, so a user write is not queued behind the polls
+        of the other links.
+    '''
+
+    def __init__(self,
+                    value:int = 1,
+                    ) -> None:
+        ''' Class constructor '''
+        self._value:int = value
+        self._waiters:list = []
+        self._seq = itertools.count()
+
+    @contextlib.asynccontextmanager
+    async def async_slot(self,
+                            priority:int = const.PRIO_POLL,
+                            ):
+        ''' Hold a place for one transaction '''
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # the place was handed over to us, give it to the next one
+                    self._release()
+                else:
+                    fut.cancel()
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        ''' Hand the place over to the next waiting transaction '''
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._value += 1
@@ -0,0 +1,153 @@
+""" immutable versioned snapshots of a Koolnova BMS register image """
+
+from typing import NamedTuple
+
+from . import const
+from . import codec
+
+class AreaSnapshot(NamedTuple):
+    ''' registers of an area at a snapshot '''
+
+    id_zone:int
+    lock:int
+    flow:int
+    order:int
+    real:int
+
+    @property
+    def state(self) -> const.ZoneState:
+        ''' Get state '''
+        return codec.LOCK_ZONE_TABLE[self.lock][1]
+
+    @property
+    def register(self) -> const.ZoneRegister:
+        ''' Get register state '''
+        return codec.LOCK_ZONE_TABLE[self.lock][0]
+
+    @property
+    def fan_mode(self) -> const.ZoneFanMode:
+        ''' Get Fan Mode '''
+        return codec.STATE_AND_FLOW_TABLE[self.flow][0]
+
+    @property
+    def clim_mode(self) -> const.ZoneClimMode:
+        ''' Get Clim Mode '''
+        return codec.STATE_AND_FLOW_TABLE[self.flow][1]
+
+    @property
+    def order_temp(self) -> float:
+        ''' Get order temp '''
+        return self.order / 2
+
+    @property
+    def real_temp(self) -> float:
+        ''' Get real temp '''
+        return self.real / 2
+
+class EngineSnapshot(NamedTuple):
+    ''' registers of an engine at a snapshot '''
+
+    engine_id:int
+    throughput:int
+    flow_state:int
+    order:int
+
+    @property
+    def state(self) -> const.FlowEngine:
+        ''' Get Engine state '''
+        return codec.FLOW_ENGINES[self.flow_state]
+
+    @property
+    def order_temp(self) -> float:
+        ''' Get Order Temp '''
+        return self.order / 2
+
+class Snapshot(NamedTuple):
+    ''' koolnova snapshot class
+
+        Immutable view of the registers at a version. A new version shares
+        the snapshots of the areas and engines whose registers did not change.
+    '''
+
+    version:int
+    areas:tuple
+    engines:tuple
+    glob:int
+    eff:int
+    sys:int
+
+    def area(self, zone_id:int) -> AreaSnapshot:
+        ''' Get the snapshot of an area '''
+        return self.areas[zone_id - 1]
+
+    def engine(self, engine_id:int) -> EngineSnapshot:
+        ''' Get the snapshot of an engine '''
+        return self.engines[engine_id - 1]
+
+    @property
+    def global_mode(self) -> const.GlobalMode:
+        ''' Get Global Mode '''
+        return codec.GLOBAL_MODES[self.glob]
+
+    @property
+    def efficiency(self) -> const.Efficiency:
+        ''' Get Efficiency '''
+        return codec.EFFICIENCIES[self.eff]
+
+    @property
+    def sys_state(self) -> const.SysState:
+        ''' Get System State '''
+        return codec.SYS_STATES[self.sys]
+
+def _area(image, zone_id:int) -> AreaSnapshot:
+    ''' Snapshot of an area from the image '''
+    base = const.REG_START_ZONE + const.NUM_REG_PER_ZONE * (zone_id - 1)
+    return AreaSnapshot(zone_id,
+                        image[base + const.REG_LOCK_ZONE],
+                        image[base + const.REG_STATE_AND_FLOW],
+                        image[base + const.REG_TEMP_ORDER],
+                        image[base + const.REG_TEMP_REAL])
+
+def _engine(image, engine_id:int) -> EngineSnapshot:
+    ''' Snapshot of an engine from the image '''
+    return EngineSnapshot(engine_id,
+                            image[const.REG_START_FLOW_ENGINE + engine_id - 1],
+                            image[const.REG_START_FLOW_STATE_ENGINE + engine_id - 1],
+                            image[const.REG_START_ORDER_TEMP + engine_id - 1])
+
+def from_image(image, version:int = 0) -> Snapshot:
+    ''' Build a full snapshot of the image '''
+    return Snapshot(version,
+                    tuple(_area(image, zone_id) for zone_id in range(1, const.NB_ZONE_MAX + 1)),
+                    tuple(_engine(image, engine_id) for engine_id in range(1, const.NUM_OF_ENGINES + 1)),
+                    image[const.REG_GLOBAL_MODE],
+                    image[const.REG_EFFICIENCY],
+                    image[const.REG_SYS_STATE])
+
+def evolve(prev:Snapshot, image, dirty:set) -> Snapshot:
+    ''' Build the next version from the registers changed since prev
+
+        Return prev itself when nothing changed, unchanged areas and
+        engines keep the objects of prev.
+    '''
+    if not dirty:
+        return prev
+    areas = prev.areas
+    zones = {(reg - const.REG_START_ZONE) // const.NUM_REG_PER_ZONE + 1 for reg in dirty
+                if const.REG_START_ZONE <= reg < const.REG_START_ZONE + const.NUM_REG_PER_ZONE * const.NB_ZONE_MAX}
+    if zones:
+        areas = tuple(_area(image, zone_id) if zone_id in zones else area
+                        for zone_id, area in enumerate(prev.areas, start = 1))
+    engines = prev.engines
+    engine_ids = {reg - base + 1 for reg in dirty
+                    for base in (const.REG_START_FLOW_ENGINE, const.REG_START_FLOW_STATE_ENGINE, const.REG_START_ORDER_TEMP)
+                    if base <= reg < base + const.NUM_OF_ENGINES}
+    if engine_ids:
+        engines = tuple(_engine(image, engine_id) if engine_id in engine_ids else engine
+                        for engine_id, engine in enumerate(prev.engines, start = 1))
+    return Snapshot(prev.version + 1,
+                    areas,
+                    engines,
+                    image[const.REG_GLOBAL_MODE],
+                    image[const.REG_EFFICIENCY],
+                    image[const.REG_SYS_STATE])
@@ -0,0 +1,156 @@
+""" shared Modbus transports for Koolnova BMS controllers """
+
+import contextlib
+import logging as log
+
+from . import const
+from .pacing import Pacer
+from .scheduler import BusScheduler
+
+_LOGGER = log.getLogger(__name__)
+
+class Transport:
+    ''' koolnova Modbus transport class
+
+        One physical link (serial device or TCP gateway) with its client, bus
+        scheduler and pacer, shared by every controller reached through it.
+        The link is closed when the last controller releases it.
+    '''
+
+    def __init__(self,
+                    key:str,
+                    client,
+                    pacer:Pacer,
+                    line_settings:dict = None,
+                    client_settings:dict = None,
+                    ) -> None:
+        ''' Class constructor '''
+        self._key = key
+        self._client = client
+        self._pacer = pacer
+        # settings the link was opened with
+        self._line_settings:dict = dict(line_settings or {})
+        self._client_settings:dict = dict(client_settings or {})
+        self._scheduler = BusScheduler()
+        # optional PriorityLimiter shared by several transports (fleet-wide cap)
+        self.limiter = None
+        self._refs:int = 0
+
+    @property
+    def key(self) -> str:
+        ''' Get the transport identifier (serial device or host:port) '''
+        return self._key
+
+    @property
+    def client(self):
+        ''' Get the shared pymodbus client '''
+        return self._client
+
+    @property
+    def scheduler(self) -> BusScheduler:
+        ''' Get the bus scheduler '''
+        return self._scheduler
+
+    @property
+    def pacer(self) -> Pacer:
+        ''' Get the inter-frame pacer '''
+        return self._pacer
+
+    @property
+    def line_settings(self) -> dict:
+        ''' Get the line settings of the link (baudrate, parity, ...) '''
+        return self._line_settings
+
+    @property
+    def client_settings(self) -> dict:
+        ''' Get the client settings of the link (timeout, retries, ...) '''
+        return self._client_settings
+
+    @property
+    def refs(self) -> int:
+        ''' Get the number of controllers using the transport '''
+        return self._refs
+
+    @property
+    def connected(self) -> bool:
+        ''' Get the client status '''
+        return self._client.connected
+
+    @contextlib.asynccontextmanager
+    async def async_slot(self,
+                            priority:int = const.PRIO_POLL,
+                            slave:int = None,
+                            ):
+        ''' Hold the bus for one transaction, within the shared limiter if any '''
+        async with self._scheduler.async_slot(priority, slave):
+            if self.limiter is None:
+                yield
+            else:
+                # the place is granted by priority, a write does not wait for the polls of other links
+                async with self.limiter.async_slot(priority):
+                    yield
+
+    async def async_connect(self) -> bool:
+        ''' Connect the client, unless another controller already did '''
+        async with self._scheduler.async_slot(const.PRIO_WRITE):
+            if not self._client.connected:
+                await self._client.connect()
+        return self._client.connected
+
+    def close(self) -> None:
+        ''' Close the client '''
+        if self._client.connected:
+            self._client.close()
+
+# shared transports per key
+_transports:dict = {}
+
+def acquire_transport(key:str,
+                        client_factory,
+                        pacer_factory,
+                        line_settings:dict = None,
+                        client_settings:dict = None,
+                        ) -> Transport:
+    ''' Get the transport of key, created with the factories on first use
+
+        A link shared with other line settings is refused (TransportSettingsError),
+        other client settings are those of the first user (warning).
+    '''
+    line_settings = dict(line_settings or {})
+    client_settings = dict(client_settings or {})
+    transport = _transports.get(key)
+    if transport is None:
+        transport = Transport(key, client_factory(), pacer_factory(), line_settings, client_settings)
+        _transports[key] = transport
+    elif transport.line_settings != line_settings:
+        raise TransportSettingsError('Link {} already used with {}, {} requested'.format(key,
+                                        transport.line_settings,
+                                        line_settings))
+    elif transport.client_settings != client_settings:
+        _LOGGER.warning("Link {} already used with {}, {} ignored".format(key,
+                        transport.client_settings,
+                        client_settings))
+    transport._refs += 1
+    _LOGGER.debug("transport {} acquired ({} users)".format(key, transport.refs))
+    return transport
+
+def release_transport(transport:Transport) -> None:
+    ''' Release a transport, the last user closes it '''
+    transport._refs -= 1
+    _LOGGER.debug("transport {} released ({} users)".format(transport.key, transport.refs))
+    if transport.refs <= 0:
+        if _transports.get(transport.key) is transport:
+            del _transports[transport.key]
+        transport.close()
+
+class TransportSettingsError(Exception):
+    ''' user defined exception '''
+
+    def __init__(self,
+                    msg:str = "") -> None:
+        ''' Class Constructor '''
+        self._msg = msg
+
+    def __str__(self):
+        ''' print the message '''
+        return self._msg
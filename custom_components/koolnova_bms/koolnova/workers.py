@@ -0,0 +1,511 @@
+""" process-sharded polling of Koolnova BMS controllers """
+
+import time
+import array
+import pickle
+import itertools
+import multiprocessing
+import logging as log
+
+import asyncio
+
+from . import const
+from .operations import Operations
+from .image import RegisterImage
+
+_LOGGER = log.getLogger(__name__)
+
+# message kinds on the worker pipes
+_MSG_SNAPSHOT = b'S'
+_MSG_RESULT = b'R'
+_MSG_STATS = b'T'
+# snapshot: kind, gateway index, register mask, register image
+_MASK_BYTES = (const.NB_REGISTERS + 7) // 8
+
+def pack_snapshot(index:int, values:dict) -> bytes:
+    ''' Pack the registers of a gateway into a compact frame '''
+    image = array.array('H', bytes(2 * const.NB_REGISTERS))
+    mask = 0
+    for reg, val in values.items():
+        image[reg] = val
+        mask |= 1 << reg
+    return _MSG_SNAPSHOT + index.to_bytes(2, 'little') + mask.to_bytes(_MASK_BYTES, 'little') + image.tobytes()
+
+def unpack_snapshot(frame:bytes) -> (int, dict):
+    ''' Unpack a frame built by pack_snapshot '''
+    index = int.from_bytes(frame[1:3], 'little')
+    mask = int.from_bytes(frame[3:3 + _MASK_BYTES], 'little')
+    image = array.array('H')
+    image.frombytes(frame[3 + _MASK_BYTES:])
+    return index, {reg: image[reg] for reg in range(const.NB_REGISTERS) if mask >> reg & 1}
+
+def _shadow_values(client:Operations) -> dict:
+    ''' Registers known by the register image of a client '''
+    values = {}
+    for reg in range(const.NB_REGISTERS):
+        val = client.shadow_register(reg)
+        if val is not None:
+            values[reg] = val
+    return values
+
+def _worker_main(conn, gateways:list, interval:float) -> None:
+    ''' Worker process entry point '''
+    asyncio.run(_async_worker(conn, gateways, interval))
+
+async def _async_worker(conn, gateways:list, interval:float) -> None:
+    ''' Poll the gateways of a shard and stream their registers to the main process
+
+        gateways are indexed by their slot in the shard, removed ones are None.
+        Gateways are added and removed by commands of the main process.
+    '''
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    clients:dict = {}
+    tasks:dict = {}
+
+    async def _async_call(req_id, index, method, args, kwargs) -> None:
+        ''' run a call on a client, reply with the result, its stats and the client registers '''
+        client = clients.get(index)
+        if client is None:
+            result = ConnectionError('gateway {} removed'.format(index))
+        else:
+            try:
+                result = await getattr(client, method)(*args, **kwargs)
+            except Exception as e:
+                result = e
+            # registers first, so they are applied when the caller resumes
+            conn.send_bytes(pack_snapshot(index, _shadow_values(client)))
+        conn.send_bytes(_MSG_RESULT + pickle.dumps((req_id, result, kwargs.get('stats'))))
+
+    def _add(index:int, gateway:dict) -> None:
+        ''' start polling a gateway '''
+        try:
+            clients[index] = Operations(**gateway['config'])
+        except Exception as e:
+            # calls to the gateway fail as for a removed one
+            _LOGGER.error("worker cannot open {}: {}".format(gateway['key'], e))
+            return
+        tasks[index] = loop.create_task(_async_poll(index, gateway))
+
+    async def _async_remove(index:int) -> None:
+        ''' stop polling a gateway and release its link '''
+        task = tasks.pop(index, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions = True)
+        client = clients.pop(index, None)
+        if client is not None:
+            client.disconnect()
+
+    def _on_command() -> None:
+        ''' commands from the main process '''
+        while conn.poll():
+            try:
+                cmd = pickle.loads(conn.recv_bytes())
+            except EOFError:
+                stop.set()
+                return
+            if cmd[0] == 'stop':
+                stop.set()
+                return
+            if cmd[0] == 'add':
+                _add(*cmd[1:])
+            elif cmd[0] == 'remove':
+                loop.create_task(_async_remove(*cmd[1:]))
+            else:
+                loop.create_task(_async_call(*cmd[1:]))
+
+    async def _async_poll(index:int, gateway:dict) -> None:
+        ''' poll a gateway until stopped '''
+        client = clients[index]
+        registers = set(gateway.get('registers', range(const.NB_REGISTERS)))
+        for cycle in itertools.count(1):
+            try:
+                if not client.connected():
+                    await client.async_connect()
+                ret, values = await client.async_read_registers_set(registers)
+                if ret:
+                    conn.send_bytes(pack_snapshot(index, values))
+            except Exception as e:
+                _LOGGER.error("worker poll of {} failed: {}".format(gateway['key'], e))
+            if cycle % const.WORKER_STATS_EVERY == 0:
+                stats = {'transactions': client.transactions,
+                            'suppressed_writes': client.suppressed_writes,
+                            'inter_frame_gap': client.inter_frame_gap,
+                            'queue_wait_stats': client.queue_wait_stats}
+                conn.send_bytes(_MSG_STATS + pickle.dumps((index, stats)))
+            await asyncio.sleep(interval)
+
+    for index, gateway in enumerate(gateways):
+        if gateway is not None:
+            _add(index, gateway)
+    loop.add_reader(conn.fileno(), _on_command)
+    await stop.wait()
+    loop.remove_reader(conn.fileno())
+    await asyncio.gather(*(_async_remove(index) for index in list(clients)))
+    conn.close()
+
+class WorkerClient:
+    ''' koolnova worker client class
+
+        Stands for Operations in the main process: reads are served from the
+        registers streamed by the worker owning the gateway, other calls are
+        forwarded to that worker.
+    '''
+
+    def __init__(self,
+                    pool,
+                    shard:int,
+                    index:int,
+                    ) -> None:
+        ''' Class constructor '''
+        self._pool = pool
+        self._shard = shard
+        self._index = index
+        # registers streamed by the worker, shared with the device owning the client
+        self._image:RegisterImage = RegisterImage()
+        self._stats:dict = {}
+
+    def _snapshot(self, values:dict) -> None:
+        ''' Registers received from the worker '''
+        self._image.update(values, ts = time.monotonic())
+
+    @property
+    def image(self) -> RegisterImage:
+        ''' Get the register image refreshed by the stream '''
+        return self._image
+
+    def shadow_register(self,
+                        reg:int,
+                        max_age:float = const.SHADOW_MAX_AGE,
+                        ) -> int:
+        ''' Get the streamed value of a register, None if unknown or older than max_age '''
+        return self._image.fresh(reg, max_age)
+
+    async def async_read_registers_set(self,
+                                        registers:set,
+                                        priority:int = const.PRIO_POLL,
+                                        stats:dict = None,
+                                        ) -> (bool, dict):
+        ''' Read registers, polls and diagnostic reads are served from the stream while it is fresh '''
+        if priority >= const.PRIO_POLL:
+            values = {reg: self.shadow_register(reg, self._pool.max_age) for reg in registers}
+            if None not in values.values():
+                return True, values
+        return await self.async_call('async_read_registers_set', set(registers), priority = priority, stats = stats)
+
+    async def async_call(self, method:str, *args, **kwargs):
+        ''' Run an Operations method in the worker owning the gateway
+
+            A stats dict passed to the method is updated with the one of the worker.
+        '''
+        result, stats = await self._pool.async_call(self._shard, self._index, method, args, kwargs)
+        if stats is not None and kwargs.get('stats') is not None:
+            kwargs['stats'].update(stats)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def __getattr__(self, name:str):
+        ''' Forward the other coroutines of Operations to the worker '''
+        if not name.startswith('async_'):
+            raise AttributeError(name)
+        async def _async_forward(*args, **kwargs):
+            return await self.async_call(name, *args, **kwargs)
+        return _async_forward
+
+    async def async_connect(self) -> None:
+        ''' the worker owns the connection, wait for the pool to run '''
+        await self._pool.async_start()
+
+    def connected(self) -> bool:
+        ''' get the status of the worker owning the gateway '''
+        return self._pool.shard_running(self._shard)
+
+    def disconnect(self) -> None:
+        ''' the worker owns the connection '''
+
+    def set_transaction_limiter(self, limiter) -> None:
+        ''' transactions are bounded inside the worker '''
+
+    @property
+    def transactions(self) -> int:
+        ''' Get the number of bus transactions issued by the worker '''
+        return self._stats.get('transactions', 0)
+
+    @property
+    def suppressed_writes(self) -> int:
+        ''' Get the number of writes skipped by the worker '''
+        return self._stats.get('suppressed_writes', 0)
+
+    @property
+    def inter_frame_gap(self) -> float:
+        ''' Get the inter-frame gap of the gateway link '''
+        return self._stats.get('inter_frame_gap', 0.0)
+
+    @property
+    def queue_wait_stats(self) -> dict:
+        ''' Get the bus queue-wait statistics of the gateway link '''
+        return self._stats.get('queue_wait_stats', {})
+
+class WorkerPool:
+    ''' koolnova worker pool class
+
+        Shards gateways across at most workers processes, a gateway link
+        (serial device or host:port) always lives in a single worker. A new
+        link starts a new worker until the bound is reached, then joins the
+        least loaded one. Each worker polls its gateways and streams compact
+        register snapshots over a pipe. Gateways are added and removed while
+        the pool runs.
+    '''
+
+    def __init__(self,
+                    gateways:dict = None,
+                    workers:int = None,
+                    interval:float = const.WORKER_POLL_INTERVAL,
+                    ) -> None:
+        ''' Class constructor
+
+            gateways: {key: {'config': Operations kwargs, 'registers': polled registers (optional)}}
+        '''
+        self._interval = interval
+        self._workers:int = max(1, workers or multiprocessing.cpu_count())
+        # gateway keys of each worker, by slot (None once removed)
+        self._shards:list = []
+        self._gateways:dict = {}
+        self._clients:dict = {}
+        self._processes:list = []
+        self._conns:list = []
+        # commands are written to a pipe by one executor job at a time
+        self._send_locks:list = []
+        # shards whose worker stopped
+        self._dead:set = set()
+        # request id -> (shard, future)
+        self._pending:dict = {}
+        self._req_ids = itertools.count()
+        self._snapshots:int = 0
+        self._started = None
+        # controllers sharing a link stay in the same worker
+        links:dict = {}
+        for key, gateway in (gateways or {}).items():
+            links.setdefault(self._link_key(gateway['config']), []).append(key)
+        for keys in sorted(links.values(), key = len, reverse = True):
+            for key in keys:
+                self._add(key, gateways[key])
+
+    @staticmethod
+    def _link_key(config:dict) -> str:
+        ''' physical link of a gateway configuration '''
+        if config.get('mode') == 'Modbus RTU':
+            return config.get('port', '')
+        return "{}:{}".format(config.get('addr', const.DEFAULT_TCP_ADDR), config.get('port', const.DEFAULT_TCP_PORT))
+
+    def _shard_of(self, link:str) -> int:
+        ''' worker of a link: the one already polling it, a new one, or the least loaded '''
+        for shard, keys in enumerate(self._shards):
+            if any(key is not None and self._link_key(self._gateways[key]['config']) == link for key in keys):
+                return shard
+        if len(self._shards) < self._workers:
+            self._shards.append([])
+            return len(self._shards) - 1
+        return min(range(len(self._shards)), key = lambda shard: sum(key is not None for key in self._shards[shard]))
+
+    def _add(self, key:str, gateway:dict) -> (int, int):
+        ''' Place a gateway in a worker, return (shard, slot) '''
+        if key in self._gateways:
+            raise KeyError('gateway {} already in the pool'.format(key))
+        shard = self._shard_of(self._link_key(gateway['config']))
+        self._gateways[key] = gateway
+        self._shards[shard].append(key)
+        index = len(self._shards[shard]) - 1
+        self._clients[key] = WorkerClient(self, shard, index)
+        return shard, index
+
+    @property
+    def running(self) -> bool:
+        ''' Get the pool status '''
+        return bool(self._processes) and not self._dead and all(process.is_alive() for process in self._processes)
+
+    def shard_running(self, shard:int) -> bool:
+        ''' Get the status of a worker '''
+        return shard < len(self._processes) and shard not in self._dead and self._processes[shard].is_alive()
+
+    @property
+    def max_age(self) -> float:
+        ''' Get the age after which streamed registers are considered stale '''
+        return 2 * self._interval + const.WORKER_STALE_MARGIN
+
+    @property
+    def snapshots(self) -> int:
+        ''' Get the number of snapshots received '''
+        return self._snapshots
+
+    @property
+    def shards(self) -> list:
+        ''' Get the gateway keys of each worker '''
+        return [[key for key in keys if key is not None] for keys in self._shards]
+
+    @property
+    def gateways(self) -> dict:
+        ''' Get the gateways of the pool '''
+        return self._gateways
+
+    def client(self, key:str) -> WorkerClient:
+        ''' Get the client standing for the gateway of key '''
+        return self._clients[key]
+
+    async def async_add_gateway(self,
+                                key:str,
+                                gateway:dict,
+                                ) -> WorkerClient:
+        ''' Add a gateway, polled at once when the pool runs, return its client '''
+        shard, index = self._add(key, gateway)
+        if self._started is not None:
+            await self._started
+            if shard >= len(self._processes):
+                # first link of a new worker
+                self._start_shard(shard)
+            else:
+                await self._async_send(shard, pickle.dumps(('add', index, dict(gateway, key = key))))
+        return self._clients[key]
+
+    async def async_remove_gateway(self,
+                                    key:str,
+                                    ) -> None:
+        ''' Remove a gateway, its worker releases the link '''
+        self._gateways.pop(key)
+        client = self._clients.pop(key)
+        self._shards[client._shard][client._index] = None
+        if client._shard < len(self._processes) and client._shard not in self._dead:
+            try:
+                await self._async_send(client._shard, pickle.dumps(('remove', client._index)))
+            except OSError:
+                pass
+
+    async def async_start(self) -> None:
+        ''' Start the worker processes (once) '''
+        if self._started is None:
+            self._started = asyncio.get_running_loop().create_future()
+            for shard in range(len(self._shards)):
+                self._start_shard(shard)
+            self._started.set_result(None)
+        await self._started
+
+    def _start_shard(self, shard:int) -> None:
+        ''' Spawn the process of a shard '''
+        loop = asyncio.get_running_loop()
+        ctx = multiprocessing.get_context('spawn')
+        parent, child = ctx.Pipe(duplex = True)
+        gateways = [None if key is None else dict(self._gateways[key], key = key) for key in self._shards[shard]]
+        process = ctx.Process(target = _worker_main,
+                                args = (child, gateways, self._interval),
+                                name = "koolnova-worker-{}".format(shard),
+                                daemon = True)
+        process.start()
+        child.close()
+        self._processes.append(process)
+        self._conns.append(parent)
+        self._send_locks.append(asyncio.Lock())
+        loop.add_reader(parent.fileno(), self._on_message, shard)
+
+    def _on_message(self, shard:int) -> None:
+        ''' Messages streamed by a worker '''
+        conn = self._conns[shard]
+        keys = self._shards[shard]
+        while True:
+            try:
+                if not conn.poll():
+                    return
+                frame = conn.recv_bytes()
+            except (EOFError, OSError):
+                # end of pipe or reset: the worker died
+                _LOGGER.error("worker {} stopped".format(shard))
+                asyncio.get_running_loop().remove_reader(conn.fileno())
+                self._fail_shard(shard, ConnectionError('worker {} stopped'.format(shard)))
+                return
+            kind = frame[:1]
+            if kind == _MSG_SNAPSHOT:
+                index, values = unpack_snapshot(frame)
+                # a gateway removed while its snapshot was in the pipe is skipped
+                if keys[index] is not None:
+                    self._clients[keys[index]]._snapshot(values)
+                    self._snapshots += 1
+            elif kind == _MSG_RESULT:
+                req_id, result, stats = pickle.loads(frame[1:])
+                _, fut = self._pending.pop(req_id, (None, None))
+                if fut is not None and not fut.done():
+                    fut.set_result((result, stats))
+            elif kind == _MSG_STATS:
+                index, stats = pickle.loads(frame[1:])
+                if keys[index] is not None:
+                    self._clients[keys[index]]._stats = stats
+
+    def _fail_shard(self, shard:int, exc:Exception) -> None:
+        ''' A worker stopped: the pool is not running, its pending calls fail '''
+        self._dead.add(shard)
+        for req_id, (req_shard, fut) in list(self._pending.items()):
+            if req_shard == shard:
+                del self._pending[req_id]
+                if not fut.done():
+                    fut.set_exception(exc)
+
+    async def _async_send(self, shard:int, payload:bytes) -> None:
+        ''' Write a command to a worker pipe off the event loop '''
+        async with self._send_locks[shard]:
+            await asyncio.get_running_loop().run_in_executor(None, self._conns[shard].send_bytes, payload)
+
+    async def async_call(self,
+                            shard:int,
+                            index:int,
+                            method:str,
+                            args:tuple,
+                            kwargs:dict):
+        ''' Run an Operations method of a gateway in its worker
+
+            Return (result, stats). Raise ConnectionError if the worker stopped,
+            asyncio.TimeoutError after WORKER_CALL_TIMEOUTS gateway timeouts.
+        '''
+        await self.async_start()
+        if shard in self._dead:
+            raise ConnectionError('worker {} stopped'.format(shard))
+        key = self._shards[shard][index]
+        if key is None:
+            raise ConnectionError('gateway removed from worker {}'.format(shard))
+        config = self._gateways[key]['config']
+        req_id = next(self._req_ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = (shard, fut)
+        try:
+            try:
+                await self._async_send(shard, pickle.dumps(('call', req_id, index, method, args, kwargs)))
+            except OSError as e:
+                self._fail_shard(shard, ConnectionError('worker {} stopped'.format(shard)))
+                raise ConnectionError('worker {} stopped'.format(shard)) from e
+            return await asyncio.wait_for(fut, const.WORKER_CALL_TIMEOUTS * config['timeout'])
+        finally:
+            self._pending.pop(req_id, None)
+
+    async def async_stop(self) -> None:
+        ''' Stop the worker processes '''
+        loop = asyncio.get_running_loop()
+        for shard, conn in enumerate(self._conns):
+            loop.remove_reader(conn.fileno())
+            try:
+                await self._async_send(shard, pickle.dumps(('stop',)))
+            except OSError:
+                pass
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, const.WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        for _, fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError('worker pool stopped'))
+        self._pending = {}
+        self._processes = []
+        self._conns = []
+        self._send_locks = []
+        self._dead = set()
+        self._started = None
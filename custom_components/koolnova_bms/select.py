@@ -18,23 +18,31 @@ from .const import (
     DOMAIN,
     GLOBAL_MODES,
     GLOBAL_MODE_TRANSLATION,
+    GLOBAL_MODE_REVERSE,
     EFF_MODES,
     EFF_TRANSLATION,
+    EFF_REVERSE,
     ENGINE_FLOW_MODES,
     ENGINE_FLOW_TRANSLATION,
+    ENGINE_FLOW_REVERSE,
 )
 
-from .coordinator import KoolnovaCoordinator
+from .coordinator import KoolnovaCoordinator, KoolnovaEntity
 
 from .koolnova.device import (
     Koolnova, 
     Engine,
 )
+from .koolnova import image
 
 from .koolnova.const import (
     GlobalMode,
     Efficiency,
     FlowEngine,
+    POLL_SLOW,
+    REG_GLOBAL_MODE,
+    REG_EFFICIENCY,
+    REG_START_FLOW_STATE_ENGINE,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -45,8 +53,9 @@ async def async_setup_entry(hass: HomeAssistant,
                             ):
     """ Setup select entries """
 
-    device = hass.data[DOMAIN]["device"]
-    coordinator = hass.data[DOMAIN]["coordinator"]
+    device = hass.data[DOMAIN][entry.entry_id]["device"]
+    # configuration registers are polled by the slow group
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinators"][POLL_SLOW]
 
     entities = [
         GlobalModeSelect(coordinator, device),
@@ -57,7 +66,7 @@ async def async_setup_entry(hass: HomeAssistant,
         entities.append(EngineStateSelect(coordinator, device, engine))
     async_add_entities(entities)
 
-class GlobalModeSelect(CoordinatorEntity, SelectEntity):
+class GlobalModeSelect(KoolnovaEntity, SelectEntity):
     """ Select component to set global HVAC mode """
 
     _attr_entity_category: EntityCategory = EntityCategory.CONFIG
@@ -77,32 +86,35 @@ class GlobalModeSelect(CoordinatorEntity, SelectEntity):
             GLOBAL_MODE_TRANSLATION[int(self._device.global_mode)]
         )
 
+    def _interest_registers(self) -> set:
+        """ global mode register """
+        return {REG_GLOBAL_MODE}
+
+    def _watched_fields(self) -> frozenset:
+        """ global mode """
+        return image.watch(image.SYSTEM, 0, ('glob',))
+
     def __select_option(self, option: str) -> None:
         """ Change the selected option. """
         self._attr_current_option = option
 
     async def async_select_option(self, option: str) -> None:
         """ Change the selected option. """
-        opt = 0
-        for k,v in GLOBAL_MODE_TRANSLATION.items():
-            if v == option:
-                opt = k
-                break
-        await self._device.async_set_global_mode(GlobalMode(opt))
-        self.__select_option(option)
-        await self.coordinator.async_request_refresh()
+        opt = GLOBAL_MODE_REVERSE.get(option, 0)
+        self._async_optimistic(_attr_current_option = option)
+        await self._async_write(self._device.async_set_global_mode(GlobalMode(opt)), {REG_GLOBAL_MODE})
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """ Handle updated data from the coordinator 
             Retrieve latest state of global mode """
-        _LOGGER.debug("[UPDATE] Global Mode: {}".format(self.coordinator.data['glob']))
+        _LOGGER.debug("[UPDATE] Global Mode: {}".format(self.coordinator.data.global_mode))
         self.__select_option(
-            GLOBAL_MODE_TRANSLATION[int(self.coordinator.data['glob'])]
+            GLOBAL_MODE_TRANSLATION[int(self.coordinator.data.global_mode)]
         )
         self.async_write_ha_state()
 
-class EfficiencySelect(CoordinatorEntity, SelectEntity):
+class EfficiencySelect(KoolnovaEntity, SelectEntity):
     """Select component to set global efficiency """
 
     _attr_entity_category: EntityCategory = EntityCategory.CONFIG
@@ -122,6 +134,14 @@ class EfficiencySelect(CoordinatorEntity, SelectEntity):
             EFF_TRANSLATION[int(self._device.efficiency)]
         )
 
+    def _interest_registers(self) -> set:
+        """ efficiency register """
+        return {REG_EFFICIENCY}
+
+    def _watched_fields(self) -> frozenset:
+        """ efficiency """
+        return image.watch(image.SYSTEM, 0, ('eff',))
+
     def __select_option(self,
                         option: str,
                         ) -> None:
@@ -133,26 +153,21 @@ class EfficiencySelect(CoordinatorEntity, SelectEntity):
                                     ) -> None:
         """ Change the selected option. """
         _LOGGER.debug("[EFF] async_select_option: {}".format(option))
-        opt = 0
-        for k,v in EFF_TRANSLATION.items():
-            if v == option:
-                opt = k
-                break
-        await self._device.async_set_efficiency(Efficiency(opt))
-        self.__select_option(option)
-        await self.coordinator.async_request_refresh()
+        opt = EFF_REVERSE.get(option, 0)
+        self._async_optimistic(_attr_current_option = option)
+        await self._async_write(self._device.async_set_efficiency(Efficiency(opt)), {REG_EFFICIENCY})
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """ Handle updated data from the coordinator
             Retrieve latest state of global efficiency """
-        _LOGGER.debug("[UPDATE] Efficiency: {}".format(self.coordinator.data['eff']))
+        _LOGGER.debug("[UPDATE] Efficiency: {}".format(self.coordinator.data.efficiency))
         self.__select_option(
-            EFF_TRANSLATION[int(self.coordinator.data['eff'])]
+            EFF_TRANSLATION[int(self.coordinator.data.efficiency)]
         )
         self.async_write_ha_state()
 
-class EngineStateSelect(CoordinatorEntity, SelectEntity):
+class EngineStateSelect(KoolnovaEntity, SelectEntity):
     """Select component to set flow engine """
 
     _attr_entity_category: EntityCategory = EntityCategory.CONFIG
@@ -174,6 +189,14 @@ class EngineStateSelect(CoordinatorEntity, SelectEntity):
             ENGINE_FLOW_TRANSLATION[int(self._engine.state)]
         )
 
+    def _interest_registers(self) -> set:
+        """ flow state register of the engine """
+        return {REG_START_FLOW_STATE_ENGINE + (self._engine.engine_id - 1)}
+
+    def _watched_fields(self) -> frozenset:
+        """ flow state of the engine """
+        return image.watch(image.ENGINE, self._engine.engine_id, ('state',))
+
     def __select_option(self,
                         option: str,
                         ) -> None:
@@ -185,24 +208,18 @@ class EngineStateSelect(CoordinatorEntity, SelectEntity):
                                     ) -> None:
         """ Change the selected option. """
         _LOGGER.debug("[ENGINE FLOW] async_select_option: {}".format(option))
-        opt = 0
-        for k,v in ENGINE_FLOW_TRANSLATION.items():
-            if v == option:
-                opt = k
-                break
-        await self._device.async_set_engine_state(FlowEngine(opt), self._engine.engine_id)
-        self.__select_option(option)
-        await self.coordinator.async_request_refresh()
+        opt = ENGINE_FLOW_REVERSE.get(option, 0)
+        self._async_optimistic(_attr_current_option = option)
+        await self._async_write(self._device.async_set_engine_state(FlowEngine(opt), self._engine.engine_id),
+                                {REG_START_FLOW_STATE_ENGINE + (self._engine.engine_id - 1)})
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """ Handle updated data from the coordinator
             Retrieve latest state of global efficiency """
-        for _cur_engine in self.coordinator.data['engines']:
-            if self._engine.engine_id == _cur_engine.engine_id:
-                _LOGGER.debug("[UPDATE] [ENGINE AC{}] Order temp: {}".format(_cur_engine.engine_id, _cur_engine.state))
-                self.__select_option(
-                    ENGINE_FLOW_TRANSLATION[int(_cur_engine.state)]
-                )
-                break
+        _engine = self.coordinator.data.engine(self._engine.engine_id)
+        _LOGGER.debug("[UPDATE] [ENGINE AC{}] State: {}".format(_engine.engine_id, _engine.state))
+        self.__select_option(
+            ENGINE_FLOW_TRANSLATION[int(_engine.state)]
+        )
         self.async_write_ha_state()
\ No newline at end of file
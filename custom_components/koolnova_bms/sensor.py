@@ -28,15 +28,25 @@ from homeassistant.const import (
 )
 
 from .const import (
-    DOMAIN
+    DOMAIN,
+    FLEET,
 )
 
-from .coordinator import KoolnovaCoordinator
+from .coordinator import KoolnovaCoordinator, KoolnovaEntity, STATS_CONTEXT
 
 from .koolnova.device import (
     Koolnova, 
     Engine,
 )
+from .koolnova.fleet import Fleet
+from .koolnova import image
+from .koolnova.const import (
+    POLL_FAST,
+    POLL_MEDIUM,
+    POLL_SLOW,
+    REG_START_FLOW_ENGINE,
+    REG_START_ORDER_TEMP,
+)
 
 _LOGGER = logging.getLogger(__name__)
 MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=30)
@@ -48,8 +58,8 @@ async def async_setup_entry(hass: HomeAssistant,
         ConfigEntry passée en argument
     """
     entities = []
-    device = hass.data[DOMAIN]["device"]
-    coordinator = hass.data[DOMAIN]["coordinator"]
+    device = hass.data[DOMAIN][entry.entry_id]["device"]
+    coordinators = hass.data[DOMAIN][entry.entry_id]["coordinators"]
     if entry.data.get("Mode") == "Modbus RTU":
         entities.append(DiagnosticsSensor(device, "Device", entry.data))
         entities.append(DiagnosticsSensor(device, "Address", entry.data))
@@ -58,10 +68,17 @@ async def async_setup_entry(hass: HomeAssistant,
         entities.append(DiagModbusSensor(device, entry.data))
     else:
         _LOGGER.error("Mode unknown")
+    entities.append(DiagInterFrameGapSensor(coordinators[POLL_FAST], device))
+    entities.append(DiagBusQueueWaitSensor(coordinators[POLL_FAST], device))
+    entities.append(DiagSuppressedWritesSensor(coordinators[POLL_FAST], device))
+    entities.append(DiagFleetPollLatencySensor(coordinators[POLL_FAST], device, hass.data[FLEET]))
+    # dispatch counters change on every poll, refreshed with the slow group
+    entities.append(DiagStateWritesSensor(coordinators[POLL_SLOW], device, coordinators))
 
+    # engines throughput and order temperature are polled by the medium group
     for engine in device.engines:
-        entities.append(DiagEngineThroughputSensor(coordinator, device, engine))
-        entities.append(DiagEngineTempOrderSensor(coordinator, device, engine))
+        entities.append(DiagEngineThroughputSensor(coordinators[POLL_MEDIUM], device, engine))
+        entities.append(DiagEngineTempOrderSensor(coordinators[POLL_MEDIUM], device, engine))
     async_add_entities(entities)
 
 class DiagnosticsSensor(SensorEntity):
@@ -127,7 +144,7 @@ class DiagModbusSensor(SensorEntity):
         """ Do not poll for those entities """
         return False
 
-class DiagEngineThroughputSensor(CoordinatorEntity, SensorEntity):
+class DiagEngineThroughputSensor(KoolnovaEntity, SensorEntity):
     # pylint: disable = too-many-instance-attributes
     """ Representation of a Sensor """
 
@@ -152,16 +169,23 @@ class DiagEngineThroughputSensor(CoordinatorEntity, SensorEntity):
     def icon(self) -> str | None:
         return "mdi:thermostat-cog"
 
+    def _interest_registers(self) -> set:
+        """ throughput register of the engine """
+        return {REG_START_FLOW_ENGINE + (self._engine.engine_id - 1)}
+
+    def _watched_fields(self) -> frozenset:
+        """ throughput of the engine """
+        return image.watch(image.ENGINE, self._engine.engine_id, ('throughput',))
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """ Handle updated data from the coordinator """
-        for _cur_engine in self.coordinator.data['engines']:
-            if self._engine.engine_id == _cur_engine.engine_id:
-                _LOGGER.debug("[UPDATE] [ENGINE AC{}] Troughput: {}".format(_cur_engine.engine_id, _cur_engine.throughput))
-                self._attr_native_value = "{}".format(_cur_engine.throughput)
+        _engine = self.coordinator.data.engine(self._engine.engine_id)
+        _LOGGER.debug("[UPDATE] [ENGINE AC{}] Troughput: {}".format(_engine.engine_id, _engine.throughput))
+        self._attr_native_value = "{}".format(_engine.throughput)
         self.async_write_ha_state()
 
-class DiagEngineTempOrderSensor(CoordinatorEntity, SensorEntity):
+class DiagEngineTempOrderSensor(KoolnovaEntity, SensorEntity):
     # pylint: disable = too-many-instance-attributes
     """ Representation of a Sensor """
 
@@ -187,11 +211,204 @@ class DiagEngineTempOrderSensor(CoordinatorEntity, SensorEntity):
     def icon(self) -> str | None:
         return "mdi:thermometer-lines"
 
+    def _interest_registers(self) -> set:
+        """ order temperature register of the engine """
+        return {REG_START_ORDER_TEMP + (self._engine.engine_id - 1)}
+
+    def _watched_fields(self) -> frozenset:
+        """ order temperature of the engine """
+        return image.watch(image.ENGINE, self._engine.engine_id, ('order_temp',))
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """ Handle updated data from the coordinator """
-        for _cur_engine in self.coordinator.data['engines']:
-            if self._engine.engine_id == _cur_engine.engine_id:
-                _LOGGER.debug("[UPDATE] [ENGINE AC{}] Order temp: {}".format(_cur_engine.engine_id, _cur_engine.order_temp))
-                self._attr_native_value = "{}".format(_cur_engine.order_temp)
-        self.async_write_ha_state()
\ No newline at end of file
+        _engine = self.coordinator.data.engine(self._engine.engine_id)
+        _LOGGER.debug("[UPDATE] [ENGINE AC{}] Order temp: {}".format(_engine.engine_id, _engine.order_temp))
+        self._attr_native_value = "{}".format(_engine.order_temp)
+        self.async_write_ha_state()
+
+class DiagStatsSensor(CoordinatorEntity, SensorEntity):
+    """ diagnostic sensor computed from bus or fleet statistics
+
+        Refreshed on every update of its coordinator, the state is only
+        written when the value, the attributes or the availability changed.
+    """
+
+    _attr_entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+    _attr_extra_state_attributes: dict | None = None
+    # availability, value and attributes of the last written state
+    _written: tuple | None = None
+
+    def __init__(self,
+                    coordinator: KoolnovaCoordinator,
+                    ) -> None:
+        """ refreshed on every dispatch, left out of the dispatch statistics """
+        super().__init__(coordinator, context=STATS_CONTEXT)
+
+    def _update_stats(self) -> None:
+        """ compute the value and the attributes """
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """ Handle updated data from the coordinator """
+        self._update_stats()
+        state = (self.available, self._attr_native_value, self._attr_extra_state_attributes)
+        if state != self._written:
+            self._written = state
+            self.async_write_ha_state()
+
+class DiagInterFrameGapSensor(DiagStatsSensor):
+    # pylint: disable = too-many-instance-attributes
+    """ Representation of a Sensor """
+
+    _attr_entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+    _attr_native_unit_of_measurement: str = UnitOfTime.MILLISECONDS
+
+    def __init__(self,
+                    coordinator: KoolnovaCoordinator, # pylint: disable=unused-argument
+                    device: Koolnova, # pylint: disable=unused-argument
+                    ) -> None:
+        """ Class constructor """
+        super().__init__(coordinator)
+        self._device = device
+        self._attr_name = f"{self._device.name} Modbus inter-frame gap"
+        self._attr_entity_registry_enabled_default = True
+        self._attr_device_info = self._device.device_info
+        self._attr_unique_id = f"{DOMAIN}-{self._device.name}-Modbus-inter-frame-gap-sensor"
+        self._update_stats()
+
+    def _update_stats(self) -> None:
+        """ inter-frame gap of the link """
+        self._attr_native_value = round(self._device.inter_frame_gap * 1000, 2)
+
+    @property
+    def icon(self) -> str | None:
+        return "mdi:timer-sand"
+
+class DiagBusQueueWaitSensor(DiagStatsSensor):
+    # pylint: disable = too-many-instance-attributes
+    """ Representation of a Sensor """
+
+    _attr_entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+    _attr_native_unit_of_measurement: str = UnitOfTime.MILLISECONDS
+
+    def __init__(self,
+                    coordinator: KoolnovaCoordinator, # pylint: disable=unused-argument
+                    device: Koolnova, # pylint: disable=unused-argument
+                    ) -> None:
+        """ Class constructor """
+        super().__init__(coordinator)
+        self._device = device
+        self._attr_name = f"{self._device.name} Modbus write queue wait"
+        self._attr_entity_registry_enabled_default = True
+        self._attr_device_info = self._device.device_info
+        self._attr_unique_id = f"{DOMAIN}-{self._device.name}-Modbus-queue-wait-sensor"
+        self._update_stats()
+
+    def _update_stats(self) -> None:
+        """ max queue-wait of user writes as state, every priority class as attributes """
+        stats = self._device.queue_wait_stats
+        # no statistics until the worker streamed them (worker mode)
+        self._attr_native_value = stats.get('write', {}).get('max_ms', 0.0)
+        self._attr_extra_state_attributes = stats
+
+    @property
+    def icon(self) -> str | None:
+        return "mdi:timer-outline"
+
+class DiagSuppressedWritesSensor(DiagStatsSensor):
+    # pylint: disable = too-many-instance-attributes
+    """ Representation of a Sensor """
+
+    _attr_entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+    _attr_state_class: SensorStateClass | None = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self,
+                    coordinator: KoolnovaCoordinator, # pylint: disable=unused-argument
+                    device: Koolnova, # pylint: disable=unused-argument
+                    ) -> None:
+        """ Class constructor """
+        super().__init__(coordinator)
+        self._device = device
+        self._attr_name = f"{self._device.name} Modbus suppressed writes"
+        self._attr_entity_registry_enabled_default = True
+        self._attr_device_info = self._device.device_info
+        self._attr_unique_id = f"{DOMAIN}-{self._device.name}-Modbus-suppressed-writes-sensor"
+        self._update_stats()
+
+    def _update_stats(self) -> None:
+        """ writes skipped because the value was already in effect """
+        self._attr_native_value = self._device.suppressed_writes
+
+    @property
+    def icon(self) -> str | None:
+        return "mdi:content-save-off-outline"
+
+class DiagFleetPollLatencySensor(DiagStatsSensor):
+    # pylint: disable = too-many-instance-attributes
+    """ Representation of a Sensor """
+
+    _attr_entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+    _attr_native_unit_of_measurement: str = UnitOfTime.MILLISECONDS
+
+    def __init__(self,
+                    coordinator: KoolnovaCoordinator, # pylint: disable=unused-argument
+                    device: Koolnova, # pylint: disable=unused-argument
+                    fleet: Fleet, # pylint: disable=unused-argument
+                    ) -> None:
+        """ Class constructor """
+        super().__init__(coordinator)
+        self._device = device
+        self._fleet = fleet
+        self._attr_name = f"{self._device.name} Fleet poll latency"
+        self._attr_entity_registry_enabled_default = True
+        self._attr_device_info = self._device.device_info
+        self._attr_unique_id = f"{DOMAIN}-{self._device.name}-Fleet-poll-latency-sensor"
+        self._update_stats()
+
+    def _update_stats(self) -> None:
+        """ p90 poll latency of the whole fleet as state, every percentile as attributes """
+        stats = self._fleet.latency_percentiles
+        self._attr_native_value = stats['p90']
+        self._attr_extra_state_attributes = stats
+
+    @property
+    def icon(self) -> str | None:
+        return "mdi:timer-cog-outline"
+
+class DiagStateWritesSensor(DiagStatsSensor):
+    # pylint: disable = too-many-instance-attributes
+    """ Representation of a Sensor """
+
+    _attr_entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+
+    def __init__(self,
+                    coordinator: KoolnovaCoordinator, # pylint: disable=unused-argument
+                    device: Koolnova, # pylint: disable=unused-argument
+                    coordinators: dict, # pylint: disable=unused-argument
+                    ) -> None:
+        """ Class constructor """
+        super().__init__(coordinator)
+        self._device = device
+        self._coordinators = coordinators
+        self._attr_name = f"{self._device.name} State writes per poll"
+        self._attr_entity_registry_enabled_default = True
+        self._attr_device_info = self._device.device_info
+        self._attr_unique_id = f"{DOMAIN}-{self._device.name}-State-writes-per-poll-sensor"
+        self._update_stats()
+
+    def _update_stats(self) -> None:
+        """ entities woken per dispatch as state, listeners (woken before field dispatch) and groups as attributes """
+        stats = {group: coordinator.dispatch_stats for group, coordinator in self._coordinators.items()}
+        dispatches = sum(stat['dispatches'] for stat in stats.values())
+        woken = sum(stat['woken'] for stat in stats.values())
+        skipped = sum(stat['skipped'] for stat in stats.values())
+        self._attr_native_value = round(woken / dispatches, 2) if dispatches else 0.0
+        self._attr_extra_state_attributes = {
+            'listeners_per_poll': round((woken + skipped) / dispatches, 2) if dispatches else 0.0,
+            **stats,
+        }
+
+    @property
+    def icon(self) -> str | None:
+        return "mdi:database-edit-outline"
@@ -0,0 +1,121 @@
+""" for koolnova services """
+from __future__ import annotations
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.const import ATTR_TEMPERATURE
+
+from .const import (
+    DOMAIN,
+    SUPPORTED_HVAC_MODES,
+    SUPPORTED_FAN_MODES,
+    FAN_REVERSE,
+    HVAC_REVERSE,
+)
+
+from .koolnova.const import (
+    NB_ZONE_MAX,
+    MIN_TEMP_ORDER,
+    MAX_TEMP_ORDER,
+    ZoneState,
+    ZoneClimMode,
+    ZoneFanMode,
+    SysState,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_APPLY_ZONES = "apply_zones"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_ZONES = "zones"
+ATTR_AREA_ID = "area_id"
+ATTR_HVAC_MODE = "hvac_mode"
+ATTR_FAN_MODE = "fan_mode"
+ATTR_SYSTEM_STATE = "system_state"
+ATTR_TRANSACTIONS = "transactions"
+
+ZONE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_AREA_ID): vol.All(vol.Coerce(int), vol.Range(min=1, max=NB_ZONE_MAX)),
+        vol.Optional(ATTR_HVAC_MODE): vol.In([str(mode) for mode in SUPPORTED_HVAC_MODES]),
+        vol.Optional(ATTR_FAN_MODE): vol.In(SUPPORTED_FAN_MODES),
+        vol.Optional(ATTR_TEMPERATURE): vol.All(vol.Coerce(float), vol.Range(min=MIN_TEMP_ORDER, max=MAX_TEMP_ORDER)),
+    }
+)
+
+SYSTEM_STATES = {"on": SysState.SYS_STATE_ON,
+                    "off": SysState.SYS_STATE_OFF}
+
+APPLY_ZONES_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_ZONES): vol.All(cv.ensure_list, [ZONE_SCHEMA]),
+        # the system state is only written when asked for
+        vol.Optional(ATTR_SYSTEM_STATE): vol.In(list(SYSTEM_STATES)),
+    }
+)
+
+def _entry_data(hass: HomeAssistant, entry_id: str | None) -> dict:
+    """ runtime data of the targeted config entry, optional with a single controller """
+    entries = hass.data.get(DOMAIN, {})
+    if entry_id is None:
+        if len(entries) != 1:
+            raise HomeAssistantError("Several koolnova controllers are configured, config_entry_id is required")
+        return next(iter(entries.values()))
+    if entry_id not in entries:
+        raise HomeAssistantError("Koolnova config entry {} not loaded".format(entry_id))
+    return entries[entry_id]
+
+def _desired_zone(zone: dict) -> dict:
+    """ translate a zone of the service call to area values """
+    desired = {}
+    if ATTR_HVAC_MODE in zone:
+        opt = HVAC_REVERSE[zone[ATTR_HVAC_MODE]]
+        if ZoneClimMode(opt) == ZoneClimMode.OFF:
+            desired['state'] = ZoneState.STATE_OFF
+        else:
+            desired['state'] = ZoneState.STATE_ON
+            desired['clim'] = ZoneClimMode(opt)
+    if ATTR_FAN_MODE in zone:
+        desired['fan'] = ZoneFanMode(FAN_REVERSE[zone[ATTR_FAN_MODE]])
+    if ATTR_TEMPERATURE in zone:
+        desired['order_temp'] = zone[ATTR_TEMPERATURE]
+    return desired
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """ Register koolnova services """
+
+    async def async_apply_zones(call: ServiceCall) -> ServiceResponse:
+        """ apply a desired state to many areas in the minimal number of writes """
+        data = _entry_data(hass, call.data.get(ATTR_CONFIG_ENTRY_ID))
+        device = data["device"]
+        coordinators = data["coordinators"]
+        zones = {zone[ATTR_AREA_ID]: _desired_zone(zone) for zone in call.data[ATTR_ZONES]}
+        sys_state = SYSTEM_STATES.get(call.data.get(ATTR_SYSTEM_STATE))
+        ret, transactions = await device.async_apply_zones(zones, sys_state = sys_state)
+        if not ret:
+            raise HomeAssistantError("Error applying zones to the koolnova system")
+        _LOGGER.debug("apply zones done in {} transactions".format(transactions))
+        for coordinator in coordinators.values():
+            coordinator.async_set_updated_data(device.data)
+        return {ATTR_TRANSACTIONS: transactions}
+
+    if not hass.services.has_service(DOMAIN, SERVICE_APPLY_ZONES):
+        hass.services.async_register(DOMAIN,
+                                        SERVICE_APPLY_ZONES,
+                                        async_apply_zones,
+                                        schema=APPLY_ZONES_SCHEMA,
+                                        supports_response=SupportsResponse.OPTIONAL)
+
+def async_unload_services(hass: HomeAssistant) -> None:
+    """ Unregister koolnova services """
+    hass.services.async_remove(DOMAIN, SERVICE_APPLY_ZONES)
@@ -0,0 +1,65 @@
+""" persistence of the last known registers of a koolnova controller """
+from __future__ import annotations
+
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    STORAGE_VERSION,
+    STORAGE_SAVE_DELAY,
+)
+
+from .koolnova.device import Koolnova
+from .koolnova.const import NB_REGISTERS
+
+_LOGGER = logging.getLogger(__name__)
+
+def _store(hass: HomeAssistant,
+            entry_id: str,
+            ) -> Store:
+    """ storage of a config entry """
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+async def async_remove_store(hass: HomeAssistant,
+                                entry_id: str,
+                                ) -> None:
+    """ remove the registers saved for a removed config entry """
+    await _store(hass, entry_id).async_remove()
+
+class KoolnovaStore:
+    """ last known register image of a config entry, in .storage """
+
+    def __init__(self,
+                    hass: HomeAssistant,
+                    entry_id: str,
+                    device: Koolnova,
+                ) -> None:
+        """ Class constructor """
+        self._store = _store(hass, entry_id)
+        self._device = device
+        # snapshot version saved last
+        self._version: int | None = None
+
+    async def async_load(self) -> list | None:
+        """ registers saved by a previous run, None if there are none """
+        data = await self._store.async_load()
+        if not data or len(data.get('registers', [])) != NB_REGISTERS:
+            return None
+        return data['registers']
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """ save the registers if the snapshot changed, writes are delayed and folded """
+        version = self._device.snapshot.version
+        if version == self._version:
+            return
+        self._version = version
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """ data written to the store """
+        return {'registers': self._device.registers}
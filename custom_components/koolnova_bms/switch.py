@@ -21,7 +21,7 @@ from .const import (
     DOMAIN
 )
 
-from .coordinator import KoolnovaCoordinator
+from .coordinator import KoolnovaCoordinator, KoolnovaEntity
 
 from homeassistant.const import (
     STATE_OFF,
@@ -29,8 +29,11 @@ from homeassistant.const import (
 )
 
 from .koolnova.device import Koolnova
+from .koolnova import image
 from .koolnova.const import (
     SysState,
+    POLL_FAST,
+    REG_SYS_STATE,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -41,8 +44,8 @@ async def async_setup_entry(hass: HomeAssistant,
                             ):
     """ Setup switch entries """
 
-    device = hass.data[DOMAIN]["device"]
-    coordinator = hass.data[DOMAIN]["coordinator"]
+    device = hass.data[DOMAIN][entry.entry_id]["device"]
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinators"][POLL_FAST]
 
     entities = [
         SystemStateSwitch(coordinator, device),
@@ -50,7 +53,7 @@ async def async_setup_entry(hass: HomeAssistant,
     ]
     async_add_entities(entities)
 
-class SystemStateSwitch(CoordinatorEntity, SwitchEntity):
+class SystemStateSwitch(KoolnovaEntity, SwitchEntity):
     """Select component to set system state """
     _attr_has_entity_name: bool = True
     _attr_device_class: SwitchDeviceClass = SwitchDeviceClass.SWITCH
@@ -71,38 +74,37 @@ class SystemStateSwitch(CoordinatorEntity, SwitchEntity):
         else:
             self._attr_state = STATE_OFF
 
+    def _interest_registers(self) -> set:
+        """ system state register """
+        return {REG_SYS_STATE}
+
+    def _watched_fields(self) -> frozenset:
+        """ system state """
+        return image.watch(image.SYSTEM, 0, ('sys',))
+
     async def async_turn_on(self, **kwargs):
         """ Turn the entity on. """
         _LOGGER.debug("Turn on system")
-        await self._device.async_set_sys_state(SysState.SYS_STATE_ON)
-        self._attr_is_on = True
-        self._attr_state = STATE_ON
-        await self.coordinator.async_request_refresh()
+        self._async_optimistic(_attr_is_on = True, _attr_state = STATE_ON)
+        await self._async_write(self._device.async_set_sys_state(SysState.SYS_STATE_ON), {REG_SYS_STATE})
 
     async def async_turn_off(self, **kwargs):
         """ Turn the entity off. """
         _LOGGER.debug("Turn off system")
-        await self._device.async_set_sys_state(SysState.SYS_STATE_OFF)
-        self._attr_is_on = False
-        self._attr_state = STATE_OFF
-        await self.coordinator.async_request_refresh()
+        self._async_optimistic(_attr_is_on = False, _attr_state = STATE_OFF)
+        await self._async_write(self._device.async_set_sys_state(SysState.SYS_STATE_OFF), {REG_SYS_STATE})
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """ Handle updated data from the coordinator """
-        self._attr_is_on = bool(int(self.coordinator.data['sys']))
-        _LOGGER.debug("[UPDATE] Switch State: {}".format(bool(int(self.coordinator.data['sys']))))
-        if bool(int(self.coordinator.data['sys'])):
+        self._attr_is_on = bool(int(self.coordinator.data.sys_state))
+        _LOGGER.debug("[UPDATE] Switch State: {}".format(bool(int(self.coordinator.data.sys_state))))
+        if bool(int(self.coordinator.data.sys_state)):
             self._attr_state = STATE_ON
         else:
             self._attr_state = STATE_OFF
         self.async_write_ha_state()
 
-    @property
-    def is_on(self) -> bool | None:
-        """Return True if entity is on."""
-        return bool(int(self._device.sys_state))
-
     @property
     def icon(self) -> str | None:
         """Icon of the entity."""
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+# @Brief Koolnova register decoding microbenchmark.
+#        Decodes N random register images with Enum constructors on bit
+#        arithmetic (former decoder), the per-register lookup table decoder,
+#        the pure Python image decoder and the numpy image decoder.
+
+import os,sys
+import argparse
+import random
+import timeit
+
+# appended: the integration modules (select.py, ...) must not shadow the standard library
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "custom_components", "koolnova_bms"))
+
+from koolnova import codec
+from koolnova import const
+
+def get_commandline() -> argparse.Namespace:
+    """ Read and validate command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run koolnova decoding microbenchmark.")
+    parser.add_argument("--images", help="comma separated numbers of images", type=str, default="1,10,100,1000")
+    parser.add_argument("--repeat", help="timing repetitions (best is kept)", type=int, default=5)
+    parser.add_argument("--seed", help="random seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def random_image(rnd:random.Random) -> list:
+    """ Register image with valid values for every field.
+    """
+    image = [0] * const.NB_REGISTERS
+    for zone_idx in range(const.NB_ZONE_MAX):
+        reg = const.REG_START_ZONE + const.NUM_REG_PER_ZONE * zone_idx
+        image[reg + const.REG_LOCK_ZONE] = rnd.randint(0, 3)
+        image[reg + const.REG_STATE_AND_FLOW] = (rnd.choice(list(const.ZoneFanMode)).value << 4) | rnd.choice(list(const.ZoneClimMode)).value
+        image[reg + const.REG_TEMP_ORDER] = rnd.randint(30, 70)
+        image[reg + const.REG_TEMP_REAL] = rnd.randint(0, 100)
+    for engine_idx in range(const.NUM_OF_ENGINES):
+        image[const.REG_START_FLOW_ENGINE + engine_idx] = rnd.randint(0, 15)
+        image[const.REG_START_ORDER_TEMP + engine_idx] = rnd.randint(30, 60)
+        image[const.REG_START_FLOW_STATE_ENGINE + engine_idx] = rnd.choice(list(const.FlowEngine)).value
+    image[const.REG_EFFICIENCY] = rnd.choice(list(const.Efficiency)).value
+    image[const.REG_SYS_STATE] = rnd.choice(list(const.SysState)).value
+    image[const.REG_GLOBAL_MODE] = rnd.choice(list(const.GlobalMode)).value
+    return image
+
+
+def decode_arithmetic(images:list) -> list:
+    """ Per-register decoding building Enum objects from bit arithmetic (former decoder).
+    """
+    snaps = []
+    for image in images:
+        areas = {}
+        for zone_idx in range(const.NB_ZONE_MAX):
+            reg = const.REG_START_ZONE + const.NUM_REG_PER_ZONE * zone_idx
+            lock = image[reg + const.REG_LOCK_ZONE]
+            if const.ZoneRegister(lock >> 1) != const.ZoneRegister.REGISTER_ON:
+                continue
+            flow = image[reg + const.REG_STATE_AND_FLOW]
+            areas[zone_idx + 1] = {'state': const.ZoneState(lock & 0b01),
+                                    'register': const.ZoneRegister(lock >> 1),
+                                    'fan': const.ZoneFanMode((flow & 0xF0) >> 4),
+                                    'clim': const.ZoneClimMode(flow & 0x0F),
+                                    'order_temp': image[reg + const.REG_TEMP_ORDER] / 2,
+                                    'real_temp': image[reg + const.REG_TEMP_REAL] / 2}
+        snaps.append({'areas': areas,
+                        'glob': const.GlobalMode(image[const.REG_GLOBAL_MODE]),
+                        'eff': const.Efficiency(image[const.REG_EFFICIENCY]),
+                        'sys': const.SysState(image[const.REG_SYS_STATE])})
+    return snaps
+
+
+def decode_tables(values:dict) -> dict:
+    """ Per-register decoding of {register: value} with the codec lookup tables
+        (former poll decoder), unregistered areas and undefined values skipped.
+    """
+    snap = {'areas': {}, 'engines': {}}
+    for zone_idx in range(const.NB_ZONE_MAX):
+        reg = const.REG_START_ZONE + const.NUM_REG_PER_ZONE * zone_idx
+        area = {}
+        if reg + const.REG_LOCK_ZONE in values:
+            register, state = codec.decode_lock_zone(values[reg + const.REG_LOCK_ZONE])
+            if register is None or state is None or register == const.ZoneRegister.REGISTER_OFF:
+                continue
+            area['state'] = state
+            area['register'] = register
+        if reg + const.REG_STATE_AND_FLOW in values:
+            fan, clim = codec.decode_state_and_flow(values[reg + const.REG_STATE_AND_FLOW])
+            if fan is not None:
+                area['fan'] = fan
+            if clim is not None:
+                area['clim'] = clim
+        if reg + const.REG_TEMP_ORDER in values:
+            area['order_temp'] = values[reg + const.REG_TEMP_ORDER] / 2
+        if reg + const.REG_TEMP_REAL in values:
+            area['real_temp'] = values[reg + const.REG_TEMP_REAL] / 2
+        if area:
+            snap['areas'][zone_idx + 1] = area
+    for engine_idx in range(const.NUM_OF_ENGINES):
+        engine = {}
+        if const.REG_START_FLOW_ENGINE + engine_idx in values:
+            engine['throughput'] = values[const.REG_START_FLOW_ENGINE + engine_idx]
+        if const.REG_START_FLOW_STATE_ENGINE + engine_idx in values:
+            state = codec.FLOW_ENGINES.get(values[const.REG_START_FLOW_STATE_ENGINE + engine_idx])
+            if state is not None:
+                engine['state'] = state
+        if const.REG_START_ORDER_TEMP + engine_idx in values:
+            engine['order_temp'] = values[const.REG_START_ORDER_TEMP + engine_idx] / 2
+        if engine:
+            snap['engines'][engine_idx + 1] = engine
+    for key, reg, table in (('glob', const.REG_GLOBAL_MODE, codec.GLOBAL_MODES),
+                            ('eff', const.REG_EFFICIENCY, codec.EFFICIENCIES),
+                            ('sys', const.REG_SYS_STATE, codec.SYS_STATES)):
+        if values.get(reg) in table:
+            snap[key] = table[values[reg]]
+    return snap
+
+
+def decode_enums(images:list) -> list:
+    """ Per-register decoding with lookup tables (decode_tables).
+    """
+    return [decode_tables(dict(enumerate(image))) for image in images]
+
+
+def check(images:list) -> None:
+    """ Both image decoders give identical results, matching the Enum decoder.
+    """
+    python = codec.as_lists(codec.decode_images(images, use_numpy=False))
+    if codec.np is not None:
+        assert codec.as_lists(codec.decode_images(images, use_numpy=True)) == python, "numpy and Python decoders differ"
+    decoded = codec.decode_images(images)
+    for row, (snap, former) in enumerate(zip(decode_enums(images), decode_arithmetic(images))):
+        assert {key: former[key] for key in former} == {key: snap[key] for key in former}
+        assert sorted(snap['areas']) == codec.registered_areas(decoded, row)
+        for zone_id, values in snap['areas'].items():
+            assert codec.area_values(decoded, row, zone_id) == values
+        assert codec.system_values(decoded, row) == {key: snap[key] for key in codec.SYSTEM_FIELDS}
+
+
+def main():
+    """ Run the benchmark.
+    """
+    args = get_commandline()
+    rnd = random.Random(args.seed)
+    print("numpy: {}".format(codec.np.__version__ if codec.np is not None else "not installed"))
+    print("{:>7} {:>14} {:>14} {:>14} {:>14}".format("images", "arith (ms)", "tables (ms)", "python (ms)", "numpy (ms)"))
+    for count in [int(n) for n in args.images.split(",")]:
+        images = [random_image(rnd) for _ in range(count)]
+        check(images)
+        timings = [min(timeit.repeat(lambda: decode_arithmetic(images), number=1, repeat=args.repeat)),
+                    min(timeit.repeat(lambda: decode_enums(images), number=1, repeat=args.repeat)),
+                    min(timeit.repeat(lambda: codec.decode_images(images, use_numpy=False), number=1, repeat=args.repeat))]
+        if codec.np is not None:
+            matrix = codec.np.asarray(images, dtype=codec.np.uint16)
+            timings.append(min(timeit.repeat(lambda: codec.decode_images(matrix, use_numpy=True), number=1, repeat=args.repeat)))
+        print("{:>7} ".format(count) + " ".join("{:>14.3f}".format(1000 * timing) for timing in timings))
+
+
+if __name__ == "__main__":
+    main()
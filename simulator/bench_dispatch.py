@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+# @Brief Koolnova entity dispatch benchmark.
+#        Replays polls where a few registers drift and counts the entity
+#        state writes per poll: every entity (former dispatch) against the
+#        entities whose watched fields changed.
+
+import os,sys
+import argparse
+import random
+
+# appended: the integration modules (select.py, ...) must not shadow the standard library
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "custom_components", "koolnova_bms"))
+
+from koolnova.image import RegisterImage
+from koolnova import image
+from koolnova import const
+
+from bench_image import poll_values
+
+def get_commandline() -> argparse.Namespace:
+    """ Read and validate command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run koolnova entity dispatch benchmark.")
+    parser.add_argument("--polls", help="number of polls replayed", type=int, default=1000)
+    parser.add_argument("--drift", help="real temperatures changing per poll", type=int, default=2)
+    parser.add_argument("--writes", help="setpoint or mode changes per poll (probability)", type=float, default=0.05)
+    parser.add_argument("--seed", help="random seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def entities() -> list:
+    """ Watched fields of the entities of a 16 areas controller (climate, selects, sensors, switch).
+    """
+    watched = [image.watch(image.AREA, zone_id, image.AREA_FIELDS) for zone_id in range(1, const.NB_ZONE_MAX + 1)]
+    for engine_id in range(1, const.NUM_OF_ENGINES + 1):
+        watched += [image.watch(image.ENGINE, engine_id, (field,)) for field in image.ENGINE_FIELDS]
+    watched += [image.watch(image.SYSTEM, 0, (field,)) for field in image.SYSTEM_FIELDS]
+    return watched
+
+
+def main():
+    """ Run the benchmark.
+    """
+    args = get_commandline()
+    rnd = random.Random(args.seed)
+    watched = entities()
+    values = poll_values(rnd)
+    regs = RegisterImage()
+    regs.update(values)
+
+    before = after = 0
+    for _ in range(args.polls):
+        for zone_id in rnd.sample(range(1, const.NB_ZONE_MAX + 1), args.drift):
+            reg = const.REG_START_ZONE + const.NUM_REG_PER_ZONE * (zone_id - 1) + const.REG_TEMP_REAL
+            values[reg] = max(0, min(100, values[reg] + rnd.choice((-1, 1))))
+        if rnd.random() < args.writes:
+            reg = const.REG_START_ZONE + const.NUM_REG_PER_ZONE * rnd.randrange(const.NB_ZONE_MAX) + const.REG_TEMP_ORDER
+            values[reg] = rnd.randint(30, 70)
+        changes = image.changed_fields(regs.update(values))
+        before += len(watched)
+        after += sum(1 for fields in watched if not fields.isdisjoint(changes))
+
+    print("{} entities, {} polls, {} real temperatures drifting per poll".format(len(watched), args.polls, args.drift))
+    print("{:>10} {:>16}".format("dispatch", "writes/poll"))
+    print("{:>10} {:>16.2f}".format("every", before / args.polls))
+    print("{:>10} {:>16.2f}".format("changed", after / args.polls))
+
+
+if __name__ == "__main__":
+    main()
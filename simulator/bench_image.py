@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+# @Brief Koolnova controller state microbenchmark.
+#        Compares memory per controller and allocations per poll of the
+#        decoded register dicts (former poll path) and of the register
+#        image with its area and engine views.
+
+import os,sys
+import argparse
+import random
+import timeit
+import tracemalloc
+
+# appended: the integration modules (select.py, ...) must not shadow the standard library
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "custom_components", "koolnova_bms"))
+
+from koolnova.image import RegisterImage, Area, Engine
+from koolnova import const
+
+from bench_codec import random_image, decode_tables
+
+def get_commandline() -> argparse.Namespace:
+    """ Read and validate command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run koolnova controller state microbenchmark.")
+    parser.add_argument("--polls", help="number of polls timed", type=int, default=1000)
+    parser.add_argument("--seed", help="random seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def poll_values(rnd:random.Random) -> dict:
+    """ Registers of a poll {register: value}, every area registered.
+    """
+    image = random_image(rnd)
+    for zone_idx in range(const.NB_ZONE_MAX):
+        image[const.REG_START_ZONE + const.NUM_REG_PER_ZONE * zone_idx + const.REG_LOCK_ZONE] |= 0b10
+    return dict(enumerate(image))
+
+
+def build_image() -> tuple:
+    """ Register image with the views of every area and engine.
+    """
+    image = RegisterImage()
+    areas = [Area(image, name = "Area {}".format(zone_id), id_zone = zone_id) for zone_id in range(1, const.NB_ZONE_MAX + 1)]
+    engines = [Engine(image, engine_id = engine_id) for engine_id in range(1, const.NUM_OF_ENGINES + 1)]
+    return image, areas, engines
+
+
+def _traced(func) -> tuple:
+    """ Run func under tracemalloc, return (bytes retained, blocks retained, peak bytes).
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = [stat for stat in after.compare_to(before, 'filename') if stat.size_diff > 0]
+    del result
+    return sum(stat.size_diff for stat in stats), sum(stat.count_diff for stat in stats), peak
+
+
+def traced(func) -> tuple:
+    """ Allocations of func, less the tracing overhead measured on a no-op.
+    """
+    overhead = _traced(lambda: None)
+    return tuple(max(0, val - base) for val, base in zip(_traced(func), overhead))
+
+
+def main():
+    """ Run the benchmark.
+    """
+    args = get_commandline()
+    rnd = random.Random(args.seed)
+    polls = [poll_values(rnd) for _ in range(args.polls)]
+    image, _, _ = build_image()
+
+    dicts_mem = traced(lambda: decode_tables(polls[0]))
+    image_mem = traced(build_image)
+    dicts_poll = traced(lambda: decode_tables(polls[1]))
+    image_poll = traced(lambda: image.update(polls[1]))
+    dicts_time = min(timeit.repeat(lambda: [decode_tables(values) for values in polls], number=1, repeat=3))
+    image_time = min(timeit.repeat(lambda: [image.update(values) for values in polls], number=1, repeat=3))
+
+    print("{:>8} {:>18} {:>18} {:>18} {:>14}".format("state", "bytes/controller", "blocks/poll", "peak bytes/poll", "us/poll"))
+    print("{:>8} {:>18} {:>18} {:>18} {:>14.1f}".format("dicts", dicts_mem[0], dicts_poll[1], dicts_poll[2],
+                                                        1e6 * dicts_time / args.polls))
+    print("{:>8} {:>18} {:>18} {:>18} {:>14.1f}".format("image", image_mem[0], image_poll[1], image_poll[2],
+                                                        1e6 * image_time / args.polls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+# @Brief Koolnova setup benchmark.
+#        Replays the setup of a config entry against a simulated Modbus TCP
+#        gateway, an unreachable gateway and a missing serial dongle, and
+#        measures how long the setup is held, when the first values are
+#        known and the longest stall of the event loop: connect and reads
+#        awaited by the setup (former) against a background connection task.
+
+import os,sys
+import argparse
+import asyncio
+import logging
+import time
+import multiprocessing
+
+# appended: the integration modules (select.py, ...) must not shadow the standard library
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "custom_components", "koolnova_bms"))
+
+from koolnova.operations import Operations
+from koolnova import planner
+from koolnova import const
+
+from bench_workers import run_gateways
+
+def get_commandline() -> argparse.Namespace:
+    """ Read and validate command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run koolnova setup benchmark.")
+    parser.add_argument("--config", help="JSON Config path file", type=str,
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.json"))
+    parser.add_argument("--port", help="TCP port of the simulated gateway", type=int, default=15120)
+    parser.add_argument("--areas", help="areas configured in the entry", type=int, default=8)
+    parser.add_argument("--budget", help="seconds waited for the first values", type=float, default=3.0)
+    return parser.parse_args()
+
+
+class LoopStall:
+    """ Longest delay of a periodic tick of the event loop.
+    """
+
+    def __init__(self, interval:float = 0.002) -> None:
+        self._interval = interval
+        self._task = None
+        self.max_stall = 0.0
+
+    async def _tick(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            self.max_stall = max(self.max_stall, time.perf_counter() - start - self._interval)
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._task.cancel()
+
+
+async def _first_read(client:Operations, areas:int) -> bool:
+    """ Connect and read the system, engines and configured areas in one set.
+    """
+    await client.async_connect()
+    if not client.connected():
+        return False
+    registers = set(planner.SYSTEM_REGISTERS)
+    for zone_id in range(1, areas + 1):
+        registers |= planner.area_registers(zone_id)
+    for engine_id in range(1, const.NUM_OF_ENGINES + 1):
+        registers |= planner.engine_registers(engine_id)
+    ret, _ = await client.async_read_registers_set(registers)
+    return ret
+
+
+async def setup_former(client:Operations, areas:int) -> bool:
+    """ Former setup: connect, read the controller, then probe each area.
+    """
+    try:
+        if not await _first_read(client, areas):
+            return False
+        rets = await asyncio.gather(*(client.async_read_registers_set(planner.area_registers(zone_id))
+                                        for zone_id in range(1, areas + 1)))
+        return all(ret for ret, _ in rets)
+    except Exception:
+        return False
+
+
+async def setup_background(client:Operations, areas:int, serial_port:str = None) -> asyncio.Task:
+    """ Setup with a connection task: only the dongle presence is checked, off the loop.
+    """
+    loop = asyncio.get_running_loop()
+    if serial_port is not None and not await loop.run_in_executor(None, os.path.exists, serial_port):
+        # ConfigEntryNotReady, hass retries the setup later
+        return None
+
+    async def _connect():
+        while True:
+            try:
+                if await _first_read(client, areas):
+                    return True
+            except Exception:
+                pass
+            await asyncio.sleep(5)
+
+    return loop.create_task(_connect())
+
+
+async def run(name:str, client:Operations, args:argparse.Namespace, serial_port:str = None) -> list:
+    """ Run both setups, return rows (scenario, setup, held ms, values ms, stall ms).
+    """
+    rows = []
+    for setup in ("former", "background"):
+        client.disconnect()
+        with LoopStall() as stall:
+            start = time.perf_counter()
+            if setup == "former":
+                ok = await setup_former(client, args.areas)
+                held = values = time.perf_counter() - start
+                values = values if ok else None
+            else:
+                task = await setup_background(client, args.areas, serial_port)
+                held = time.perf_counter() - start
+                values = None
+                if task is not None:
+                    done, _ = await asyncio.wait({task}, timeout=args.budget)
+                    if done:
+                        values = time.perf_counter() - start
+                    task.cancel()
+        rows.append((name, setup, held, values, stall.max_stall))
+    client.disconnect()
+    return rows
+
+
+async def main():
+    """ Start the gateway and run the benchmark.
+    """
+    args = get_commandline()
+    logging.basicConfig(level=logging.CRITICAL)
+    ctx = multiprocessing.get_context('spawn')
+    server = ctx.Process(target=run_gateways, args=(args.config, [args.port]), daemon=True)
+    server.start()
+    await asyncio.sleep(2)
+
+    tcp = {'mode': 'Modbus TCP', 'timeout': 1, 'addr': '127.0.0.1', 'retries': 1}
+    rows = await run("gateway up", Operations(port=args.port, **tcp), args)
+    rows += await run("gateway down", Operations(port=args.port + 1, **tcp), args)
+    missing = "/dev/ttyKOOLNOVA-missing"
+    rows += await run("no dongle", Operations(mode='Modbus RTU', port=missing, timeout=1), args, serial_port=missing)
+    server.terminate()
+
+    print("{} areas, first values awaited {:.0f}s".format(args.areas, args.budget))
+    print("{:>13} {:>11} {:>10} {:>11} {:>15}".format("scenario", "setup", "held ms", "values ms", "max stall ms"))
+    for name, setup, held, values, stall in rows:
+        print("{:>13} {:>11} {:>10.1f} {:>11} {:>15.2f}".format(name, setup, 1000 * held,
+                                                                "-" if values is None else "{:.1f}".format(1000 * values),
+                                                                1000 * stall))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
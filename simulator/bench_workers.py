@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+# @Brief Koolnova poll throughput benchmark.
+#        Starts simulated Modbus TCP gateways and measures register snapshots
+#        per second, polled in-process or sharded across worker processes.
+
+import os,sys
+import argparse
+import asyncio
+import logging
+import json
+import copy
+import time
+import multiprocessing
+
+from pymodbus.datastore import ModbusServerContext, ModbusSimulatorContext
+from pymodbus.server import StartAsyncTcpServer
+
+# appended: the integration modules (select.py, ...) must not shadow the standard library
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "custom_components", "koolnova_bms"))
+
+from koolnova.operations import Operations
+from koolnova.workers import WorkerPool
+from koolnova import const
+
+_logger = logging.getLogger(__file__)
+
+def get_commandline() -> argparse.Namespace:
+    """ Read and validate command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run koolnova poll throughput benchmark.")
+    parser.add_argument("--config", help="JSON Config path file", type=str,
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.json"))
+    parser.add_argument("--gateways", help="number of simulated gateways", type=int, default=32)
+    parser.add_argument("--base-port", help="first TCP port of the gateways", type=int, default=15020)
+    parser.add_argument("--servers", help="processes hosting the gateways", type=int,
+                        default=max(1, multiprocessing.cpu_count() // 2))
+    parser.add_argument("--workers", help="comma separated worker counts, 0 polls in-process", type=str,
+                        default=",".join(str(n) for n in sorted({0, 1, 2, 4, multiprocessing.cpu_count()})))
+    parser.add_argument("--duration", help="seconds measured per run", type=float, default=10.0)
+    parser.add_argument("--interval", help="seconds between two polls of a gateway", type=float, default=0.0)
+    return parser.parse_args()
+
+
+def run_gateways(config:str, ports:list) -> None:
+    """ Serve simulated gateways on TCP ports (process entry point).
+    """
+    with open(config, 'r') as f:
+        setup = json.load(f)
+
+    async def _serve():
+        servers = []
+        for port in ports:
+            # the simulator context consumes its configuration
+            context = ModbusServerContext(slaves=ModbusSimulatorContext(copy.deepcopy(setup['device_list']['device']), None),
+                                            single=True)
+            servers.append(StartAsyncTcpServer(context=context, address=("127.0.0.1", port)))
+        await asyncio.gather(*servers)
+
+    asyncio.run(_serve())
+
+
+def gateway_config(port:int) -> dict:
+    """ Operations configuration of a simulated gateway.
+    """
+    return {'mode': 'Modbus TCP', 'timeout': 3, 'addr': '127.0.0.1', 'port': port, 'retries': 1}
+
+
+async def bench_in_process(ports:list, duration:float, interval:float) -> int:
+    """ Poll every gateway from the current event loop, return snapshots read.
+    """
+    clients = [Operations(**gateway_config(port)) for port in ports]
+    for client in clients:
+        await client.async_connect()
+    registers = set(range(const.NB_REGISTERS))
+    snapshots = 0
+    deadline = time.monotonic() + duration
+
+    async def _poll(client):
+        nonlocal snapshots
+        while time.monotonic() < deadline:
+            ret, _ = await client.async_read_registers_set(registers)
+            if ret:
+                snapshots += 1
+            await asyncio.sleep(interval)
+
+    await asyncio.gather(*(_poll(client) for client in clients))
+    for client in clients:
+        client.disconnect()
+    return snapshots
+
+
+async def bench_workers(ports:list, workers:int, duration:float, interval:float) -> int:
+    """ Poll every gateway from worker processes, return snapshots received.
+    """
+    pool = WorkerPool({port: {'config': gateway_config(port)} for port in ports},
+                        workers=workers,
+                        interval=interval)
+    await pool.async_start()
+    # let the workers connect before measuring
+    while pool.snapshots < len(ports):
+        await asyncio.sleep(0.1)
+    start = pool.snapshots
+    await asyncio.sleep(duration)
+    snapshots = pool.snapshots - start
+    await pool.async_stop()
+    return snapshots
+
+
+async def main():
+    """ Start the gateways and run the benchmarks.
+    """
+    args = get_commandline()
+    logging.basicConfig(level=logging.WARNING)
+    ports = [args.base_port + idx for idx in range(args.gateways)]
+    ctx = multiprocessing.get_context('spawn')
+    servers = [ctx.Process(target=run_gateways, args=(args.config, ports[idx::args.servers]), daemon=True)
+                for idx in range(args.servers)]
+    for server in servers:
+        server.start()
+    await asyncio.sleep(2)
+
+    print("{} gateways, {} cores, {:.0f}s per run".format(args.gateways, multiprocessing.cpu_count(), args.duration))
+    print("{:>8} {:>14} {:>8}".format("workers", "snapshots/s", "speedup"))
+    baseline = None
+    for workers in [int(n) for n in args.workers.split(",")]:
+        if workers == 0:
+            snapshots = await bench_in_process(ports, args.duration, args.interval)
+        else:
+            snapshots = await bench_workers(ports, workers, args.duration, args.interval)
+        rate = snapshots / args.duration
+        baseline = baseline or rate
+        print("{:>8} {:>14.1f} {:>7.2f}x".format(workers if workers else "in-proc", rate, rate / baseline))
+
+    for server in servers:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
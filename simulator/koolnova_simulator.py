@@ -12,7 +12,7 @@ import json
 from pymodbus import pymodbus_apply_logging_config
 from pymodbus.datastore import ModbusServerContext, ModbusSimulatorContext
 from pymodbus.device import ModbusDeviceIdentification
-from pymodbus.server import StartAsyncSerialServer
+from pymodbus.server import StartAsyncSerialServer, StartAsyncTcpServer
 
 _logger = logging.getLogger(__file__)
 
@@ -51,6 +51,7 @@ def setup_simulator() -> argparse.Namespace:
     # Master collection of slave contexts
     args.context = ModbusServerContext(slaves=context, single=True)
     args.identity = ModbusDeviceIdentification(info_name=setup['server_list']['server']['identity'])
+    args.comm = setup['server_list']['server'].get('comm', 'serial')
     args.port = setup['server_list']['server']['port']
     args.baudrate = setup['server_list']['server']['baudrate']
     args.stopbits = setup['server_list']['server']['stopbits']
@@ -64,6 +65,12 @@ async def run_server_simulator(args:argparse.Namespace=None):
     """ Run server.
     """
     _logger.info("### start server simulator")
+    if args.comm == "tcp":
+        # Modbus TCP server (port is a TCP port), e.g. to stand for an EW11 gateway
+        await StartAsyncTcpServer(context=args.context,
+                                    identity=args.identity,
+                                    address=("", args.port))
+        return
     await StartAsyncSerialServer(context=args.context,  # Data storage
                                  identity=args.identity, # Server identity
                                  port=args.port, # serial port
@@ -0,0 +1,13 @@
+""" koolnova library tests, run without Home Assistant
+
+    The integration modules are imported from custom_components by the tests
+    that need Home Assistant, those are skipped when it is not installed.
+"""
+
+import os,sys
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# appended: the integration modules (select.py, ...) must not shadow the standard library
+sys.path.append(os.path.join(_ROOT, "custom_components", "koolnova_bms"))
+sys.path.append(_ROOT)
@@ -0,0 +1,75 @@
+""" apply_zones service tests, on an in-memory Modbus slave """
+
+import asyncio
+import itertools
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.koolnova_bms.koolnova.device import Koolnova, OrderTempError
+
+from koolnova import const
+from koolnova import planner
+
+from test_write_queue import BusOperations
+
+# one link per test, transports are shared per host:port
+_ports = itertools.count(42000)
+
+LOCK_1 = planner.area_register(1, const.REG_LOCK_ZONE)
+LOCK_2 = planner.area_register(2, const.REG_LOCK_ZONE)
+ORDER_2 = planner.area_register(2, const.REG_TEMP_ORDER)
+
+@pytest.fixture
+def device():
+    client = BusOperations(mode = 'Modbus TCP', timeout = 1, port = next(_ports))
+    # area 1 registered and on, area 2 registered and off
+    client._client.regs[LOCK_1] = 0b11
+    client._client.regs[LOCK_2] = 0b10
+    client._client.regs[ORDER_2] = 40
+    dev = Koolnova(mode = "Worker", name = "test", client = client)
+    dev.add_area(name = "Area 1", id_zone = 1)
+    dev.add_area(name = "Area 2", id_zone = 2)
+    yield dev
+    client.disconnect()
+
+def test_only_changed_registers_written(device):
+    bus = device._client._client
+    zones = {1: {'state': const.ZoneState.STATE_OFF},
+                2: {'state': const.ZoneState.STATE_ON, 'order_temp': 22.0}}
+    ret, transactions = asyncio.run(device.async_apply_zones(zones))
+    assert ret
+    # the areas are read in one span, then three registers change
+    assert bus.reads == [(planner.area_register(1, 0), 2 * const.NUM_REG_PER_ZONE)]
+    assert sorted(bus.writes) == sorted([(LOCK_1, 0b10), (LOCK_2, 0b11), (ORDER_2, 44)])
+    assert transactions == 4
+    assert device.snapshot.area(2).order_temp == 22.0
+
+def test_state_in_effect_not_written(device):
+    bus = device._client._client
+    zones = {1: {'state': const.ZoneState.STATE_ON}, 2: {'order_temp': 20.0}}
+    async def twice():
+        await device.async_apply_zones(zones)
+        return await device.async_apply_zones(zones)
+    # the second call uses the register image read by the first one
+    assert asyncio.run(twice()) == (True, 0)
+    assert len(bus.reads) == 1
+    assert bus.writes == []
+
+def test_system_state_written_with_the_areas(device):
+    bus = device._client._client
+    ret, _ = asyncio.run(device.async_apply_zones({1: {'fan': const.ZoneFanMode.FAN_HIGH}},
+                                                    sys_state = const.SysState.SYS_STATE_ON))
+    assert ret
+    assert (const.REG_SYS_STATE, int(const.SysState.SYS_STATE_ON)) in bus.writes
+    assert (planner.area_register(1, const.REG_STATE_AND_FLOW), int(const.ZoneFanMode.FAN_HIGH) << 4) in bus.writes
+
+def test_undefined_area(device):
+    assert asyncio.run(device.async_apply_zones({3: {'state': const.ZoneState.STATE_ON}})) == (False, 0)
+    assert device._client._client.writes == []
+
+def test_order_temp_out_of_range(device):
+    with pytest.raises(OrderTempError):
+        asyncio.run(device.async_apply_zones({2: {'order_temp': const.MAX_TEMP_ORDER + 1}}))
+    assert device._client._client.writes == []
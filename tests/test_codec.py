@@ -0,0 +1,43 @@
+""" bit-field lookup table tests, against the enum decoding they replace """
+
+import pytest
+
+from koolnova import const
+from koolnova import codec
+
+def _enum(enum, value):
+    ''' former decoding: Enum constructor, None for an undefined value '''
+    try:
+        return enum(value)
+    except ValueError:
+        return None
+
+@pytest.mark.parametrize("byte", range(256))
+def test_lock_zone_table(byte):
+    assert codec.LOCK_ZONE_TABLE[byte] == (_enum(const.ZoneRegister, byte >> 1),
+                                            _enum(const.ZoneState, byte & 0b01))
+    assert codec.decode_lock_zone(byte) == codec.LOCK_ZONE_TABLE[byte]
+
+@pytest.mark.parametrize("byte", range(256))
+def test_state_and_flow_table(byte):
+    assert codec.STATE_AND_FLOW_TABLE[byte] == (_enum(const.ZoneFanMode, (byte & 0xF0) >> 4),
+                                                _enum(const.ZoneClimMode, byte & 0x0F))
+    assert codec.decode_state_and_flow(byte) == codec.STATE_AND_FLOW_TABLE[byte]
+
+def test_tables_hold_enum_members():
+    for register, state in codec.LOCK_ZONE_TABLE:
+        assert register is None or type(register) is const.ZoneRegister
+        assert state is None or type(state) is const.ZoneState
+    for fan, clim in codec.STATE_AND_FLOW_TABLE:
+        assert fan is None or type(fan) is const.ZoneFanMode
+        assert clim is None or type(clim) is const.ZoneClimMode
+
+def test_out_of_range_register():
+    assert codec.decode_lock_zone(0x100) == (None, None)
+    assert codec.decode_state_and_flow(0x100) == (None, None)
+
+@pytest.mark.parametrize("byte", range(256))
+def test_valid_mask_state_and_flow(byte):
+    reg = const.REG_START_ZONE + const.REG_STATE_AND_FLOW
+    fan, clim = codec.STATE_AND_FLOW_TABLE[byte]
+    assert codec.valid_mask(reg, byte) == (0xFFF0 if fan is not None else 0) | (0x000F if clim is not None else 0)
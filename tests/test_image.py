@@ -0,0 +1,98 @@
+""" register image tests """
+
+import time
+
+from koolnova import const
+from koolnova import image
+from koolnova import planner
+from koolnova.image import RegisterImage, Area
+
+ZONE = 1
+LOCK = planner.area_register(ZONE, const.REG_LOCK_ZONE)
+FLOW = planner.area_register(ZONE, const.REG_STATE_AND_FLOW)
+ORDER = planner.area_register(ZONE, const.REG_TEMP_ORDER)
+
+def test_controller_defaults():
+    regs = RegisterImage()
+    assert len(regs) == const.NB_REGISTERS
+    assert regs.global_mode == const.GlobalMode.COLD
+    assert regs.efficiency == const.Efficiency.LOWER_EFF
+    assert regs.sys_state == const.SysState.SYS_STATE_OFF
+
+def test_update_returns_changed_bits():
+    regs = RegisterImage()
+    regs.update({ORDER: 40})
+    assert regs.update({ORDER: 44, FLOW: 0}) == {ORDER: 40 ^ 44}
+    assert regs[ORDER] == 44
+
+def test_invalid_fields_keep_their_value():
+    regs = RegisterImage()
+    flow = (int(const.ZoneFanMode.FAN_LOW) << 4) | int(const.ZoneClimMode.COOL)
+    regs.update({FLOW: flow})
+    # fan high, undefined climate mode 3
+    assert regs.update({FLOW: (int(const.ZoneFanMode.FAN_HIGH) << 4) | 3}) == {FLOW: 0x30 ^ 0x10}
+    area = Area(regs, id_zone = ZONE)
+    assert area.fan_mode == const.ZoneFanMode.FAN_HIGH
+    assert area.clim_mode == const.ZoneClimMode.COOL
+
+def test_invalid_register_skipped():
+    regs = RegisterImage()
+    assert regs.update({const.REG_GLOBAL_MODE: 3}) == {}
+    assert regs.update({const.REG_GLOBAL_MODE: 0x100}) == {}
+    assert regs.global_mode == const.GlobalMode.COLD
+
+def test_pop_changed_accumulates_bits():
+    regs = RegisterImage()
+    regs.update({FLOW: 0x10})
+    regs.update({FLOW: 0x11, ORDER: 40})
+    assert regs.pop_changed() == {FLOW: 0x11, ORDER: 40}
+    assert regs.pop_changed() == {}
+    # a register changed back to its value still reports the bits that toggled
+    regs.update({ORDER: 42})
+    regs.update({ORDER: 40})
+    assert regs.pop_changed() == {ORDER: 40 ^ 42}
+
+def test_changed_fields():
+    regs = RegisterImage()
+    regs.update({LOCK: 0b10, FLOW: 0x01})
+    assert image.changed_fields(regs.pop_changed()) == {(image.AREA, ZONE, 'register'),
+                                                        (image.AREA, ZONE, 'clim')}
+
+def test_pop_dirty():
+    regs = RegisterImage()
+    regs.update({ORDER: 40, FLOW: 0})
+    regs[const.REG_SYS_STATE] = 1
+    # unchanged value
+    regs[LOCK] = 0
+    assert regs.pop_dirty() == {ORDER, const.REG_SYS_STATE}
+    assert regs.pop_dirty() == set()
+
+def test_set_bits():
+    regs = RegisterImage()
+    regs.update({LOCK: 0b10})
+    regs.set_bits(LOCK, 1, 0b01)
+    assert regs[LOCK] == 0b11
+    assert regs.pop_dirty() == {LOCK}
+
+def test_fresh_only_for_bus_values():
+    regs = RegisterImage()
+    regs.update({ORDER: 40})
+    # restored or computed values are not fresh
+    assert regs.fresh(ORDER, 60) is None
+    regs.update({ORDER: 42}, ts = time.monotonic())
+    assert regs.fresh(ORDER, 60) == 42
+    assert regs.fresh(FLOW, 60) is None
+
+def test_fresh_expires():
+    regs = RegisterImage()
+    regs.update({ORDER: 40}, ts = time.monotonic() - 10)
+    assert regs.fresh(ORDER, 60) == 40
+    assert regs.fresh(ORDER, 5) is None
+
+def test_views_share_the_image():
+    regs = RegisterImage()
+    area = Area(regs, id_zone = 2)
+    regs.update({planner.area_register(2, const.REG_TEMP_ORDER): 45})
+    assert area.order_temp == 22.5
+    area.order_temp = 21.0
+    assert regs[planner.area_register(2, const.REG_TEMP_ORDER)] == 42
@@ -0,0 +1,114 @@
+""" inter-frame pacing tests """
+
+import time
+import asyncio
+import itertools
+
+import pytest
+
+from koolnova import const
+from koolnova.pacing import Pacer, rtu_silent_interval
+from koolnova.operations import Operations
+
+# one link per test, transports are shared per host:port
+_ports = itertools.count(41000)
+
+def test_rtu_gap_is_t35():
+    # 9600 bauds 8E1: 11 bits per character, 3.5 characters
+    assert Pacer.for_rtu(9600, 8, 'E', 1).gap == pytest.approx(3.5 * 11 / 9600)
+    assert Pacer.for_rtu(9600, 8, 'N', 1).gap == pytest.approx(3.5 * 10 / 9600)
+    assert Pacer.for_rtu(4800, 8, 'N', 2).gap == pytest.approx(3.5 * 11 / 4800)
+
+def test_rtu_gap_fixed_above_19200_bauds():
+    assert rtu_silent_interval(19200, 8, 'E', 1) == pytest.approx(3.5 * 11 / 19200)
+    assert Pacer.for_rtu(38400, 8, 'E', 1).gap == const.RTU_T35_FIXED
+    assert Pacer.for_rtu(115200, 8, 'N', 1).gap == const.RTU_T35_FIXED
+
+def test_tcp_gap_follows_the_response_time():
+    pacer = Pacer.for_tcp()
+    assert pacer.gap == const.PACING_TCP_MIN_GAP
+    # fast gateway: the gap stays at its floor
+    pacer.frame_done(True, 0.001)
+    assert pacer.gap == const.PACING_TCP_MIN_GAP
+    # slow gateway: the gap follows the smoothed response time
+    for _ in range(50):
+        pacer.frame_done(True, 0.2)
+    assert pacer.min_gap == pytest.approx(0.2 * const.PACING_TCP_RTT_FACTOR, rel = 1e-3)
+    assert pacer.gap == pacer.min_gap
+
+def test_tcp_gap_bounded():
+    pacer = Pacer.for_tcp()
+    for _ in range(50):
+        pacer.frame_done(True, 60.0)
+    assert pacer.gap == const.PACING_MAX_GAP
+
+def test_back_off_on_failure():
+    pacer = Pacer(min_gap = 0.01)
+    pacer.frame_done(False)
+    assert pacer.gap == pytest.approx(0.01 * const.PACING_BACKOFF_FACTOR)
+    pacer.frame_done(False)
+    assert pacer.gap == pytest.approx(0.01 * const.PACING_BACKOFF_FACTOR ** 2)
+    for _ in range(20):
+        pacer.frame_done(False)
+    assert pacer.gap == const.PACING_MAX_GAP
+
+def test_recovery_towards_the_minimum():
+    pacer = Pacer(min_gap = 0.01)
+    for _ in range(3):
+        pacer.frame_done(False)
+    backed_off = pacer.gap
+    pacer.frame_done(True)
+    assert pacer.gap == pytest.approx(backed_off * const.PACING_RECOVERY_FACTOR)
+    for _ in range(100):
+        pacer.frame_done(True)
+    assert pacer.gap == pacer.min_gap
+
+def test_wait_keeps_the_bus_silent():
+    pacer = Pacer(min_gap = 0.05)
+    async def sequence():
+        await pacer.async_wait()
+        pacer.frame_done(True)
+        start = time.monotonic()
+        await pacer.async_wait()
+        return time.monotonic() - start
+    assert asyncio.run(sequence()) >= 0.045
+
+def test_no_wait_after_a_silent_gap():
+    pacer = Pacer(min_gap = 0.05)
+    pacer.frame_done(True)
+    time.sleep(0.06)
+    async def sequence():
+        start = time.monotonic()
+        await pacer.async_wait()
+        return time.monotonic() - start
+    assert asyncio.run(sequence()) < 0.01
+
+class FailingBus:
+    ''' Modbus client whose transactions time out '''
+
+    connected = True
+
+    async def read_holding_registers(self, address:int, count:int, slave:int):
+        raise TimeoutError('No response received')
+
+    async def write_register(self, address:int, value:int, slave:int):
+        raise TimeoutError('No response received')
+
+    def close(self) -> None:
+        pass
+
+class FailingOperations(Operations):
+    ''' Operations on a gateway that does not answer '''
+
+    def _new_client(self) -> FailingBus:
+        return FailingBus()
+
+def test_failed_transactions_back_off():
+    ops = FailingOperations(mode = 'Modbus TCP', timeout = 1, port = next(_ports))
+    try:
+        gap = ops._pacer.gap
+        ret, _ = asyncio.run(ops.async_read_registers_set({0}))
+        assert not ret
+        assert ops._pacer.gap == pytest.approx(gap * const.PACING_BACKOFF_FACTOR)
+    finally:
+        ops.disconnect()
@@ -0,0 +1,47 @@
+""" register range planner tests """
+
+from koolnova import const
+from koolnova.planner import plan_reads
+
+GAP = const.READ_GAP_BRIDGE
+LIMIT = const.MAX_REGS_PER_READ
+
+def test_contiguous_registers_one_span():
+    assert plan_reads({4, 5, 6, 7}) == [(4, 4)]
+
+def test_unsorted_duplicates():
+    assert plan_reads([7, 5, 4, 6, 5]) == [(4, 4)]
+
+def test_empty():
+    assert plan_reads(set()) == []
+
+def test_gap_bridged():
+    # GAP unused registers between 0 and GAP + 1 are read through
+    assert plan_reads({0, GAP + 1}) == [(0, GAP + 2)]
+
+def test_gap_split():
+    assert plan_reads({0, GAP + 2}) == [(0, 1), (GAP + 2, 1)]
+
+def test_gap_bridge_argument():
+    assert plan_reads({0, 3}, gap_bridge = 1) == [(0, 1), (3, 1)]
+    assert plan_reads({0, 3}, gap_bridge = 2) == [(0, 4)]
+
+def test_split_at_read_limit():
+    assert plan_reads(range(3 * LIMIT)) == [(0, LIMIT), (LIMIT, LIMIT), (2 * LIMIT, LIMIT)]
+
+def test_gap_not_bridged_beyond_read_limit():
+    # the last register of a span is start + LIMIT - 1
+    assert plan_reads(set(range(LIMIT - 5)) | {LIMIT - 1}) == [(0, LIMIT)]
+    assert plan_reads(set(range(LIMIT - 5)) | {LIMIT}) == [(0, LIMIT - 5), (LIMIT, 1)]
+
+def test_learned_max_span():
+    assert plan_reads(range(10), max_span = 4) == [(0, 4), (4, 4), (8, 2)]
+
+def test_max_span_bounds():
+    assert plan_reads(range(LIMIT + 1), max_span = 10 * LIMIT) == [(0, LIMIT), (LIMIT, 1)]
+    assert plan_reads({0, 1}, max_span = 0) == [(0, 1), (1, 1)]
+
+def test_register_map():
+    # areas, engines and system registers of the controller fit in one read
+    assert plan_reads(range(const.REG_START_ZONE, const.NB_REGISTERS)) == \
+        [(const.REG_START_ZONE, const.NB_REGISTERS - const.REG_START_ZONE)]
@@ -0,0 +1,146 @@
+""" bus scheduler tests """
+
+import asyncio
+
+from koolnova import const
+from koolnova.scheduler import BusScheduler, PriorityLimiter
+from koolnova.transport import Transport
+from koolnova.pacing import Pacer
+
+async def _served(scheduler:BusScheduler, requests:list, cancel:set = frozenset()) -> list:
+    ''' Queue requests (name, priority, slave) behind a transaction in flight,
+        return the names in the order the bus was granted
+    '''
+    order = []
+    gate = asyncio.Event()
+
+    async def _hold():
+        async with scheduler.async_slot(const.PRIO_POLL, 0):
+            await gate.wait()
+
+    async def _transaction(name, priority, slave):
+        async with scheduler.async_slot(priority, slave):
+            order.append(name)
+
+    holder = asyncio.create_task(_hold())
+    await asyncio.sleep(0)
+    tasks = {name: asyncio.create_task(_transaction(name, priority, slave)) for name, priority, slave in requests}
+    await asyncio.sleep(0)
+    for name in cancel:
+        tasks[name].cancel()
+    gate.set()
+    await asyncio.gather(holder, *tasks.values(), return_exceptions = True)
+    return order
+
+def test_priority_classes():
+    requests = [("diag", const.PRIO_DIAG, 1),
+                ("poll", const.PRIO_POLL, 1),
+                ("confirm", const.PRIO_CONFIRM, 1),
+                ("write", const.PRIO_WRITE, 1)]
+    assert asyncio.run(_served(BusScheduler(), requests)) == ["write", "confirm", "poll", "diag"]
+
+def test_round_robin_between_slaves():
+    requests = [("1a", const.PRIO_POLL, 1),
+                ("1b", const.PRIO_POLL, 1),
+                ("1c", const.PRIO_POLL, 1),
+                ("2a", const.PRIO_POLL, 2),
+                ("2b", const.PRIO_POLL, 2)]
+    assert asyncio.run(_served(BusScheduler(), requests)) == ["1a", "2a", "1b", "2b", "1c"]
+
+def test_arrival_order_inside_a_round():
+    requests = [("2", const.PRIO_POLL, 2),
+                ("1", const.PRIO_POLL, 1),
+                ("3", const.PRIO_POLL, 3)]
+    assert asyncio.run(_served(BusScheduler(), requests)) == ["2", "1", "3"]
+
+def test_priority_before_round_robin():
+    requests = [("1a", const.PRIO_POLL, 1),
+                ("1b", const.PRIO_POLL, 1),
+                ("2w", const.PRIO_WRITE, 2),
+                ("2a", const.PRIO_POLL, 2)]
+    assert asyncio.run(_served(BusScheduler(), requests)) == ["2w", "1a", "2a", "1b"]
+
+def test_cancelled_waiter_skipped():
+    requests = [("a", const.PRIO_POLL, 1),
+                ("b", const.PRIO_POLL, 2),
+                ("c", const.PRIO_POLL, 3)]
+    assert asyncio.run(_served(BusScheduler(), requests, cancel = {"b"})) == ["a", "c"]
+
+def test_queue_wait_stats():
+    scheduler = BusScheduler()
+    requests = [("write", const.PRIO_WRITE, 1),
+                ("poll", const.PRIO_POLL, 1)]
+    asyncio.run(_served(scheduler, requests))
+    stats = scheduler.queue_wait_stats
+    assert stats['write']['count'] == 1
+    # the transaction in flight and the queued poll
+    assert stats['poll']['count'] == 2
+    assert stats['diagnostic']['count'] == 0
+
+async def _limited(limiter:PriorityLimiter, requests:list, cancel:set = frozenset()) -> list:
+    ''' Queue requests (name, priority) behind the places in use,
+        return the names in the order a place was granted
+    '''
+    order = []
+    gate = asyncio.Event()
+
+    async def _hold():
+        async with limiter.async_slot(const.PRIO_POLL):
+            await gate.wait()
+
+    async def _transaction(name, priority):
+        async with limiter.async_slot(priority):
+            order.append(name)
+
+    holders = [asyncio.create_task(_hold()) for _ in range(2)]
+    await asyncio.sleep(0)
+    tasks = {name: asyncio.create_task(_transaction(name, priority)) for name, priority in requests}
+    await asyncio.sleep(0)
+    for name in cancel:
+        tasks[name].cancel()
+    gate.set()
+    await asyncio.gather(*holders, *tasks.values(), return_exceptions = True)
+    return order
+
+def test_limiter_by_priority():
+    requests = [("poll", const.PRIO_POLL),
+                ("diag", const.PRIO_DIAG),
+                ("write", const.PRIO_WRITE),
+                ("confirm", const.PRIO_CONFIRM),
+                ("poll2", const.PRIO_POLL)]
+    assert asyncio.run(_limited(PriorityLimiter(2), requests)) == ["write", "confirm", "poll", "poll2", "diag"]
+
+def test_limiter_cancelled_waiter_skipped():
+    requests = [("a", const.PRIO_POLL),
+                ("b", const.PRIO_WRITE),
+                ("c", const.PRIO_POLL)]
+    limiter = PriorityLimiter(2)
+    assert asyncio.run(_limited(limiter, requests, cancel = {"b"})) == ["a", "c"]
+    # every place is given back
+    assert limiter._value == 2
+
+def test_write_first_across_links():
+    limiter = PriorityLimiter(1)
+    links = [Transport("link{}".format(idx), None, Pacer(min_gap = 0)) for idx in range(3)]
+    for link in links:
+        link.limiter = limiter
+    order = []
+    gate = asyncio.Event()
+
+    async def _transaction(link, name, priority, wait = False):
+        async with link.async_slot(priority, 1):
+            order.append(name)
+            if wait:
+                await gate.wait()
+
+    async def sequence():
+        holder = asyncio.create_task(_transaction(links[0], "hold", const.PRIO_POLL, wait = True))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(_transaction(links[1], "poll", const.PRIO_POLL)),
+                    asyncio.create_task(_transaction(links[2], "write", const.PRIO_WRITE))]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(holder, *tasks)
+    asyncio.run(sequence())
+    # the write of the third link is not queued behind the poll of the second one
+    assert order == ["hold", "write", "poll"]
@@ -0,0 +1,68 @@
+""" immutable snapshot tests """
+
+from koolnova import const
+from koolnova import planner
+from koolnova import snapshot
+from koolnova.image import RegisterImage
+
+def _image() -> RegisterImage:
+    regs = RegisterImage()
+    regs.update({planner.area_register(1, const.REG_LOCK_ZONE): 0b11,
+                    planner.area_register(1, const.REG_TEMP_ORDER): 44,
+                    planner.area_register(2, const.REG_LOCK_ZONE): 0b10})
+    regs.pop_dirty()
+    return regs
+
+def test_from_image():
+    snap = snapshot.from_image(_image(), version = 3)
+    assert snap.version == 3
+    assert len(snap.areas) == const.NB_ZONE_MAX
+    assert len(snap.engines) == const.NUM_OF_ENGINES
+    area = snap.area(1)
+    assert area.state == const.ZoneState.STATE_ON
+    assert area.register == const.ZoneRegister.REGISTER_ON
+    assert area.order_temp == 22.0
+    assert snap.global_mode == const.GlobalMode.COLD
+    assert snap.engine(1).state == const.FlowEngine.AUTO
+
+def test_nothing_changed_same_snapshot():
+    regs = _image()
+    snap = snapshot.from_image(regs)
+    assert snapshot.evolve(snap, regs, set()) is snap
+
+def test_unchanged_areas_shared():
+    regs = _image()
+    prev = snapshot.from_image(regs)
+    regs.update({planner.area_register(2, const.REG_TEMP_ORDER): 40})
+    snap = snapshot.evolve(prev, regs, regs.pop_dirty())
+    assert snap.version == prev.version + 1
+    assert snap.area(2) is not prev.area(2)
+    assert snap.area(2).order_temp == 20.0
+    assert all(snap.area(zone_id) is prev.area(zone_id) for zone_id in range(1, const.NB_ZONE_MAX + 1) if zone_id != 2)
+    # no engine changed: the tuple itself is shared
+    assert snap.engines is prev.engines
+
+def test_unchanged_engines_shared():
+    regs = _image()
+    prev = snapshot.from_image(regs)
+    regs.update({const.REG_START_ORDER_TEMP + 1: 40})
+    snap = snapshot.evolve(prev, regs, regs.pop_dirty())
+    assert snap.engine(2).order_temp == 20.0
+    assert all(snap.engine(engine_id) is prev.engine(engine_id) for engine_id in (1, 3, 4))
+    assert snap.areas is prev.areas
+
+def test_system_registers():
+    regs = _image()
+    prev = snapshot.from_image(regs)
+    regs.update({const.REG_SYS_STATE: int(const.SysState.SYS_STATE_ON)})
+    snap = snapshot.evolve(prev, regs, regs.pop_dirty())
+    assert snap.sys_state == const.SysState.SYS_STATE_ON
+    assert prev.sys_state == const.SysState.SYS_STATE_OFF
+    assert snap.areas is prev.areas and snap.engines is prev.engines
+
+def test_previous_version_immutable():
+    regs = _image()
+    prev = snapshot.from_image(regs)
+    regs.update({planner.area_register(1, const.REG_TEMP_ORDER): 40})
+    snapshot.evolve(prev, regs, regs.pop_dirty())
+    assert prev.area(1).order_temp == 22.0
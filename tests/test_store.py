@@ -0,0 +1,87 @@
+""" register persistence tests """
+
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from homeassistant.const import ATTR_RESTORED
+
+from custom_components.koolnova_bms import store as store_module
+from custom_components.koolnova_bms.store import KoolnovaStore
+from custom_components.koolnova_bms.coordinator import KoolnovaEntity
+from custom_components.koolnova_bms.koolnova.device import Koolnova
+
+from koolnova import const
+from koolnova import planner
+
+from test_write_queue import BusOperations
+
+# one link per test, transports are shared per host:port
+_ports = itertools.count(43000)
+
+ORDER = planner.area_register(1, const.REG_TEMP_ORDER)
+
+class MemoryStore:
+    ''' Home Assistant Store kept in memory, delayed saves done at once '''
+
+    def __init__(self, hass, version:int, key:str) -> None:
+        self.data = None
+        self.saves = 0
+
+    async def async_load(self):
+        return self.data
+
+    def async_delay_save(self, data_func, delay:float = 0) -> None:
+        self.data = data_func()
+        self.saves += 1
+
+@pytest.fixture
+def device():
+    client = BusOperations(mode = 'Modbus TCP', timeout = 1, port = next(_ports))
+    client._client.regs[ORDER] = 44
+    dev = Koolnova(mode = "Worker", name = "test", client = client)
+    dev.add_area(name = "Area 1", id_zone = 1)
+    yield dev
+    client.disconnect()
+
+@pytest.fixture
+def store(device, monkeypatch):
+    monkeypatch.setattr(store_module, "Store", MemoryStore)
+    return KoolnovaStore(None, "entry", device)
+
+def test_saved_once_per_snapshot_version(device, store):
+    store.async_schedule_save()
+    store.async_schedule_save()
+    assert store._store.saves == 1
+    assert store._store.data == {'registers': device.registers}
+    device.restore([0] * ORDER + [40])
+    store.async_schedule_save()
+    assert store._store.saves == 2
+    assert store._store.data['registers'][ORDER] == 40
+
+def test_load_ignores_other_register_maps(store):
+    assert asyncio.run(store.async_load()) is None
+    store._store.data = {'registers': [0] * (const.NB_REGISTERS - 1)}
+    assert asyncio.run(store.async_load()) is None
+    store._store.data = {'registers': [1] * const.NB_REGISTERS}
+    assert asyncio.run(store.async_load()) == [1] * const.NB_REGISTERS
+
+def test_restored_until_read(device):
+    entity = KoolnovaEntity(SimpleNamespace())
+    entity._device = device
+    assert not device.ready
+    registers = device.registers
+    registers[ORDER] = 40
+    device.restore(registers)
+    assert device.ready and device.restored
+    assert device.snapshot.area(1).order_temp == 20.0
+    assert entity.extra_state_attributes == {ATTR_RESTORED: True}
+    # values read from the controller replace the restored ones
+    assert asyncio.run(device.async_update())
+    assert not device.restored
+    assert device.snapshot.area(1).order_temp == 22.0
+    assert entity.extra_state_attributes is None
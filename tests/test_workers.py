@@ -0,0 +1,84 @@
+""" worker pool tests: snapshot frames, sharding and stopped workers """
+
+import os
+import signal
+import asyncio
+
+import pytest
+
+from koolnova import const
+from koolnova.workers import WorkerPool, pack_snapshot, unpack_snapshot
+
+def _tcp(port:int, addr:str = '127.0.0.1') -> dict:
+    return {'config': {'mode': 'Modbus TCP', 'addr': addr, 'port': port, 'timeout': 1, 'retries': 0}}
+
+def _rtu(port:str) -> dict:
+    return {'config': {'mode': 'Modbus RTU', 'port': port, 'timeout': 1}}
+
+@pytest.mark.parametrize("values", [{},
+                                    {0: 3, 1: 0x11},
+                                    {reg: reg * 257 for reg in range(const.NB_REGISTERS)},
+                                    {const.NB_REGISTERS - 1: 0xFFFF}])
+def test_snapshot_round_trip(values):
+    assert unpack_snapshot(pack_snapshot(7, values)) == (7, values)
+
+def test_snapshot_frame_size():
+    # kind, index, register mask, register image
+    assert len(pack_snapshot(0, {})) == 1 + 2 + (const.NB_REGISTERS + 7) // 8 + 2 * const.NB_REGISTERS
+
+def test_shards_bounded_and_links_kept_together():
+    pool = WorkerPool(workers = 2)
+    async def add():
+        for key, gateway in (("a", _tcp(1502)), ("b", _tcp(1503)), ("c", _tcp(1502)), ("d", _rtu("/dev/ttyUSB0"))):
+            await pool.async_add_gateway(key, gateway)
+    asyncio.run(add())
+    # no worker is spawned before the pool starts
+    assert not pool.running
+    assert pool.shards == [["a", "c"], ["b", "d"]]
+
+def test_constructor_keeps_links_together():
+    pool = WorkerPool({"a": _tcp(1502), "b": _tcp(1503), "c": _tcp(1502)}, workers = 4)
+    assert pool.shards == [["a", "c"], ["b"]]
+
+def test_removed_gateway_frees_its_worker():
+    pool = WorkerPool(workers = 2)
+    async def sequence():
+        await pool.async_add_gateway("a", _tcp(1502))
+        await pool.async_add_gateway("b", _tcp(1503))
+        await pool.async_remove_gateway("a")
+        # least loaded worker
+        await pool.async_add_gateway("c", _tcp(1504))
+    asyncio.run(sequence())
+    assert pool.shards == [["c"], ["b"]]
+    assert set(pool.gateways) == {"b", "c"}
+
+def test_gateway_added_once():
+    pool = WorkerPool()
+    async def sequence():
+        await pool.async_add_gateway("a", _tcp(1502))
+        await pool.async_add_gateway("a", _tcp(1502))
+    with pytest.raises(KeyError):
+        asyncio.run(sequence())
+
+def test_stopped_worker_fails_its_calls():
+    # no gateway listens there, the worker only retries to connect
+    pool = WorkerPool({"a": _tcp(9)}, workers = 1, interval = 0.2)
+    async def sequence():
+        client = pool.client("a")
+        await client.async_connect()
+        assert pool.running and client.connected()
+        pid = pool._processes[0].pid
+        # a call stays in flight while the worker is frozen
+        os.kill(pid, signal.SIGSTOP)
+        call = asyncio.create_task(client.async_call('async_connect'))
+        await asyncio.sleep(0.2)
+        os.kill(pid, signal.SIGKILL)
+        with pytest.raises(ConnectionError):
+            await call
+        assert not pool.running
+        assert not client.connected()
+        # later calls fail at once
+        with pytest.raises(ConnectionError):
+            await client.async_call('async_connect')
+        await pool.async_stop()
+    asyncio.run(sequence())
@@ -0,0 +1,190 @@
+""" write coalescing and suppression tests, on an in-memory Modbus slave """
+
+import asyncio
+import itertools
+
+import pytest
+
+from koolnova import const
+from koolnova import planner
+from koolnova.operations import Operations, ModbusConnexionError
+
+# one link per test, transports are shared per host:port
+_ports = itertools.count(40000)
+
+ZONE = 1
+LOCK = planner.area_register(ZONE, const.REG_LOCK_ZONE)
+FLOW = planner.area_register(ZONE, const.REG_STATE_AND_FLOW)
+ORDER = planner.area_register(ZONE, const.REG_TEMP_ORDER)
+# registered area, state on
+REGISTERED_ON = (int(const.ZoneRegister.REGISTER_ON) << 1) | int(const.ZoneState.STATE_ON)
+REGISTERED_OFF = int(const.ZoneRegister.REGISTER_ON) << 1
+
+class Response:
+    ''' successful pymodbus response '''
+
+    def __init__(self, registers:list) -> None:
+        self.registers = registers
+
+    def isError(self) -> bool:
+        return False
+
+class FakeBus:
+    ''' in-memory Modbus slave standing for the pymodbus client '''
+
+    connected = True
+
+    def __init__(self) -> None:
+        self.regs = [0] * const.NB_REGISTERS
+        self.reads:list = []
+        self.writes:list = []
+        # response time of the slave (seconds)
+        self.delay:float = 0.0
+
+    async def read_holding_registers(self, address:int, count:int, slave:int) -> Response:
+        self.reads.append((address, count))
+        await asyncio.sleep(self.delay)
+        return Response(self.regs[address:address + count])
+
+    async def write_register(self, address:int, value:int, slave:int) -> Response:
+        await asyncio.sleep(self.delay)
+        self.writes.append((address, value))
+        self.regs[address] = value
+        return Response([value])
+
+    def close(self) -> None:
+        pass
+
+class BusOperations(Operations):
+    ''' Operations on the in-memory slave '''
+
+    def _new_client(self) -> FakeBus:
+        return FakeBus()
+
+@pytest.fixture
+def ops():
+    client = BusOperations(mode = 'Modbus TCP', timeout = 1, port = next(_ports))
+    yield client
+    client.disconnect()
+
+def _run(coro):
+    return asyncio.run(coro)
+
+def test_last_writer_wins(ops):
+    async def burst():
+        return await asyncio.gather(*(ops.async_set_area_target_temp(zone_id = ZONE, val = val)
+                                        for val in (20.0, 21.0, 22.0)))
+    assert _run(burst()) == [True, True, True]
+    assert ops._client.writes == [(ORDER, 44)]
+
+def test_writes_outside_the_window(ops):
+    async def sequence():
+        await ops.async_set_area_target_temp(zone_id = ZONE, val = 20.0)
+        await ops.async_set_area_target_temp(zone_id = ZONE, val = 21.0)
+    _run(sequence())
+    assert ops._client.writes == [(ORDER, 40), (ORDER, 42)]
+
+def test_bit_fields_merged_in_one_write(ops):
+    ops._client.regs[FLOW] = (int(const.ZoneFanMode.FAN_LOW) << 4) | int(const.ZoneClimMode.HEAT)
+    async def burst():
+        await asyncio.gather(ops.async_set_area_fan_mode(id_zone = ZONE, val = const.ZoneFanMode.FAN_HIGH),
+                                ops.async_set_area_clim_mode(id_zone = ZONE, val = const.ZoneClimMode.COOL))
+    _run(burst())
+    # the register was unknown: one read of the base, one write of both fields
+    assert ops._client.reads == [(FLOW, 1)]
+    assert ops._client.writes == [(FLOW, (int(const.ZoneFanMode.FAN_HIGH) << 4) | int(const.ZoneClimMode.COOL))]
+
+def test_bits_merged_with_fresh_register(ops):
+    ops._client.regs[LOCK] = REGISTERED_ON
+    async def sequence():
+        await ops.async_read_registers_set(planner.area_registers(ZONE))
+        return await ops.async_set_area_state(id_zone = ZONE, val = const.ZoneState.STATE_OFF)
+    assert _run(sequence())
+    # the base comes from the register image, the register bit is kept
+    assert ops._client.reads == [(planner.area_register(ZONE, 0), const.NUM_REG_PER_ZONE)]
+    assert ops._client.writes == [(LOCK, REGISTERED_OFF)]
+
+def test_value_in_effect_suppressed(ops):
+    ops._client.regs[ORDER] = 44
+    async def sequence():
+        await ops.async_read_registers_set({ORDER})
+        return await ops.async_set_area_target_temp(zone_id = ZONE, val = 22.0)
+    assert _run(sequence())
+    assert ops._client.writes == []
+    assert ops.suppressed_writes == 1
+
+def test_forced_write_not_suppressed(ops):
+    ops._client.regs[ORDER] = 44
+    async def sequence():
+        await ops.async_read_registers_set({ORDER})
+        return await ops.async_set_area_target_temp(zone_id = ZONE, val = 22.0, force = True)
+    assert _run(sequence())
+    assert ops._client.writes == [(ORDER, 44)]
+    assert ops.suppressed_writes == 0
+
+def test_off_on_burst_suppressed(ops):
+    ops._client.regs[LOCK] = REGISTERED_ON
+    async def burst():
+        await ops.async_read_registers_set({LOCK})
+        return await asyncio.gather(ops.async_set_area_state(id_zone = ZONE, val = const.ZoneState.STATE_OFF),
+                                    ops.async_set_area_state(id_zone = ZONE, val = const.ZoneState.STATE_ON))
+    # the area ends on, as it already was: nothing is written
+    assert _run(burst()) == [True, True]
+    assert ops._client.writes == []
+    assert ops.suppressed_writes == 1
+
+def test_on_off_on_burst_written_once(ops):
+    ops._client.regs[LOCK] = REGISTERED_OFF
+    async def burst():
+        await ops.async_read_registers_set({LOCK})
+        return await asyncio.gather(ops.async_set_area_state(id_zone = ZONE, val = const.ZoneState.STATE_ON),
+                                    ops.async_set_area_state(id_zone = ZONE, val = const.ZoneState.STATE_OFF),
+                                    ops.async_set_area_state(id_zone = ZONE, val = const.ZoneState.STATE_ON))
+    assert _run(burst()) == [True, True, True]
+    assert ops._client.writes == [(LOCK, REGISTERED_ON)]
+
+def test_transactions_counted(ops):
+    ops._client.regs[ORDER] = 44
+    async def sequence():
+        await ops.async_read_registers_set({ORDER})
+        stats = {'transactions': 0}
+        await ops.async_write_registers({ORDER: 44, FLOW: 0x11}, stats = stats)
+        return stats
+    # the order temperature is suppressed, the state and flow register is written
+    assert _run(sequence()) == {'transactions': 1}
+    assert ops._client.writes == [(FLOW, 0x11)]
+
+def test_bursts_overlapping_a_slow_bus(ops):
+    ops._client.regs[LOCK] = REGISTERED_OFF
+    ops._client.delay = 0.5
+    async def bursts():
+        first = asyncio.create_task(ops.async_set_area_state(id_zone = ZONE, val = const.ZoneState.STATE_ON))
+        # the first batch is reading the base of the register
+        await asyncio.sleep(const.WRITE_COALESCE_DELAY + 0.1)
+        second = asyncio.create_task(ops.async_set_area_state(id_zone = ZONE, val = const.ZoneState.STATE_OFF))
+        return await asyncio.gather(first, second)
+    assert _run(bursts()) == [True, True]
+    # the second batch waits for the first one: one base read, the latest value written last
+    assert ops._client.reads == [(LOCK, 1)]
+    assert ops._client.writes == [(LOCK, REGISTERED_ON), (LOCK, REGISTERED_OFF)]
+
+def test_disconnect_fails_pending_writes(ops):
+    async def sequence():
+        write = asyncio.create_task(ops.async_set_area_target_temp(zone_id = ZONE, val = 22.0))
+        await asyncio.sleep(0)
+        ops.disconnect()
+        with pytest.raises(ModbusConnexionError):
+            await write
+        await asyncio.sleep(const.WRITE_COALESCE_DELAY + 0.1)
+    _run(sequence())
+    assert ops._client.writes == []
+
+def test_disconnect_during_a_batch(ops):
+    ops._client.delay = 0.5
+    async def sequence():
+        write = asyncio.create_task(ops.async_set_area_target_temp(zone_id = ZONE, val = 22.0))
+        await asyncio.sleep(const.WRITE_COALESCE_DELAY + 0.1)
+        ops.disconnect()
+        with pytest.raises(ModbusConnexionError):
+            await write
+    _run(sequence())